@@ -0,0 +1,88 @@
+"""
+Measures the cost of recording serial traffic with
+pywavez.CaptureLog.CaptureLogWriter, against logging each decoded message
+with logging.debug to a file.
+
+Each round records the frame of an APPLICATION_COMMAND_HANDLER request:
+as a chunk of bytes in the capture log, or as the repr of the decoded
+message in the debug log. Reported is the time per record in the
+recording thread, including the decoding for the debug log, and the
+number of records dropped by the capture log.
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+
+from pywavez.CaptureLog import CaptureLogWriter
+from pywavez.SerialProtocol import frameMessage
+from pywavez.TraceRecord import Direction
+from pywavez.zwave import inboundMessageFromBytes
+
+# APPLICATION_COMMAND_HANDLER request, SwitchBinary Report from node 2
+payload = bytes.fromhex("00040002032503ff")
+
+
+def measureCapture(path, count):
+    frame = bytes(frameMessage(payload))
+    log = CaptureLogWriter(path)
+    start = time.perf_counter()
+    for _ in range(count):
+        log.record(Direction.INBOUND, frame)
+    elapsed = time.perf_counter() - start
+    log.close()
+    return elapsed, log.dropped
+
+
+def measureDebugLog(path, count):
+    handler = logging.FileHandler(path)
+    root = logging.getLogger()
+    root.addHandler(handler)
+    root.setLevel(logging.DEBUG)
+    try:
+        start = time.perf_counter()
+        for _ in range(count):
+            msg = inboundMessageFromBytes(payload)
+            logging.debug(f"msg received: { msg !r}")
+        elapsed = time.perf_counter() - start
+    finally:
+        root.removeHandler(handler)
+        root.setLevel(logging.WARNING)
+        handler.close()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--count", type=int, default=200000)
+    parser.add_argument("--json", action="store_true", help="print JSON")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        capture, dropped = measureCapture(
+            os.path.join(tmp, "capture"), args.count
+        )
+        debug = measureDebugLog(os.path.join(tmp, "debug.log"), args.count)
+
+    results = {
+        "capture_us": capture / args.count * 1e6,
+        "capture_dropped": dropped,
+        "debug_log_us": debug / args.count * 1e6,
+    }
+    if args.json:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+        return
+    print(
+        f"capture log   { results['capture_us'] :6.2f} us per record"
+        f" ({ dropped } dropped)"
+    )
+    print(f"debug log     { results['debug_log_us'] :6.2f} us per record")
+
+
+if __name__ == "__main__":
+    main()
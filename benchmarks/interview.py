@@ -0,0 +1,140 @@
+"""
+Measures how long Controller takes to interview a network simulated by
+pywavez.SimulatedStick, and the rate at which it then sends commands.
+
+The controller is started with a network of virtual nodes, and the time
+is taken until every node has been interviewed. Then SwitchBinary Set
+commands are queued for the nodes that support it, round robin, and the
+time is taken until all have been sent. Both phases report wall and CPU
+time.
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+from pywavez.Controller import Controller
+from pywavez.SimulatedSerialDevice import SimulatedSerialDevice
+from pywavez.SimulatedStick import SimulatedStick
+from pywavez.VirtualNode import makeVirtualNodes
+from pywavez.zwave import getCommandClassVersion
+from pywavez.zwave.Constants import CommandClass
+
+
+async def drain(controller):
+    while True:
+        await controller.waitForMessage()
+        while controller.hasMessage():
+            controller.takeMessage()
+
+
+async def measure(args):
+    nodes = makeVirtualNodes(
+        args.nodes,
+        sleeping=args.sleeping,
+        multiChannel=args.multi_channel,
+        lossy=args.lossy,
+        slow=args.slow,
+        wakeUpInterval=args.wake_up_interval,
+    )
+    stick = SimulatedStick(
+        nodes,
+        latency=args.latency,
+        noAckProbability=args.no_ack,
+        seed=args.seed,
+    )
+    result = {}
+
+    startWall = time.perf_counter()
+    startCpu = time.process_time()
+    controller = await Controller(await SimulatedSerialDevice(stick))
+    drainer = asyncio.ensure_future(drain(controller))
+    try:
+        pending = [controller._getNode(node.id) for node in nodes]
+        while pending:
+            if time.perf_counter() - startWall > args.timeout:
+                break
+            await asyncio.sleep(0.05)
+            pending = [
+                n for n in pending if n.attemptInitializationTime is not None
+            ]
+        result["interview"] = {
+            "wall_s": time.perf_counter() - startWall,
+            "cpu_s": time.process_time() - startCpu,
+            "pending_nodes": len(pending),
+        }
+
+        switches = [
+            node.id
+            for node in nodes
+            if node.listening
+            and CommandClass.SWITCH_BINARY in node.commandClasses
+        ]
+        if switches and args.commands:
+            switch = getCommandClassVersion(CommandClass.SWITCH_BINARY, 1)
+            startWall = time.perf_counter()
+            startCpu = time.process_time()
+            transmissions = [
+                controller.sendCommand(
+                    switches[i % len(switches)], switch.Set(value=i & 1)
+                )
+                for i in range(args.commands)
+            ]
+            done, _ = await asyncio.wait(transmissions, timeout=args.timeout)
+            wall = time.perf_counter() - startWall
+            result["commands"] = {
+                "sent": len(done),
+                "wall_s": wall,
+                "cpu_s": time.process_time() - startCpu,
+                "per_second": len(done) / wall,
+            }
+    finally:
+        drainer.cancel()
+        await controller.shutdown()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--nodes", type=int, default=231)
+    parser.add_argument("--sleeping", type=int, default=20)
+    parser.add_argument("--multi-channel", type=int, default=20)
+    parser.add_argument("--lossy", type=int, default=0)
+    parser.add_argument("--slow", type=int, default=0)
+    parser.add_argument("--wake-up-interval", type=float, default=10.0)
+    parser.add_argument("--latency", type=float, default=0.01)
+    parser.add_argument("--no-ack", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--commands", type=int, default=1000)
+    parser.add_argument(
+        "--timeout", type=float, default=600, help="seconds per phase"
+    )
+    parser.add_argument("--json", action="store_true", help="print JSON")
+    args = parser.parse_args()
+
+    result = asyncio.run(measure(args))
+
+    if args.json:
+        json.dump(result, sys.stdout, indent=2)
+        print()
+        return
+    interview = result["interview"]
+    print(
+        f"interview  { interview['wall_s'] :8.2f} s"
+        f" ({ interview['cpu_s'] :.2f} s CPU),"
+        f" { interview['pending_nodes'] } nodes not done"
+    )
+    commands = result.get("commands")
+    if commands is not None:
+        print(
+            f"commands   { commands['wall_s'] :8.2f} s"
+            f" ({ commands['cpu_s'] :.2f} s CPU),"
+            f" { commands['sent'] } sent,"
+            f" { commands['per_second'] :.1f} per second"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Measures the time it takes to build the SEND_DATA frame of a command, sent
+as a command object or as a pywavez.PreparedCommand with new values of its
+variable fields.
+
+The command is a SwitchMultilevel V2 Set to node 7, to endpoint 2 through
+a MultiChannelCmdEncap or without endpoint. Reported is the best time per
+frame over the repeats. The funcId changes with every frame, as it does
+when sending.
+"""
+
+import argparse
+import json
+import sys
+import time
+
+from pywavez.PreparedCommand import PreparedCommand
+from pywavez.SendDataFrame import SendDataFrame
+from pywavez.zwave import getCommandClassVersion
+from pywavez.zwave.Constants import TransmitOption
+
+Set = getCommandClassVersion(0x26, 2).Set
+Encap = getCommandClassVersion(0x60, 3).MultiChannelCmdEncap
+txOptions = TransmitOption.ACK | TransmitOption.AUTO_ROUTE
+
+
+def layersFor(endpoint):
+    if endpoint == 0:
+        return ()
+    return (
+        Encap(
+            sourceEndPoint=0,
+            destinationEndPoint=endpoint,
+            bitAddress=False,
+            commandClass=0x26,
+            command=0x01,
+            parameter=b"",
+        ),
+    )
+
+
+def command(endpoint):
+    layers = layersFor(endpoint)
+
+    def frame(i):
+        return SendDataFrame(
+            nodeId=7,
+            command=Set(value=i % 100, dimmingDuration=1),
+            layers=layers,
+            txOptions=txOptions,
+            funcId=i % 255 + 1,
+        ).toFrame()
+
+    return frame
+
+
+def prepared(endpoint):
+    prepared = PreparedCommand(
+        Set(value=0, dimmingDuration=1),
+        ("value",),
+        endpoint=endpoint,
+        layers=layersFor(endpoint),
+    )
+
+    def frame(i):
+        return SendDataFrame(
+            nodeId=7,
+            command=prepared.withValues(i % 100),
+            txOptions=txOptions,
+            funcId=i % 255 + 1,
+        ).toFrame()
+
+    return frame
+
+
+def measure(frame, count, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for i in range(count):
+            frame(i)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--count", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--json", action="store_true", help="print JSON")
+    args = parser.parse_args()
+
+    results = {}
+    for endpoint in 2, 0:
+        for name, variant in ("command", command), ("prepared", prepared):
+            seconds = measure(variant(endpoint), args.count, args.repeat)
+            results[f"endpoint{ endpoint }/{ name }"] = {
+                "us_per_frame": seconds * 1e6
+            }
+
+    if args.json:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+        return
+    for key, result in results.items():
+        print(f"{ key :22} { result['us_per_frame'] :6.2f} us per frame")
+
+
+if __name__ == "__main__":
+    main()
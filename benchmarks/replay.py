@@ -0,0 +1,145 @@
+"""
+Replays a trace of serial traffic (see pywavez.TraceRecord) through
+pywavez.ReplaySerialDevice and measures the CPU time spent on the messages
+received. The trace is a capture log (see pywavez.CaptureLog) or in text
+form.
+
+The trace is replayed through SerialProtocol alone, or through Controller,
+which needs a trace starting when the controller is opened, so that its
+initialization can be replayed too.
+
+Reported are the number of messages received, the time taken to replay
+the trace, the CPU time in total and per message, the number of messages
+the host sent which differ from the trace, and the largest number of
+messages waiting to be taken at once.
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+from pywavez.CaptureLog import CaptureLogReader
+from pywavez.Controller import Controller
+from pywavez.ReplaySerialDevice import ReplaySerialDevice
+from pywavez.SerialProtocol import SerialProtocol
+from pywavez.TraceRecord import readTextTrace
+
+
+def readTrace(path):
+    try:
+        log = CaptureLogReader(path)
+    except ValueError:
+        return list(readTextTrace(path))
+    with log:
+        return [(ts, direction, bytes(data)) for ts, direction, data in log]
+
+
+async def replay(path, layer, speed, outbound, grace):
+    # parsed beforehand, not to be measured
+    records = readTrace(path)
+    dev = await ReplaySerialDevice(records, speed=speed, outbound=outbound)
+    startCpu = time.process_time()
+    startWall = time.perf_counter()
+    if layer == "protocol":
+        sp = SerialProtocol(dev)
+
+        async def take():
+            await sp.waitForMessage()
+            count = 0
+            while sp.messageReady():
+                await next(sp)
+                count += 1
+            return count
+
+        close = sp.close
+    else:
+        controller = await Controller(dev)
+
+        async def take():
+            await controller.waitForMessage()
+            count = 0
+            while controller.hasMessage():
+                controller.takeMessage()
+                count += 1
+            return count
+
+        close = controller.shutdown
+
+    messages = 0
+    backlog = 0
+
+    async def consume():
+        nonlocal messages, backlog
+        while True:
+            count = await take()
+            messages += count
+            backlog = max(backlog, count)
+
+    consumer = asyncio.ensure_future(consume())
+    try:
+        await dev.finished
+        wall = time.perf_counter() - startWall
+        # let the last messages through
+        while dev.hasData():
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(grace)
+        cpu = time.process_time() - startCpu
+    finally:
+        consumer.cancel()
+        await close()
+
+    return {
+        "messages": messages,
+        "cpu_s": cpu,
+        "cpu_us_per_message": cpu / messages * 1e6 if messages else None,
+        "wall_s": wall,
+        "mismatches": dev.mismatches,
+        "max_backlog": backlog,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("trace", help="capture log or trace in text form")
+    parser.add_argument(
+        "--layer", choices=("protocol", "controller"), default="protocol"
+    )
+    parser.add_argument(
+        "--speed",
+        type=float,
+        default=None,
+        help="replay speed, default as fast as possible",
+    )
+    parser.add_argument("--outbound", choices=("check", "ack"), default="ack")
+    parser.add_argument(
+        "--grace",
+        type=float,
+        default=0.2,
+        help="seconds to wait for the last messages to be taken",
+    )
+    parser.add_argument("--json", action="store_true", help="print JSON")
+    args = parser.parse_args()
+
+    result = asyncio.run(
+        replay(args.trace, args.layer, args.speed, args.outbound, args.grace)
+    )
+
+    if args.json:
+        json.dump(result, sys.stdout, indent=2)
+        print()
+        return
+    perMessage = result["cpu_us_per_message"]
+    print(
+        f"{ result['messages'] } messages"
+        f" in { result['wall_s'] :.3f} s,"
+        f" { result['cpu_s'] :.3f} s CPU"
+        + ("" if perMessage is None else f" ({ perMessage :.1f} us each)")
+        + f", { result['mismatches'] } mismatches,"
+        f" max backlog { result['max_backlog'] }"
+    )
+
+
+if __name__ == "__main__":
+    main()
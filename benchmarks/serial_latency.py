@@ -0,0 +1,98 @@
+"""
+Measures the round-trip latency of the serial device backends (see
+pywavez.SerialDeviceBase.makeSerialDevice) over a pseudo terminal.
+
+A thread at the other end of the pseudo terminal echoes everything it
+reads. Each round trip sends a frame through the backend and waits until
+the echo has been received.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+import tty
+
+from pywavez.SerialDeviceBase import makeSerialDevice
+from pywavez.SerialProtocol import frameMessage
+
+backends = ("stream", "protocol", "thread")
+
+
+def echo(fd):
+    while True:
+        try:
+            data = os.read(fd, 1024)
+        except OSError:
+            return
+        if not data:
+            return
+        os.write(fd, data)
+
+
+async def measure(backend, frame, count):
+    """Returns the round-trip times in seconds."""
+
+    master, slave = os.openpty()
+    tty.setraw(master)
+    threading.Thread(target=echo, args=(master,), daemon=True).start()
+    dev = await makeSerialDevice(os.ttyname(slave), backend=backend)
+    times = []
+    try:
+        for _ in range(count):
+            start = time.perf_counter()
+            await dev.send(frame)
+            await dev.waitForData(len(frame))
+            dev.takeSomeData(len(frame))
+            times.append(time.perf_counter() - start)
+    finally:
+        await dev.close()
+        os.close(slave)
+        os.close(master)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--count", type=int, default=2000)
+    parser.add_argument(
+        "-b",
+        "--backend",
+        action="append",
+        choices=backends,
+        help="only measure this backend",
+    )
+    parser.add_argument("--json", action="store_true", help="print JSON")
+    args = parser.parse_args()
+
+    # SEND_DATA request with a SwitchBinary Set
+    frame = bytes(frameMessage(bytes.fromhex("001307032501ff2503")))
+    results = {}
+    for backend in args.backend or backends:
+        times = asyncio.run(measure(backend, frame, args.count))
+        times.sort()
+        results[backend] = {
+            "median_us": statistics.median(times) * 1e6,
+            "p99_us": times[int(len(times) * 0.99)] * 1e6,
+            "min_us": times[0] * 1e6,
+        }
+
+    if args.json:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+        return
+    for backend, result in results.items():
+        print(
+            f"{ backend :10}"
+            f" median { result['median_us'] :8.1f} us"
+            f" p99 { result['p99_us'] :8.1f} us"
+            f" min { result['min_us'] :8.1f} us"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+"""
+Benchmarks decoding and encoding of every serial API message class and
+every command of every command class version.
+
+For each class, a representative payload is made from random data after
+the magic bytes of the class: the first data that decodes, encoded again.
+Decoding is `fromBytes`, encoding is `toBytes` of the decoded object.
+Results are written as JSON, and `--compare` prints the speed-up of one
+result file over another.
+"""
+
+import argparse
+import gc
+import itertools
+import json
+import math
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+from pywavez.__version__ import version
+from pywavez.zwave import Message, _command_classes
+
+
+def messageClasses():
+    for name in dir(Message):
+        if not name.startswith("_"):
+            cls = getattr(Message, name)
+            magic = bytes((cls.MessageType.value, cls.MessageClass.value))
+            yield f"Message.{ name }", magic, cls
+
+
+def commandClasses():
+    seen = set()
+    for cc in sorted(_command_classes.values(), key=lambda cc: cc.__name__):
+        for number, ver in sorted(cc.versions.items()):
+            for cmd, cls in sorted(ver.commands.items()):
+                # versions share the classes of unchanged commands
+                if cls in seen:
+                    continue
+                seen.add(cls)
+                magic = bytes((cls.CommandClassCode, cls.CommandCode))
+                name = f"{ cc.__name__ }.V{ number }.{ cls.__name__ }"
+                yield name, magic, cls
+
+
+def roundTrips(cls, data):
+    try:
+        pos, obj = cls.readFromBytes(data)
+        return pos == len(data) and obj.toBytes() == data
+    except Exception:
+        return False
+
+
+def findPayload(name, magic, cls, tries=1000):
+    """
+    Returns data decoded by `cls` that encodes to the same bytes, or None.
+
+    Random data is decoded and encoded again, which drops trailing data and
+    clears reserved bits.
+    """
+
+    rnd = random.Random(name)
+    candidates = (
+        bytes(rnd.randrange(256) for _ in range(rnd.randrange(48)))
+        for _ in range(tries)
+    )
+    # strings need a nul, rarely found in random data
+    zeros = (bytes([1] * length + [0] * 8) for length in range(40))
+    for data in itertools.chain(candidates, zeros):
+        data = magic + data
+        try:
+            data = bytes(cls.readFromBytes(data)[1].toBytes())
+        except Exception:
+            continue
+        if roundTrips(cls, data):
+            return data
+    return None
+
+
+def timePerOp(func, mintime):
+    """
+    Returns the best time in seconds of one call of `func`, out of five
+    runs of a loop taking at least `mintime` seconds.
+    """
+
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= mintime:
+            break
+        number *= 2 if elapsed * 8 > mintime else 8
+    best = elapsed
+    for _ in range(4):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, time.perf_counter() - start)
+    return best / number
+
+
+def allocations(func):
+    """
+    Returns the peak number of bytes allocated during one call of `func`,
+    and the number of bytes and memory blocks kept by its result.
+    """
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = func()
+        current, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    del result
+    stats = snapshot.filter_traces(
+        [tracemalloc.Filter(False, tracemalloc.__file__)]
+    ).statistics("filename")
+    return {
+        "peak_bytes": peak,
+        "result_bytes": sum(s.size for s in stats),
+        "result_blocks": sum(s.count for s in stats),
+    }
+
+
+def measure(cls, data, mintime):
+    obj = cls.fromBytes(data)
+    results = {}
+    for op, func in (
+        ("decode", lambda: cls.fromBytes(data)),
+        ("encode", obj.toBytes),
+    ):
+        seconds = timePerOp(func, mintime)
+        results[op] = {
+            "ns_per_op": seconds * 1e9,
+            "ops_per_s": 1 / seconds,
+            "allocations": allocations(func),
+        }
+    return results
+
+
+def run(args):
+    benchmarks = {}
+    skipped = []
+    for name, magic, cls in (*messageClasses(), *commandClasses()):
+        if args.filter and not any(f in name for f in args.filter):
+            continue
+        data = findPayload(name, magic, cls)
+        if data is None:
+            skipped.append(name)
+            continue
+        benchmarks[name] = {"payload": data.hex()}
+        benchmarks[name].update(measure(cls, data, args.min_time))
+        if args.verbose:
+            print(
+                f"{ name :60}"
+                f" { benchmarks[name]['decode']['ns_per_op'] :8.0f}"
+                f" { benchmarks[name]['encode']['ns_per_op'] :8.0f} ns",
+                file=sys.stderr,
+            )
+
+    return {
+        "pywavez": version,
+        "python": platform.python_implementation()
+        + " "
+        + platform.python_version(),
+        "machine": platform.machine(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "benchmarks": benchmarks,
+        "skipped": skipped,
+    }
+
+
+def compare(oldpath, newpath):
+    with open(oldpath) as f:
+        old = json.load(f)["benchmarks"]
+    with open(newpath) as f:
+        new = json.load(f)["benchmarks"]
+
+    ratios = {"decode": [], "encode": []}
+    for name in sorted(old.keys() & new.keys()):
+        line = [f"{ name :60}"]
+        for op, r in ratios.items():
+            ratio = old[name][op]["ns_per_op"] / new[name][op]["ns_per_op"]
+            r.append(ratio)
+            line.append(f"{ op } { ratio :5.2f}x")
+        print(" ".join(line))
+    for op, r in ratios.items():
+        if r:
+            mean = math.exp(sum(map(math.log, r)) / len(r))
+            print(f"geometric mean { op } speed-up: { mean :.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "-o", "--output", help="write the JSON results to this file"
+    )
+    parser.add_argument(
+        "-k",
+        "--filter",
+        action="append",
+        help="only run benchmarks whose name contains this string",
+    )
+    parser.add_argument(
+        "--min-time",
+        type=float,
+        default=0.02,
+        help="minimum duration of a timing loop in seconds",
+    )
+    parser.add_argument("-v", "--verbose", action="store_true")
+    parser.add_argument(
+        "--compare",
+        nargs=2,
+        metavar=("OLD", "NEW"),
+        help="compare two result files instead of running benchmarks",
+    )
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    results = run(args)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
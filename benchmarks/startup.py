@@ -0,0 +1,105 @@
+"""
+Measures the time and resident memory it takes to start using pywavez, in
+fresh interpreters:
+
+  serial-api      import pywavez.zwave and decode a serial API response,
+                  as a tool that does not talk to nodes does
+  command-class   also decode a command of one command class
+  all-classes     also load every command class, which is what importing
+                  pywavez.zwave used to do
+
+Each scenario runs with the code cache of the generated functions (see
+pywavez.serialization.CodeCache) warm and disabled.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+scenarios = {
+    "serial-api": """
+from pywavez.zwave import inboundMessageFromBytes
+inboundMessageFromBytes(bytes.fromhex("01155a2d5761766520342e30350001"))
+""",
+    "command-class": """
+from pywavez.zwave import getCommandClassVersion, inboundMessageFromBytes
+inboundMessageFromBytes(bytes.fromhex("01155a2d5761766520342e30350001"))
+getCommandClassVersion(0x25, 1).Report.fromBytes(b"\\x25\\x03\\xff")
+""",
+    "all-classes": """
+from pywavez.zwave import _command_classes, inboundMessageFromBytes
+inboundMessageFromBytes(bytes.fromhex("01155a2d5761766520342e30350001"))
+list(_command_classes.values())
+""",
+}
+
+runner = """
+import resource, sys, time
+start = time.perf_counter()
+exec(sys.argv[1])
+elapsed = time.perf_counter() - start
+print(elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+
+def measure(code, env, repeat):
+    """
+    Returns the best time in seconds and the smallest peak resident set
+    size in kB of `repeat` runs of `code`.
+    """
+
+    times = []
+    rss = []
+    for _ in range(repeat):
+        out = subprocess.run(
+            [sys.executable, "-c", runner, code],
+            env=env,
+            check=True,
+            stdout=subprocess.PIPE,
+        ).stdout.split()
+        times.append(float(out[0]))
+        rss.append(int(out[1]))
+    return min(times), min(rss)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="print JSON")
+    args = parser.parse_args()
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        filter(None, (root, env.get("PYTHONPATH")))
+    )
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for cache, cachedir in ("warm", tmpdir), ("none", ""):
+            env["PYWAVEZ_CACHE_DIR"] = cachedir
+            for name, code in scenarios.items():
+                if cache == "warm":
+                    measure(code, env, 1)
+                seconds, rss = measure(code, env, args.repeat)
+                results[f"{ name }/{ cache }"] = {
+                    "seconds": seconds,
+                    "maxrss_kb": rss,
+                }
+
+    if args.json:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+        return
+    for key, result in results.items():
+        print(
+            f"{ key :24} { result['seconds'] * 1000 :8.1f} ms"
+            f" { result['maxrss_kb'] :8} kB"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+import typing
+
+from pywavez.TraceRecord import Direction, TraceRecord
+
+# A capture log starts with this, followed by the records: a header of
+# timestamp (monotonic nanoseconds), direction and length of the data,
+# followed by the data. Chunks longer than a record takes are split.
+_MAGIC = b"pywavez capture 1\n"
+_header = struct.Struct("<QBH")
+_maxLength = 0xFFFF
+_directions = tuple(Direction)
+
+
+class CaptureLogWriter:
+    """
+    Appends records of serial traffic to the capture log file `path`.
+
+    `record` only copies the data into a buffer, which a background thread
+    writes to the file every `flushInterval` seconds, or once
+    `flushSize` bytes are waiting. Records which would make more than
+    `maxBuffered` bytes wait are dropped, and counted in `dropped`, so
+    the caller never waits for the disk.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        maxBuffered: int = 1 << 22,
+        flushSize: int = 1 << 16,
+        flushInterval: float = 0.5,
+    ):
+        self.path = path
+        self.maxBuffered = maxBuffered
+        self.flushSize = flushSize
+        self.flushInterval = flushInterval
+        self.dropped = 0
+
+        f = open(path, "a+b")
+        try:
+            f.seek(0)
+            magic = f.read(len(_MAGIC))
+            if not magic:
+                f.write(_MAGIC)
+            elif magic != _MAGIC:
+                raise ValueError(f"{ path }: not a capture log")
+            else:
+                # drop a record cut short, or the next ones would be lost
+                size = os.fstat(f.fileno()).st_size
+                end = _recordsEnd(f, size)
+                if end < size:
+                    logging.warning(
+                        f"CaptureLogWriter: { path }: dropping "
+                        f"{ size - end } bytes of a truncated record"
+                    )
+                    f.truncate(end)
+        except BaseException:
+            f.close()
+            raise
+        self.__file = f
+        self.__buffer = bytearray()
+        self.__lock = threading.Lock()
+        self.__wakeUp = threading.Event()
+        self.__closing = False
+        self.__thread = threading.Thread(
+            target=self.__writerImpl,
+            name=f"CaptureLogWriter({ path })",
+            daemon=True,
+        )
+        self.__thread.start()
+
+    def record(
+        self,
+        direction: Direction,
+        data: typing.ByteString,
+        timestamp: typing.Optional[int] = None,
+    ) -> None:
+        length = len(data)
+        if not length:
+            return
+        if timestamp is None:
+            timestamp = time.monotonic_ns()
+        with self.__lock:
+            buffer = self.__buffer
+            size = length + _header.size * (1 + (length - 1) // _maxLength)
+            if len(buffer) + size > self.maxBuffered:
+                if not self.dropped:
+                    logging.warning(
+                        f"CaptureLogWriter: dropping records for { self.path }"
+                    )
+                self.dropped += 1
+                return
+            if length <= _maxLength:
+                buffer += _header.pack(timestamp, direction, length)
+                buffer += data
+            else:
+                for pos in range(0, length, _maxLength):
+                    chunk = data[pos : pos + _maxLength]
+                    buffer += _header.pack(timestamp, direction, len(chunk))
+                    buffer += chunk
+            wakeUp = len(buffer) >= self.flushSize
+        if wakeUp:
+            self.__wakeUp.set()
+
+    def __writerImpl(self) -> None:
+        while True:
+            self.__wakeUp.wait(self.flushInterval)
+            self.__wakeUp.clear()
+            closing = self.__closing
+            with self.__lock:
+                buffer, self.__buffer = self.__buffer, bytearray()
+            if buffer:
+                try:
+                    self.__file.write(buffer)
+                    self.__file.flush()
+                except OSError as ex:
+                    logging.warning(
+                        f"CaptureLogWriter: writing { self.path } failed: "
+                        f"{ ex !r}"
+                    )
+            if closing:
+                break
+
+    def close(self) -> None:
+        """Writes the remaining records and closes the file."""
+
+        self.__closing = True
+        self.__wakeUp.set()
+        self.__thread.join()
+        self.__file.close()
+
+
+def _recordsEnd(f, size: int) -> int:
+    """Returns the offset in log file `f` after its last complete record."""
+
+    headerSize = _header.size
+    pos = len(_MAGIC)
+    while pos + headerSize <= size:
+        f.seek(pos)
+        _, _, length = _header.unpack(f.read(headerSize))
+        if pos + headerSize + length > size:
+            break
+        pos += headerSize + length
+    return pos
+
+
+class CaptureLogReader:
+    """
+    Reads the capture log file `path` by mapping it into memory.
+
+    Iterating yields `TraceRecord`s whose data are views of the mapped
+    file, which stay valid until `close`: copy them to keep them. A
+    record cut short, as the last one is if the writer died, is ignored.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size < len(_MAGIC):
+                raise ValueError(f"{ path }: not a capture log")
+            self.__mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.__view = memoryview(self.__mmap)
+        if self.__view[: len(_MAGIC)] != _MAGIC:
+            self.close()
+            raise ValueError(f"{ path }: not a capture log")
+        self.path = path
+
+    def __iter__(self) -> typing.Iterator[TraceRecord]:
+        view = self.__view
+        unpack = _header.unpack_from
+        headerSize = _header.size
+        end = len(view)
+        pos = len(_MAGIC)
+        while pos + headerSize <= end:
+            timestamp, direction, length = unpack(view, pos)
+            pos += headerSize
+            if pos + length > end:
+                break
+            try:
+                direction = _directions[direction]
+            except IndexError:
+                raise ValueError(
+                    f"{ self.path }: invalid record at offset "
+                    f"{ pos - headerSize }"
+                )
+            yield TraceRecord(timestamp, direction, view[pos : pos + length])
+            pos += length
+
+    def close(self) -> None:
+        """
+        Unmaps the file. Raises BufferError while views of records exist.
+        """
+
+        self.__view.release()
+        self.__mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,48 @@
+import asyncio
+import typing
+
+from pywavez.CaptureLog import CaptureLogWriter
+from pywavez.SerialDeviceBase import SerialDeviceBase
+from pywavez.TraceRecord import Direction
+
+
+class CaptureSerialDevice(SerialDeviceBase):
+    """
+    Serial device recording the traffic of another one, `device`, to the
+    capture log `log`, and otherwise passing everything through.
+
+    Data received by `device` is taken over as it arrives, so it is
+    recorded with the time of its arrival, and is not copied. The end of
+    `device`'s data ends this device's. Closing closes `device` and `log`.
+    """
+
+    def __init__(self, device: SerialDeviceBase, log: CaptureLogWriter):
+        super().__init__()
+        self.device = device
+        self.log = log
+        if device.hasData():
+            self.__received(bytes(device.takeAllData()))
+        device._receiver = self.__received
+        device._eofReceiver = self._setEOF
+        if device.atEOF():
+            self._setEOF()
+
+    def __received(self, data: typing.ByteString) -> None:
+        self.log.record(Direction.INBOUND, data)
+        self._appendData(data)
+        self._notify()
+
+    async def sendBreak(self) -> bool:
+        return await self.device.sendBreak()
+
+    async def send(self, data: typing.ByteString) -> None:
+        self.log.record(Direction.OUTBOUND, data)
+        await self.device.send(data)
+
+    async def close(self) -> None:
+        try:
+            await self.device.close()
+        finally:
+            await asyncio.get_event_loop().run_in_executor(
+                None, self.log.close
+            )
@@ -15,6 +15,10 @@ from pywavez.util import toCamelCase, waitForOne, spawnTask
 from pywavez.ControllerNode import ControllerNode
 from pywavez.SerialDeviceBase import SerialDeviceBase, makeSerialDevice
 from pywavez.SerialProtocol import SerialProtocol
+from pywavez.serialization.DecodeCache import DecodeCache
+from pywavez.serialization.ObjectPool import ObjectPool
+from pywavez.ReceivedCommand import ReceivedCommand
+from pywavez.SendDataFrame import SendDataFrame
 from pywavez.Transmission import (
     Priority,
     MessageTransmission,
@@ -22,6 +26,9 @@ from pywavez.Transmission import (
     MessageQueue,
 )
 
+_REQUEST = MessageType.REQUEST.value
+_APPLICATION_COMMAND_HANDLER = MessageClass.APPLICATION_COMMAND_HANDLER.value
+
 
 class FuncIdManager:
     class TimeoutEvent:
@@ -100,15 +107,29 @@ class Controller:
     async def __init__(
         self,
         serial_protocol: typing.Union[SerialProtocol, SerialDeviceBase, str],
+        *,
+        decodeCache: typing.Optional[DecodeCache] = None,
+        objectPool: typing.Optional[ObjectPool] = None,
+        serialBackend: str = "stream",
     ):
         if not isinstance(serial_protocol, SerialProtocol):
             if isinstance(serial_protocol, SerialDeviceBase):
                 serial_protocol = SerialProtocol(serial_protocol)
             else:
                 serial_protocol = SerialProtocol(
-                    await makeSerialDevice(serial_protocol)
+                    await makeSerialDevice(
+                        serial_protocol, backend=serialBackend
+                    )
                 )
         self.__sp = serial_protocol
+        # received messages and commands are decoded through this cache,
+        # if given, and are frozen then
+        self.decodeCache = decodeCache
+        # or decoded into objects returned by `release`, if given
+        self.objectPool = objectPool
+        if decodeCache is not None and objectPool is not None:
+            raise ValueError("decodeCache and objectPool are exclusive")
+        self.decoder = decodeCache if decodeCache is not None else objectPool
         self.__mq = MessageQueue()
         self.__node = [None] * 233
         self.__initializationNodeQueue = []
@@ -212,6 +233,18 @@ class Controller:
             command, endpoint=endpoint, priority=priority
         )
 
+    def prepareCommand(self, node_id, command, *fields, endpoint=0):
+        return self._getNode(node_id).prepareCommand(
+            command, *fields, endpoint=endpoint
+        )
+
+    def sendPreparedCommand(
+        self, node_id, prepared, *values, priority=Priority.DEFAULT
+    ):
+        return self._getNode(node_id).sendPreparedCommand(
+            prepared, *values, priority=priority
+        )
+
     async def __taskImpl(self):
         msgtx = None
         tx_timeout = None
@@ -229,10 +262,28 @@ class Controller:
                         timeout=tx_timeout - time.monotonic(),
                     )
 
+            debug = logging.getLogger().isEnabledFor(logging.DEBUG)
             while self.__sp.messageReady():
                 msg = await next(self.__sp)
                 try:
-                    msg = inboundMessageFromBytes(msg)
+                    updates = self.__handleApplicationCommandFrame(msg)
+                except Exception as ex:
+                    logging.warning(
+                        "Incoming request handler raised exception: "
+                        f"{ ex !r}"
+                    )
+                    traceback.print_exc()
+                    continue
+                if updates is not None:
+                    for rmsg in updates:
+                        self._receivedMessages.append(rmsg)
+                        if debug:
+                            logging.debug(
+                                f"msg received (fast path): { rmsg !r}"
+                            )
+                    continue
+                try:
+                    msg = inboundMessageFromBytes(msg, self.decoder)
                 except Exception:
                     logging.warning(
                         f"Ignoring unknown incoming message: { msg.hex() }"
@@ -293,15 +344,19 @@ class Controller:
                 msgtx = self.__mq.takeMessage()
                 msgtx.transmitting = True
                 logging.debug(f"Attempting transmission: { msgtx.message !r}")
+                toFrame = getattr(msgtx.message, "toFrame", None)
                 try:
-                    data = msgtx.message.toBytes()
+                    if toFrame is None:
+                        data = msgtx.message.toBytes()
+                    else:
+                        data = toFrame()
                 except Exception as ex:
                     msgtx.set_exception(ex)
                     msgtx = None
                 else:
                     logging.debug(f"outgoing: { msgtx.message !r}")
                     try:
-                        await self.__sp.send(data)
+                        await self.__sp.send(data, framed=toFrame is not None)
                     except Exception as ex:
                         logging.info(f"Exception while sending: { ex !r}")
                         await asyncio.sleep(0.05)
@@ -371,6 +426,48 @@ class Controller:
 
         return func
 
+    def sendCommandData(
+        self,
+        *,
+        nodeId,
+        command,
+        txOptions,
+        funcId,
+        layers=(),
+        PRIORITY=Priority.DEFAULT,
+    ):
+        """
+        Like `sendData`, with the command object (or its encoding) and its
+        encapsulating commands serialized straight into the frame (see
+        `SendDataFrame`).
+        """
+
+        if MessageClass.SEND_DATA not in self.__supportedFunctions:
+            raise_not_implemented()
+        return self.__sendMessage(
+            SendDataFrame(
+                nodeId=nodeId,
+                command=command,
+                txOptions=txOptions,
+                funcId=funcId,
+                layers=layers,
+            ),
+            nodeId=nodeId,
+            priority=PRIORITY,
+        )
+
+    def release(self, item):
+        """
+        Returns a received message, or the command of a ReceivedCommand, to
+        the object pool for reuse. The object must not be used afterwards.
+        Does nothing if the controller has no object pool.
+        """
+
+        if self.objectPool is not None:
+            if isinstance(item, ReceivedCommand):
+                item = item.command
+            self.objectPool.release(item)
+
     def _getNode(self, id):
         if not 1 <= id <= 232:
             raise Exception(f"Bogus node id: { id }")
@@ -404,8 +501,41 @@ class Controller:
             yield msg
         else:
             # yield from node.handleApplicationCommandHandlerRequest(msg)
+            consumed = True
             for x in node.handleApplicationCommandHandlerRequest(msg):
+                if x is msg:
+                    consumed = False
                 yield x
+            if consumed and self.objectPool is not None:
+                self.objectPool.release(msg)
+
+    def __handleApplicationCommandFrame(self, frame):
+        """
+        Fast path for received APPLICATION_COMMAND_HANDLER requests, which
+        make up most of the traffic. Node id and payload are taken from
+        `frame` by offset, and the payload is passed to the node, without
+        decoding the message. Returns the resulting updates, or None if the
+        frame is not such a request, in which case it takes the generic
+        path.
+        """
+
+        if (
+            len(frame) < 5
+            or frame[0] != _REQUEST
+            or frame[1] != _APPLICATION_COMMAND_HANDLER
+            # trailing data is reported by the generic path
+            or len(frame) != 5 + frame[4]
+            or not 1 <= frame[3] <= 232
+        ):
+            return None
+        node = self.__node[frame[3]]
+        if node is None:
+            return None
+        updates = node.handleApplicationCommand(memoryview(frame)[5:])
+        if updates is None:
+            # the payload is not parsed: the request itself is the result
+            return (inboundMessageFromBytes(frame, self.decoder),)
+        return updates
 
     async def __nodeInitializationTaskImpl(self):
         while True:
@@ -1,11 +1,13 @@
 import asyncio
+import functools
 import logging
 import random
 import time
 import traceback
 
 from pywavez.NodeUpdate import NodeUpdate
-from pywavez.zwave import getCommandClassVersion
+from pywavez.PreparedCommand import PreparedCommand
+from pywavez.zwave import commandTable, getCommandClassVersion
 from pywavez.zwave.Constants import (
     CommandClass,
     TransmitComplete,
@@ -28,6 +30,8 @@ class ControllerNode:
         self.commandQueue = MessageQueue()
         self.commandClassVersion = {}  # (endpoint, CommandClass) -> version
         self.commandClass = {}  # (endpoint, CommandClass) -> Python class
+        # endpoint -> commandTable() of each command class code, or None
+        self.__commandTables = {}
         self.endPointReport = None
         self.nodeActiveEvent = asyncio.Event()
         self.noAckCount = 0
@@ -63,6 +67,13 @@ class ControllerNode:
             ): self.multiChannelCmdEncapHandler,
             (CommandClass.WAKE_UP, 0x07): self.wakeUpNotificationHandler,
         }
+        # commandHandler as table indexed by command class code, then by
+        # command code
+        self.__handlerTable = [None] * 256
+        for (cc_code, cmd_code), handler in self.commandHandler.items():
+            if self.__handlerTable[cc_code] is None:
+                self.__handlerTable[cc_code] = [None] * 256
+            self.__handlerTable[cc_code][cmd_code] = handler
 
     @property
     def id(self):
@@ -83,7 +94,36 @@ class ControllerNode:
         self.commandQueue.add(cmdtx)
         return cmdtx
 
+    def prepareCommand(self, command, *fields, endpoint=0):
+        """
+        Returns a PreparedCommand sending `command` to `endpoint` of this
+        node, with variable `fields`.
+        """
+
+        return PreparedCommand(
+            command,
+            fields,
+            endpoint=endpoint,
+            layers=self.__encapsulation(command, endpoint),
+        )
+
+    def sendPreparedCommand(
+        self, prepared, *values, priority=Priority.DEFAULT
+    ):
+        """
+        Sends a PreparedCommand with `values` for its variable fields, if
+        given.
+        """
+
+        if values:
+            prepared = prepared.withValues(*values)
+        return self.sendCommand(
+            prepared, endpoint=prepared.endpoint, priority=priority
+        )
+
     def setCommandClasses(self, endpoint, cc_codes):
+        # a list, or a memoryview of the received payload
+        cc_codes = bytes(cc_codes)
         try:
             cc_codes = cc_codes[0 : cc_codes.index(0xEF)]
         except ValueError:
@@ -113,54 +153,77 @@ class ControllerNode:
             self.__controller.initializationRequiredEvent.set()
 
     def handleApplicationCommandHandlerRequest(self, msg, endpoint=0):
+        updates = self.handleApplicationCommand(msg.payload, endpoint)
+        if updates is None:
+            yield msg
+        else:
+            yield from updates
+
+    def handleApplicationCommand(self, payload, endpoint=0):
+        """
+        Handles the payload of an APPLICATION_COMMAND_HANDLER request.
+        Returns the resulting ReceivedCommand and NodeUpdate objects as a
+        sequence, or None if the payload is not parsed, in which case the
+        request itself is the result.
+        """
+
         try:
-            parsed_command = self.parse_command(msg.payload, endpoint)
+            parsed_command = self.parse_command(payload, endpoint)
         except Exception as ex:
             logging.warning(
                 "Error parsing APPLICATION_COMMAND_HANDLER payload: "
-                f"{ msg.payload !r} node={ self.__id } "
+                f"{ bytes(payload) !r} node={ self.__id } "
                 f"exception: { ex !r}"
             )
-            yield msg
-            return
-        else:
-            if parsed_command is None:
-                yield msg
-            else:
-                yield from self.handleCommand(parsed_command, endpoint)
+            self.nodeActive()
+            return None
+        if parsed_command is None:
+            self.nodeActive()
+            return None
+        handlers = self.__handlerTable[payload[0]]
+        if handlers is None or handlers[payload[1]] is None:
+            self.nodeActive()
+            return (ReceivedCommand(self.__id, endpoint, parsed_command),)
+        try:
+            return tuple(self.handleCommand(parsed_command, endpoint, payload))
         finally:
             self.nodeActive()
 
     def parse_command(self, payload, endpoint):
         if len(payload) < 2:
-            raise Exception(f"Short command: {payload !r}")
+            raise Exception(f"Short command: {bytes(payload) !r}")
 
         cc_code, cmd_code = payload[0:2]
-        cmd = None
-        cc_enum = CommandClass(cc_code)
         try:
-            cc = self.commandClass[endpoint, cc_enum]
+            table = self.__commandTables[endpoint]
         except KeyError:
-            # If this is a VERSION.CommandClassReport or WAKE_UP.Notification
-            # and we haven't got a version yet, then parse as version 1.
-            if (cc_code, cmd_code) not in (
-                (CommandClass.VERSION.value, 0x14),
-                (CommandClass.WAKE_UP.value, 0x07),
-            ):
+            table = defaultCommandTable()
+        commands = table[cc_code]
+        if commands is None:
+            # unsupported command class, or version not known yet
+            return
+        cmd = commands[cmd_code]
+        if cmd is None:
+            if commands is defaultCommandTable()[cc_code]:
+                # other commands of VERSION and WAKE_UP, version not known
                 return
-            cc = getCommandClassVersion(cc_code, 1)
-        cmd = cc.commands[cmd_code]
+            raise Exception(
+                f"Unknown command 0x{cmd_code:02x} of command class "
+                f"0x{cc_code:02x}"
+            )
+        decoder = self.__controller.decoder
+        if decoder is not None:
+            return decoder.fromBytes(cmd, payload)
         return cmd.fromBytes(payload)
 
-    def handleCommand(self, cmd, endpoint):
-        handler = self.commandHandler.get(
-            (cmd.CommandClassCode, cmd.CommandCode)
-        )
+    def handleCommand(self, cmd, endpoint, payload):
+        handlers = self.__handlerTable[cmd.CommandClassCode]
+        handler = None if handlers is None else handlers[cmd.CommandCode]
         if handler is None:
             yield ReceivedCommand(self.__id, endpoint, cmd)
         else:
             try:
-                yield from handler(cmd, endpoint)
+                yield from handler(cmd, endpoint, payload)
                 return
             except Exception as ex:
                 logging.warning(
@@ -168,7 +231,7 @@ class ControllerNode:
                     f" (endpoint: { endpoint } cmd: { cmd !r})"
                 )
 
-    def versionReportHandler(self, cmd, endpoint):
+    def versionReportHandler(self, cmd, endpoint, payload):
         reqcc = cmd.requestedCommandClass
         try:
             reqcc = CommandClass(reqcc)
@@ -181,23 +244,30 @@ class ControllerNode:
             self.commandClass[endpoint, reqcc] = cc_class
         except KeyError:
             cc_class = None
+        else:
+            table = self.__commandTables.get(endpoint)
+            if table is None:
+                table = self.__commandTables[endpoint] = list(
+                    defaultCommandTable()
+                )
+            table[reqcc] = commandTable(cc_class)
         yield NodeUpdate.CommandClass(
             self.__id, endpoint, cc_class, reqcc, vers
         )
 
-    def manufacturerSpecificReportHandler(self, cmd, endpoint):
+    def manufacturerSpecificReportHandler(self, cmd, endpoint, payload):
         if endpoint == 0:
             self.manufacturerInfo = cmd
             yield NodeUpdate.ManufacturerInfo(self.__id, cmd)
 
-    def multiChannelEndpointReportHandler(self, cmd, endpoint):
+    def multiChannelEndpointReportHandler(self, cmd, endpoint, payload):
         self.endPointReport = cmd
         return ()
 
-    def multiChannelCapabilityReportHandler(self, cmd, endpoint):
+    def multiChannelCapabilityReportHandler(self, cmd, endpoint, payload):
         yield from self.setCommandClasses(cmd.endPoint, cmd.commandClass)
 
-    def multiChannelCmdEncapHandler(self, cmd, endpoint):
+    def multiChannelCmdEncapHandler(self, cmd, endpoint, payload):
         if cmd.bitAddress:
             to_us = bool(1 & cmd.destinationEndPoint)
         else:
@@ -207,7 +277,9 @@ class ControllerNode:
             yield ReceivedCommand(self.__id, 0, cmd)
             return
 
-        payload = bytes((cmd.commandClass, cmd.command)) + cmd.parameter
+        # The encapsulated command (command class, command and parameter)
+        # makes up the end of the payload, so parse it in place.
+        payload = payload[-2 - len(cmd.parameter) :]
         endpoint = cmd.sourceEndPoint
 
         try:
@@ -215,15 +287,15 @@ class ControllerNode:
         except Exception as ex:
             logging.warning(
                 "Error parsing MULTI_CHANNEL_CMD_ENCAP payload: "
-                f"{ payload !r} node={ self.__id } endpoint={ endpoint } "
-                f"exception: { ex !r}"
+                f"{ bytes(payload) !r} node={ self.__id } "
+                f"endpoint={ endpoint } exception: { ex !r}"
             )
             yield ReceivedCommand(self.__id, 0, cmd)
             return
 
-        yield from self.handleCommand(parsed_command, endpoint)
+        yield from self.handleCommand(parsed_command, endpoint, payload)
 
-    def wakeUpNotificationHandler(self, cmd, endpoint):
+    def wakeUpNotificationHandler(self, cmd, endpoint, payload):
         if not self.sendsWakeUpNotifications:
             self.sendsWakeUpNotifications = True
             # insert a bogus item into the commandQueue to make the command
@@ -264,27 +336,17 @@ class ControllerNode:
             cmdtx.transmitting = True
 
             command = cmdtx.message
-            if cmdtx.endpoint > 0:
-                multi_channel = self.commandClass.get(
-                    (0, CommandClass.MULTI_CHANNEL)
-                )
-                if multi_channel is None:
-                    cmdtx.set_exception(
-                        Exception("Node does not support multi channel")
-                    )
+            if isinstance(command, PreparedCommand):
+                # encapsulated already
+                layers = ()
+            else:
+                try:
+                    layers = self.__encapsulation(command, cmdtx.endpoint)
+                except Exception as ex:
+                    cmdtx.set_exception(ex)
                     continue
-                command = multi_channel.MultiChannelCmdEncap(
-                    sourceEndPoint=0,
-                    destinationEndPoint=cmdtx.endpoint,
-                    bitAddress=False,
-                    commandClass=command.CommandClassCode,
-                    command=command.CommandCode,
-                    parameter=command.toBytes()[2:],
-                )
-
-            command = command.toBytes()
 
-            if await self.__transmitCommand(command):
+            if await self.__transmitCommand(command, layers):
                 if not cmdtx.cancelled():
                     cmdtx.set_result(None)
             else:
@@ -295,7 +357,30 @@ class ControllerNode:
 
             await asyncio.sleep(abs(random.gauss(0.2, 0.04)))
 
-    async def __transmitCommand(self, command_bytes):
+    def __encapsulation(self, command, endpoint):
+        """
+        Returns the layers encapsulating `command` for `endpoint`, as taken
+        by `SendDataFrame`.
+        """
+
+        if endpoint == 0:
+            return ()
+        multi_channel = self.commandClass.get((0, CommandClass.MULTI_CHANNEL))
+        if multi_channel is None:
+            raise Exception("Node does not support multi channel")
+        # the command follows the encapsulation header in the frame
+        return (
+            multi_channel.MultiChannelCmdEncap(
+                sourceEndPoint=0,
+                destinationEndPoint=endpoint,
+                bitAddress=False,
+                commandClass=command.CommandClassCode,
+                command=command.CommandCode,
+                parameter=b"",
+            ),
+        )
+
+    async def __transmitCommand(self, command, layers=()):
         func_id = await self.__controller._funcIdManager.get()
 
         if self.noAckCount % 2:
@@ -305,9 +390,10 @@ class ControllerNode:
 
         try:
             retval = (
-                await self.__controller.sendData(
+                await self.__controller.sendCommandData(
                     nodeId=self.__id,
-                    data=command_bytes,
+                    command=command,
+                    layers=layers,
                     txOptions=tx_options,
                     funcId=func_id.value,
                 )
@@ -504,6 +590,27 @@ class ControllerNode:
             list.append(t)
 
 
+@functools.lru_cache(maxsize=None)
+def defaultCommandTable():
+    """
+    Returns the command table of endpoints before any command class version
+    is known. Only VERSION.CommandClassReport and WAKE_UP.Notification are
+    parsed, as version 1.
+    """
+
+    table = [None] * 256
+    for cc_code, cmd_code in (
+        (CommandClass.VERSION, 0x14),
+        (CommandClass.WAKE_UP, 0x07),
+    ):
+        commands = [None] * 256
+        commands[cmd_code] = getCommandClassVersion(cc_code, 1).commands[
+            cmd_code
+        ]
+        table[cc_code] = tuple(commands)
+    return tuple(table)
+
+
 class InitTask:
     def __init__(self, node, key, condition, action):
         self.node = node
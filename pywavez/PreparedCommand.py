@@ -0,0 +1,113 @@
+import typing
+
+
+class PreparedCommand:
+    """
+    Command serialized once, along with its encapsulation, for sending it
+    repeatedly (see `ControllerNode.prepareCommand`).
+
+    `fields` names the fields of the command that vary from one send to
+    the next. `withValues` returns the prepared command with new values of
+    these fields. `SendDataFrame` builds the SEND_DATA frame of a prepared
+    command once per node id and txOptions, and for each send copies it
+    and patches in the values, funcId and checksum. The command is not
+    serialized again. Only fields of fixed-width commands not sharing a
+    byte with other fields can vary (see `fieldPatcher`).
+
+    `layers` are the encapsulating commands addressing `endpoint`, created
+    with an empty parameter, outermost first.
+    """
+
+    __slots__ = (
+        "command",
+        "endpoint",
+        "fields",
+        "values",
+        "data",
+        "_offset",
+        "_patch",
+        "_frames",
+    )
+
+    def __init__(
+        self,
+        command,
+        fields: typing.Sequence[str] = (),
+        *,
+        endpoint: int = 0,
+        layers: typing.Sequence = (),
+    ):
+        fields = tuple(fields)
+        if fields and not hasattr(command, "fieldPatcher"):
+            raise ValueError(
+                f"cannot patch fields of { type(command).__name__ }"
+            )
+
+        size = command.encodedSize()
+        for layer in layers:
+            size += layer.encodedSize() - 2
+        data = bytearray(size)
+        pos = 0
+        for layer in layers:
+            pos = layer.writeInto(data, pos) - 2
+        command.writeInto(data, pos)
+
+        self.command = command
+        self.endpoint = endpoint
+        self.fields = fields
+        self.values = tuple(getattr(command, field) for field in fields)
+        self.data = bytes(data)
+        self._offset = pos
+        self._patch = command.fieldPatcher(*fields) if fields else None
+        # (nodeId, txOptions) -> SEND_DATA frame and partial checksum, see
+        # SendDataFrame
+        self._frames = {}
+
+    def withValues(self, *values) -> "PreparedCommand":
+        """
+        Returns the prepared command with `values` for its variable fields,
+        in the order of `fields`.
+        """
+
+        if len(values) != len(self.fields):
+            raise TypeError(
+                f"expected { len(self.fields) } values, got { len(values) }"
+            )
+        prepared = PreparedCommand.__new__(PreparedCommand)
+        prepared.command = self.command
+        prepared.endpoint = self.endpoint
+        prepared.fields = self.fields
+        prepared.values = values
+        prepared.data = self.data
+        prepared._offset = self._offset
+        prepared._patch = self._patch
+        prepared._frames = self._frames
+        return prepared
+
+    def encodedSize(self) -> int:
+        return len(self.data)
+
+    def writeInto(self, buf: typing.ByteString, pos: int = 0) -> int:
+        data = self.data
+        end = pos + len(data)
+        if len(buf) < end:
+            raise ValueError("buffer too small")
+        buf[pos:end] = data
+        if self._patch is not None:
+            self._patch(buf, pos + self._offset, *self.values)
+        return end
+
+    def toBytes(self) -> bytearray:
+        buf = bytearray(len(self.data))
+        self.writeInto(buf)
+        return buf
+
+    def __repr__(self):
+        values = ", ".join(
+            f"{ field }={ value !r}"
+            for field, value in zip(self.fields, self.values)
+        )
+        return (
+            f"PreparedCommand({ self.command !r}, endpoint={ self.endpoint }"
+            f"{ ', ' if values else '' }{ values })"
+        )
@@ -0,0 +1,81 @@
+import asyncio
+import typing
+
+from asyncinit import asyncinit
+import serial_asyncio
+
+from pywavez.SerialDeviceBase import SerialDeviceBase
+
+
+@asyncinit
+class ProtocolSerialDevice(SerialDeviceBase):
+    """
+    Serial device receiving through an `asyncio.Protocol`: the transport
+    hands received data to `data_received`, which appends it to the buffer
+    and wakes the waiters right away, without a stream reader or reader
+    task in between.
+    """
+
+    async def __init__(self, device: str):
+        super().__init__()
+
+        loop = asyncio.get_event_loop()
+        self.__closed = loop.create_future()
+        self.__drained = None
+        transport, _ = await serial_asyncio.create_serial_connection(
+            loop=loop,
+            protocol_factory=lambda: _Protocol(self),
+            url=device,
+            baudrate=115200,
+            rtscts=True,
+        )
+        self.__transport = transport
+        self.__serial = transport.serial
+        self.__writeLock = asyncio.Lock()
+
+    async def sendBreak(self) -> bool:
+        async with self.__writeLock:
+            self.__serial.break_condition = True
+            await asyncio.sleep(0.25)
+            self.__serial.break_condition = False
+        return True
+
+    async def send(self, data: typing.ByteString) -> None:
+        async with self.__writeLock:
+            self.__transport.write(data)
+            if self.__drained is not None:
+                await self.__drained
+
+    async def close(self) -> None:
+        self.__transport.close()
+        await self.__closed
+
+    def _dataReceived(self, data: bytes) -> None:
+        self._appendData(data)
+        self._notify()
+
+    def _pauseWriting(self) -> None:
+        if self.__drained is None:
+            self.__drained = asyncio.get_event_loop().create_future()
+
+    def _resumeWriting(self) -> None:
+        if self.__drained is not None:
+            self.__drained.set_result(None)
+            self.__drained = None
+
+    def _connectionLost(self) -> None:
+        self._setEOF()
+        self._resumeWriting()
+        if not self.__closed.done():
+            self.__closed.set_result(None)
+
+
+class _Protocol(asyncio.Protocol):
+    def __init__(self, device):
+        self.data_received = device._dataReceived
+        self.pause_writing = device._pauseWriting
+        self.resume_writing = device._resumeWriting
+        self.__device = device
+
+    def connection_lost(self, exc):
+        self.__device._connectionLost()
@@ -21,10 +21,9 @@ class RemoteSerialDevice(SerialDeviceBase):
             r = await self.__reader.read(1024)
             if not r:
                 break
-            self._receivedData += r
+            self._appendData(r)
             self._notify()
-        self._readEOF = True
-        self._notify()
+        self._setEOF()
 
     async def sendBreak(self) -> bool:
         self.__writer.write(b"\x11")
@@ -58,13 +57,12 @@ async def amain():
 
     async def read_task(sd, writer):
         while True:
-            await sd.waitForData()
-            data = sd.takeAllData()
-            if data:
-                writer.write(data)
-                await writer.drain()
-            elif sd.atEOF():
+            try:
+                await sd.waitForData()
+            except EOFError:
                 break
+            writer.write(sd.takeAllData())
+            await writer.drain()
 
     async def write_task(sd, reader):
         data = bytearray()
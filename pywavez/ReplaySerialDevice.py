@@ -0,0 +1,161 @@
+import asyncio
+import logging
+import typing
+
+from asyncinit import asyncinit
+
+from pywavez.SerialDeviceBase import SerialDeviceBase
+from pywavez.SerialProtocol import FrameType
+from pywavez.TraceRecord import Direction, TraceRecord
+
+
+@asyncinit
+class ReplaySerialDevice(SerialDeviceBase):
+    """
+    Serial device replaying the controller stick's side of a trace of
+    serial traffic (see `TraceRecord`).
+
+    Inbound records are received at their original times, scaled by
+    `speed` (2 replays twice as fast), or as fast as possible if `speed`
+    is None. `outbound` selects what happens to the data sent:
+
+      check  The trace is replayed as a dialogue. Inbound records after
+             an outbound record are held back until as much data has been
+             sent, for at most `outboundTimeout` seconds. The data sent
+             is compared with the trace, and differences are logged and
+             counted in `mismatches`.
+      ack    Outbound records are ignored, and every frame sent is
+             acknowledged right away. The ACK, NAK and CAN bytes of the
+             trace, which answered the frames sent originally, are
+             dropped. Frames must be sent one per `send`, as
+             SerialProtocol does. The replay waits at the first
+             outbound record until data is first sent.
+
+    `finished` is done once the whole trace has been replayed. The device
+    stays open afterwards, as a stick with nothing more to say.
+    """
+
+    async def __init__(
+        self,
+        records: typing.Iterable[TraceRecord],
+        *,
+        speed: typing.Optional[float] = 1.0,
+        outbound: str = "check",
+        outboundTimeout: float = 5.0,
+    ):
+        super().__init__()
+        if outbound not in ("check", "ack"):
+            raise ValueError(f"Invalid outbound mode: { outbound !r}")
+        if speed is not None and speed <= 0:
+            raise ValueError(f"Invalid speed: { speed !r}")
+        self.speed = speed
+        self.outbound = outbound
+        self.outboundTimeout = outboundTimeout
+        self.mismatches = 0
+        self.finished = asyncio.get_event_loop().create_future()
+        self.__sent = bytearray()
+        self.__sentEvent = asyncio.Event()
+        # bytes of the current inbound frame still to come, -1 for its
+        # length byte, see __dropControlBytes
+        self.__frameRemaining = 0
+        self.__task = asyncio.create_task(self.__replayImpl(iter(records)))
+
+    async def __replayImpl(self, records):
+        loop = asyncio.get_event_loop()
+        check = self.outbound == "check"
+        # trace time and loop time it is replayed at
+        origin = None
+        try:
+            for timestamp, direction, data in records:
+                if origin is None:
+                    origin = timestamp, loop.time()
+                due = origin[1]
+                if self.speed is not None:
+                    due += (timestamp - origin[0]) / 1e9 / self.speed
+                if direction == Direction.OUTBOUND:
+                    if not check and not self.__sentEvent.is_set():
+                        # e.g. after SerialProtocol's startup delay
+                        await self.__sentEvent.wait()
+                        origin = timestamp, loop.time()
+                    elif check:
+                        await self.__expect(data)
+                        if loop.time() > due:
+                            # the host was late, so is the rest of the trace
+                            origin = timestamp, loop.time()
+                    continue
+                delay = due - loop.time()
+                await asyncio.sleep(delay if delay > 0 else 0)
+                if not check:
+                    data = self.__dropControlBytes(data)
+                self._appendData(data)
+                self._notify()
+        finally:
+            if not self.finished.done():
+                self.finished.set_result(None)
+
+    async def __expect(self, expected):
+        sent = self.__sent
+        while len(sent) < len(expected):
+            self.__sentEvent.clear()
+            try:
+                await asyncio.wait_for(
+                    self.__sentEvent.wait(), self.outboundTimeout
+                )
+            except asyncio.TimeoutError:
+                break
+        actual = bytes(sent[: len(expected)])
+        del sent[: len(expected)]
+        if actual != expected:
+            self.mismatches += 1
+            logging.warning(
+                f"Replay: sent { actual.hex() }, "
+                f"trace has { bytes(expected).hex() }"
+            )
+
+    def __dropControlBytes(self, data):
+        """Returns inbound `data` without ACK, NAK and CAN bytes."""
+
+        result = bytearray()
+        pos = 0
+        end = len(data)
+        while pos < end:
+            remaining = self.__frameRemaining
+            if remaining > 0:
+                take = min(remaining, end - pos)
+                result += data[pos : pos + take]
+                pos += take
+                self.__frameRemaining = remaining - take
+                continue
+            c = data[pos]
+            pos += 1
+            if remaining < 0:
+                self.__frameRemaining = c or 256
+            elif c == FrameType.SOF.value:
+                self.__frameRemaining = -1
+            elif c in _controlBytes:
+                continue
+            result.append(c)
+        return result
+
+    async def sendBreak(self) -> bool:
+        return True
+
+    async def send(self, data: typing.ByteString) -> None:
+        if self.outbound == "check":
+            self.__sent += data
+            self.__sentEvent.set()
+        else:
+            self.__sentEvent.set()
+            if data[:1] == _sof:
+                self._appendData(_ack)
+                self._notify()
+
+    async def close(self) -> None:
+        self.__task.cancel()
+
+
+_sof = bytes((FrameType.SOF.value,))
+_ack = bytes((FrameType.ACK.value,))
+_controlBytes = frozenset(
+    (FrameType.ACK.value, FrameType.NAK.value, FrameType.CAN.value)
+)
@@ -0,0 +1,128 @@
+import struct
+import typing
+
+from pywavez.PreparedCommand import PreparedCommand
+from pywavez.SerialProtocol import FrameType, calcChecksum
+from pywavez.zwave.Constants import MessageClass, MessageType
+
+# SOF, length, message type, message class, node id, data length
+_header = struct.Struct("6B")
+_sof = FrameType.SOF.value
+_request = MessageType.REQUEST.value
+_send_data = MessageClass.SEND_DATA.value
+
+
+class SendDataFrame:
+    """
+    SEND_DATA request transmitting a command to a node, serialized directly
+    into a complete serial API frame.
+
+    `toFrame` writes SOF, length, the SEND_DATA header, the encapsulating
+    commands, the command, txOptions, funcId and checksum into a single
+    buffer in one pass. `command` is a command object or its encoding.
+    `layers` are the encapsulating commands, outermost first, each created
+    with an empty parameter: their encodings end with the command class and
+    command code of the command they encapsulate, which are shared with it.
+
+    The frame of a `PreparedCommand` is built once per node id and
+    txOptions and cached in it. Each `toFrame` copies the cached frame and
+    patches the variable fields, funcId and checksum.
+    """
+
+    MessageType = MessageType.REQUEST
+    MessageClass = MessageClass.SEND_DATA
+
+    __slots__ = ("nodeId", "command", "layers", "txOptions", "funcId")
+
+    def __init__(
+        self,
+        *,
+        nodeId: int,
+        command,
+        txOptions: int,
+        funcId: int,
+        layers: typing.Sequence = (),
+    ):
+        self.nodeId = nodeId
+        self.command = command
+        self.layers = layers
+        self.txOptions = txOptions
+        self.funcId = funcId
+
+    def toFrame(self) -> bytearray:
+        command = self.command
+        if type(command) is PreparedCommand and not self.layers:
+            return self.__preparedFrame(command)
+        encoded = isinstance(command, (bytes, bytearray, memoryview))
+        size = len(command) if encoded else command.encodedSize()
+        for layer in self.layers:
+            size += layer.encodedSize() - 2
+        if size > 248:
+            raise ValueError(f"command too long for SEND_DATA: { size }")
+
+        frame = bytearray(size + 9)
+        _header.pack_into(
+            frame,
+            0,
+            _sof,
+            size + 7,
+            _request,
+            _send_data,
+            self.nodeId,
+            size,
+        )
+        pos = 6
+        for layer in self.layers:
+            pos = layer.writeInto(frame, pos) - 2
+        if encoded:
+            frame[pos : pos + len(command)] = command
+            pos += len(command)
+        else:
+            pos = command.writeInto(frame, pos)
+        frame[pos] = self.txOptions
+        frame[pos + 1] = self.funcId
+        frame[pos + 2] = calcChecksum(memoryview(frame)[2 : pos + 2])
+        return frame
+
+    def __preparedFrame(self, prepared):
+        key = self.nodeId, self.txOptions
+        cached = prepared._frames.get(key)
+        if cached is None:
+            template = SendDataFrame(
+                nodeId=self.nodeId,
+                command=prepared.data,
+                txOptions=self.txOptions,
+                funcId=0,
+            ).toFrame()
+            # the checksum with funcId 0 and without the command's bytes,
+            # which are folded in again after patching
+            start = 6 + prepared._offset
+            end = 6 + len(prepared.data)
+            checksum = template[-1]
+            for b in template[start:end]:
+                checksum ^= b
+            cached = prepared._frames[key] = bytes(template), checksum
+        template, checksum = cached
+        frame = bytearray(template)
+        if prepared._patch is not None:
+            start = 6 + prepared._offset
+            prepared._patch(frame, start, *prepared.values)
+            for b in frame[start : 6 + len(prepared.data)]:
+                checksum ^= b
+        else:
+            checksum = template[-1]
+        frame[-2] = self.funcId
+        frame[-1] = checksum ^ self.funcId
+        return frame
+
+    def toBytes(self) -> bytearray:
+        """Returns the message without the framing, like `toBytes`."""
+
+        return self.toFrame()[2:-1]
+
+    def __repr__(self):
+        return (
+            f"SendDataFrame(nodeId={ self.nodeId !r}, "
+            f"command={ self.command !r}, layers={ self.layers !r}, "
+            f"txOptions={ self.txOptions !r}, funcId={ self.funcId !r})"
+        )
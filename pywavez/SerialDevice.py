@@ -42,10 +42,9 @@ class SerialDevice(SerialDeviceBase):
             r = await self.__reader.read(1024)
             if not r:
                 break
-            self._receivedData += r
+            self._appendData(r)
             self._notify()
-        self._readEOF = True
-        self._notify()
+        self._setEOF()
 
     async def send(self, data: typing.ByteString) -> None:
         async with self.__writeLock:
@@ -1,56 +1,177 @@
 import asyncio
+import collections
+import heapq
+import itertools
 import typing
 import re
 
 
 class SerialDeviceBase:
+    """
+    Base of serial devices, buffering received data.
+
+    Received data is kept as the chunks read, which are immutable, with
+    the position of the first unread byte in the first chunk. Taking bytes
+    advances the position, so no data is moved, and data taken from
+    within one chunk is a view of it, which stays valid.
+    """
+
     def __init__(self):
-        self._receivedData = bytearray()
-        self._receivedDataNotifications = []
+        self._receivedChunks = collections.deque()
+        # position of the first unread byte in the first chunk
+        self._receivedOffset = 0
+        # number of unread bytes
+        self._receivedLength = 0
+        # Futures waiting for data, with the number of bytes awaited: a
+        # single one, which is what SerialProtocol needs, and a heap of
+        # further ones ordered by that number. Cancelled futures are
+        # dropped when reached, or when the heap has grown.
+        self._waiter = None
+        self._waiters = []
+        self._waiterCount = itertools.count()
+        self._waitersCleanup = 16
         self._readEOF = False
+        # if set, called with received data instead of buffering it, and
+        # at the end of the data, by a device wrapping this one (see
+        # CaptureSerialDevice)
+        self._receiver = None
+        self._eofReceiver = None
+
+    def _appendData(self, data: typing.ByteString) -> None:
+        """Appends received data. Call `_notify` afterwards."""
+
+        if data:
+            if self._receiver is not None:
+                return self._receiver(data)
+            if type(data) is not bytes:
+                data = bytes(data)
+            self._receivedChunks.append(data)
+            self._receivedLength += len(data)
+
+    def _setEOF(self) -> None:
+        """Marks the end of the received data, and notifies waiters."""
+
+        self._readEOF = True
+        if self._eofReceiver is not None:
+            self._eofReceiver()
+        self._notify()
 
     def hasData(self) -> bool:
-        return bool(self._receivedData)
+        return self._receivedLength > 0
 
     def atEOF(self) -> bool:
         return self._readEOF
 
     def takeAllData(self) -> bytearray:
-        data = self._receivedData
-        self._receivedData = bytearray()
+        chunks = self._receivedChunks
+        if chunks:
+            chunks[0] = memoryview(chunks[0])[self._receivedOffset :]
+        data = bytearray().join(chunks)
+        chunks.clear()
+        self._receivedOffset = self._receivedLength = 0
         return data
 
-    def takeSomeData(self, bytes: int) -> bytearray:
-        if bytes > len(self._receivedData):
+    def peekData(self) -> bytes:
+        """Returns the unread data, without taking it."""
+
+        chunks = self._receivedChunks
+        if not chunks:
+            return b""
+        if len(chunks) == 1 and not self._receivedOffset:
+            return chunks[0]
+        chunks[0] = memoryview(chunks[0])[self._receivedOffset :]
+        data = b"".join(chunks)
+        chunks.clear()
+        chunks.append(data)
+        self._receivedOffset = 0
+        return data
+
+    def takeSomeData(self, bytes: int) -> memoryview:
+        if bytes > self._receivedLength:
             raise Exception("not enough data available")
-        res = self._receivedData[0:bytes]
-        self._receivedData = self._receivedData[bytes:]
+        if not bytes:
+            return memoryview(b"")
+        chunks = self._receivedChunks
+        offset = self._receivedOffset
+        end = offset + bytes
+        chunk = chunks[0]
+        if end <= len(chunk):
+            res = memoryview(chunk)[offset:end]
+        else:
+            # spans several chunks
+            res = bytearray(memoryview(chunk)[offset:])
+            chunks.popleft()
+            while len(res) + len(chunks[0]) < bytes:
+                res += chunks.popleft()
+            end = bytes - len(res)
+            res += memoryview(chunks[0])[:end]
+            res = memoryview(res)
+        self._receivedLength -= bytes
+        if end == len(chunks[0]):
+            chunks.popleft()
+            end = 0
+        self._receivedOffset = end
         return res
 
     def takeByte(self) -> int:
-        return self._receivedData.pop(0)
+        if not self._receivedLength:
+            raise IndexError("no data available")
+        chunk = self._receivedChunks[0]
+        offset = self._receivedOffset
+        self._receivedLength -= 1
+        if offset + 1 == len(chunk):
+            self._receivedChunks.popleft()
+            self._receivedOffset = 0
+        else:
+            self._receivedOffset = offset + 1
+        return chunk[offset]
 
     def waitForData(self, bytes=1):
         fut = asyncio.Future()
-        if len(self._receivedData) >= bytes:
+        if self._receivedLength >= bytes:
             fut.set_result(None)
-        else:
-            self._receivedDataNotifications.append((bytes, fut))
+            return fut
+        waiter = self._waiter
+        if waiter is None or waiter[1].done():
+            self._waiter = bytes, fut
+            return fut
+        waiters = self._waiters
+        if len(waiters) >= self._waitersCleanup:
+            # drop futures cancelled by timeouts
+            waiters[:] = [w for w in waiters if not w[2].done()]
+            heapq.heapify(waiters)
+            self._waitersCleanup = max(16, 2 * len(waiters))
+        heapq.heappush(waiters, (bytes, next(self._waiterCount), fut))
         return fut
 
     def _notify(self):
-        if not self._receivedData:
+        length = self._receivedLength
+        if not length and not self._readEOF:
             return
-        notifications = self._receivedDataNotifications
-        self._receivedDataNotifications = []
-        for b, fut in notifications:
-            if not fut.cancelled():
-                if len(self._receivedData) >= b:
-                    fut.set_result(None)
-                elif self._readEOF:
+        waiter = self._waiter
+        if waiter is not None:
+            b, fut = waiter
+            if fut.done():
+                self._waiter = None
+            elif length >= b:
+                fut.set_result(None)
+                self._waiter = None
+            elif self._readEOF:
+                fut.set_exception(EOFError())
+                self._waiter = None
+        waiters = self._waiters
+        while waiters:
+            b, _, fut = waiters[0]
+            if b > length and not fut.done():
+                break
+            heapq.heappop(waiters)
+            if not fut.done():
+                fut.set_result(None)
+        if self._readEOF:
+            for b, _, fut in waiters:
+                if not fut.done():
                     fut.set_exception(EOFError())
-                else:
-                    self._receivedDataNotifications.append((b, fut))
+            waiters.clear()
 
     def __iter__(self):
         return self
@@ -64,7 +185,21 @@ class SerialDeviceBase:
                 raise StopIteration
 
 
-def makeSerialDevice(dev) -> typing.Awaitable[SerialDeviceBase]:
+def makeSerialDevice(
+    dev, *, backend: str = "stream"
+) -> typing.Awaitable[SerialDeviceBase]:
+    """
+    Opens the serial device `dev`, or connects to a remote serial server
+    if `dev` is of the form `host:port`.
+
+    `backend` selects the implementation for local devices:
+
+      stream    pyserial-asyncio with a stream reader (SerialDevice)
+      protocol  pyserial-asyncio with a protocol receiving the data
+                directly (ProtocolSerialDevice)
+      thread    pyserial read by a dedicated thread (ThreadSerialDevice)
+    """
+
     match = re.match(r"^([\w\-\.:]+):(\d+)$", dev)
     if match:
         host, port = match.groups()
@@ -72,7 +207,17 @@ def makeSerialDevice(dev) -> typing.Awaitable[SerialDeviceBase]:
         from pywavez.RemoteSerialDevice import RemoteSerialDevice
 
         return RemoteSerialDevice(host, port)
-    else:
+    elif backend == "stream":
         from pywavez.SerialDevice import SerialDevice
 
         return SerialDevice(dev)
+    elif backend == "protocol":
+        from pywavez.ProtocolSerialDevice import ProtocolSerialDevice
+
+        return ProtocolSerialDevice(dev)
+    elif backend == "thread":
+        from pywavez.ThreadSerialDevice import ThreadSerialDevice
+
+        return ThreadSerialDevice(dev)
+    else:
+        raise ValueError(f"Unknown serial backend: { backend !r}")
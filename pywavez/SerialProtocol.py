@@ -34,11 +34,24 @@ def calcChecksum(data: typing.ByteString) -> int:
 
 
 def frameMessage(payload: typing.ByteString) -> bytearray:
-    return (
-        bytearray((FrameType.SOF.value, len(payload) + 1))
-        + payload
-        + bytearray((calcChecksum(payload),))
-    )
+    checksum = calcChecksum(payload)
+    frame = bytearray(len(payload) + 3)
+    frame[0] = FrameType.SOF.value
+    frame[1] = len(payload) + 1
+    frame[2:-1] = payload
+    frame[-1] = checksum
+    return frame
+
+
+_SOF = FrameType.SOF.value
+_SOF_BYTES = bytes((_SOF,))
+
+
+def skippedByte(c: int, expected: str) -> None:
+    if c in FrameType.values:
+        logging.warning(f"Skipped {FrameType(c)} while expecting { expected }")
+    else:
+        logging.warning(f"Skipped byte 0x{c:02x} while expecting { expected }")
 
 
 class SerialProtocol:
@@ -53,9 +66,15 @@ class SerialProtocol:
         self.__task = spawnTask(self.__taskImpl())
         self.__task.add_done_callback(self.__setReaderFinished)
 
-    def send(self, msg):
+    def send(self, msg, *, framed=False):
+        """
+        Queues the message `msg` for sending, or the complete frame `msg`
+        if `framed` is true.
+        """
+
         fut = asyncio.Future()
-        self.__sendMsgQueue.append((msg, fut))
+        frame = msg if framed else frameMessage(msg)
+        self.__sendMsgQueue.append((frame, fut))
         self.__sendMsgEvent.set()
         return fut
 
@@ -102,7 +121,7 @@ class SerialProtocol:
     def __iter__(self):
         return self
 
-    async def __next__(self) -> bytearray:
+    async def __next__(self) -> memoryview:
         while True:
             if self.__receivedMsgs:
                 msg = self.__receivedMsgs.pop(0)
@@ -121,29 +140,67 @@ class SerialProtocol:
         while True:
             # idling about
             self.__idleEvent.set()
-            await waitForOne(
-                self.__dev.waitForData(), self.__sendMsgEvent.wait()
-            )
+            dataReceived = self.__dev.waitForData()
+            await waitForOne(dataReceived, self.__sendMsgEvent.wait())
+            if not dataReceived.cancelled() and dataReceived.exception():
+                # EOFError: the device was closed, or the connection lost
+                return
             self.__idleEvent.clear()
             await self.__doStuff()
 
     async def __doStuff(self):
         if self.__dev.hasData():
-            c = self.__dev.takeByte()
-            if c != FrameType.SOF.value:
-                if c not in FrameType.values:
-                    return logging.warning(
-                        f"Skipped byte 0x{c:02x} while expecting SOF"
-                    )
-                else:
-                    return logging.warning(
-                        f"Skipped {FrameType(c)} while expecting SOF"
-                    )
-                    return
-            return await self.__receiveMsg()
+            return await self.__receiveFrames()
         if self.__sendMsgQueue:
             await self.__sendMsg()
 
+    async def __receiveFrames(self):
+        """
+        Receives all complete frames in the buffer of the device at once,
+        acknowledging them with a single write. A partial frame at the end
+        is received as the rest of it arrives.
+        """
+
+        data = self.__dev.peekData()
+        view = memoryview(data)
+        end = len(data)
+        pos = 0
+        replies = bytearray()
+        payloads = []
+        while pos < end:
+            if data[pos] != _SOF:
+                sof = data.find(_SOF_BYTES, pos)
+                if sof < 0:
+                    sof = end
+                for c in data[pos:sof]:
+                    skippedByte(c, "SOF")
+                pos = sof
+                continue
+            if pos + 2 > end:
+                break
+            length = data[pos + 1] or 256
+            if pos + 2 + length > end:
+                break
+            payload = view[pos + 2 : pos + 1 + length]
+            if calcChecksum(payload) == data[pos + 1 + length]:
+                replies.append(FrameType.ACK.value)
+                payloads.append(payload)
+            else:
+                logging.warning("Checksum mismatch")
+                replies.append(FrameType.NAK.value)
+            pos += 2 + length
+        self.__dev.takeSomeData(pos)
+
+        if replies:
+            await self.__dev.send(replies)
+        if payloads:
+            self.__receivedMsgs.extend(payloads)
+            self.__readerEvent.set()
+        if pos < end:
+            # SOF of a partial frame
+            self.__dev.takeByte()
+            await self.__receiveMsg()
+
     async def __receiveMsg(self, *, cancel=False):
         expires = time.monotonic() + 1.5
         try:
@@ -159,7 +216,8 @@ class SerialProtocol:
         except asyncio.TimeoutError:
             return logging.warning("Timeout while receiving message (1)")
         payload = self.__dev.takeSomeData(length)
-        chksum = payload.pop()
+        chksum = payload[-1]
+        payload = payload[:-1]
         if cancel:
             await self.__sendCan()
         elif calcChecksum(payload) == chksum:
@@ -172,13 +230,13 @@ class SerialProtocol:
 
     async def __sendMsg(self):
         while self.__sendMsgQueue:
-            msg, fut = self.__sendMsgQueue.pop(0)
+            frame, fut = self.__sendMsgQueue.pop(0)
             if not fut.cancelled():
                 break
         else:
             return self.__sendMsgEvent.clear()
         try:
-            await self.__send(msg)
+            await self.__dev.send(frame)
             expires = time.monotonic() + 1.6
             while True:
                 timeout = expires - time.monotonic()
@@ -194,9 +252,7 @@ class SerialProtocol:
                     await self.__receiveMsg(cancel=True)
                     raise Exception(str(FrameType(c)))
                 else:
-                    logging.warning(
-                        f"Skipped byte 0x{c:02x} while expecting ACK"
-                    )
+                    skippedByte(c, "ACK")
         except Exception as ex:
             fut.set_exception(ex)
         finally:
@@ -212,11 +268,9 @@ class SerialProtocol:
     def __sendCan(self) -> typing.Awaitable[None]:
         return self.__dev.send(bytearray((FrameType.CAN.value,)))
 
-    def __send(self, payload: typing.ByteString) -> typing.Awaitable[None]:
-        return self.__dev.send(frameMessage(payload))
-
     def __setReaderFinished(self, *args):
         self.__readerFinished = True
+        self.__readerEvent.set()
 
     def close(self) -> typing.Awaitable[None]:
         return self.__dev.close()
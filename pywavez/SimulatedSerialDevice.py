@@ -0,0 +1,32 @@
+import typing
+
+from asyncinit import asyncinit
+
+from pywavez.SerialDeviceBase import SerialDeviceBase
+from pywavez.SimulatedStick import SimulatedStick
+
+
+@asyncinit
+class SimulatedSerialDevice(SerialDeviceBase):
+    """
+    Serial device connected to a `SimulatedStick` in the same process.
+    """
+
+    async def __init__(self, stick: SimulatedStick):
+        super().__init__()
+        self.stick = stick
+        stick.open(self.__received)
+
+    def __received(self, data: bytes) -> None:
+        self._appendData(data)
+        self._notify()
+
+    async def sendBreak(self) -> bool:
+        self.stick.reset()
+        return True
+
+    async def send(self, data: typing.ByteString) -> None:
+        self.stick.feed(data)
+
+    async def close(self) -> None:
+        self.stick.close()
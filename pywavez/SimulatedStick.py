@@ -0,0 +1,470 @@
+import asyncio
+import logging
+import os
+import random
+import tty
+import typing
+
+from pywavez.SerialProtocol import FrameType, calcChecksum, frameMessage
+from pywavez.VirtualNode import VirtualNode
+from pywavez.util import spawnTask
+from pywavez.zwave import outboundMessageFromBytes
+from pywavez.zwave.Constants import (
+    LibraryType,
+    MessageClass,
+    MessageType,
+    TransmitComplete,
+    UpdateState,
+)
+from pywavez.zwave.Message import Message
+
+_SOF = FrameType.SOF.value
+_ACK = FrameType.ACK.value
+_ACK_BYTES = bytes((_ACK,))
+_NAK_BYTES = bytes((FrameType.NAK.value,))
+_REQUEST = MessageType.REQUEST.value
+
+# WAKE_UP Notification
+_wakeUpNotification = b"\x84\x07"
+
+
+class SimulatedStick:
+    """
+    Simulated Z-Wave controller stick with a network of `VirtualNode`s.
+
+    The stick speaks the serial API functions that `Controller` and
+    `ControllerNode` use, with a host that writes to it with `feed` and
+    reads what it passes to the `output` function given to `open`. See
+    `SimulatedSerialDevice` for a host in the same process, and `openPty`
+    for one at the other end of a pseudo terminal.
+
+    Frames to the host are sent one at a time and retransmitted unless
+    acknowledged. Frames to nodes are sent one at a time over the radio,
+    which takes `latency` seconds plus the node's latency, and are not
+    acknowledged with probability `noAckProbability`, or if the node
+    sleeps. A SEND_DATA request fails if `txQueueLength` frames are
+    waiting to be sent already. Random decisions are made by a
+    `random.Random` seeded with `seed`.
+    """
+
+    def __init__(
+        self,
+        nodes: typing.Iterable[VirtualNode] = (),
+        *,
+        homeId: int = 0xC0FFEE01,
+        controllerNodeId: int = 1,
+        latency: float = 0.01,
+        noAckProbability: float = 0.0,
+        txQueueLength: int = 8,
+        seed: typing.Optional[int] = None,
+    ):
+        self.nodes = {}
+        for node in nodes:
+            if node.id == controllerNodeId or node.id in self.nodes:
+                raise ValueError(f"Duplicate node id: { node.id }")
+            self.nodes[node.id] = node
+        self.homeId = homeId
+        self.controllerNodeId = controllerNodeId
+        self.latency = latency
+        self.noAckProbability = noAckProbability
+        self.txQueueLength = txQueueLength
+        self.random = random.Random(seed)
+        self.rxAckTimeout = 150
+        self.rxByteTimeout = 15
+
+        self.__output = None
+        self.__received = bytearray()
+        self.__ack = None
+        self.__tasks = []
+        self.__ptyMaster = self.__ptySlave = None
+        self.__ptyPending = bytearray()
+
+        self.__requestHandler = {
+            MessageClass.SERIAL_API_GET_INIT_DATA: self.__getInitData,
+            MessageClass.SERIAL_API_SET_TIMEOUTS: self.__setTimeouts,
+            MessageClass.SERIAL_API_GET_CAPABILITIES: self.__getCapabilities,
+            MessageClass.SEND_DATA: self.__sendData,
+            MessageClass.GET_VERSION: self.__getVersion,
+            MessageClass.MEMORY_GET_ID: self.__memoryGetId,
+            MessageClass.GET_NODE_PROTOCOL_INFO: self.__getNodeProtocolInfo,
+            MessageClass.REQUEST_NODE_INFO: self.__requestNodeInfo,
+        }
+
+    def open(self, output: typing.Callable[[bytes], None]) -> None:
+        """
+        Starts the stick, which passes the data for the host to `output`.
+        """
+
+        self.__output = output
+        self.__frames = asyncio.Queue()
+        self.__radio = asyncio.Queue(self.txQueueLength)
+        self.__tasks = [
+            spawnTask(self.__writerImpl()),
+            spawnTask(self.__radioImpl()),
+        ]
+        for node in self.nodes.values():
+            if not node.listening:
+                self.__tasks.append(spawnTask(self.__wakeUpImpl(node)))
+
+    def close(self) -> None:
+        for task in self.__tasks:
+            task.cancel()
+        self.__tasks = []
+        self.__output = None
+        if self.__ptyMaster is not None:
+            loop = asyncio.get_event_loop()
+            loop.remove_reader(self.__ptyMaster)
+            loop.remove_writer(self.__ptyMaster)
+            os.close(self.__ptyMaster)
+            os.close(self.__ptySlave)
+            self.__ptyMaster = self.__ptySlave = None
+
+    def reset(self) -> None:
+        """Discards partly received data, as a break does."""
+
+        self.__received.clear()
+
+    def feed(self, data: typing.ByteString) -> None:
+        """Receives data from the host."""
+
+        buf = self.__received
+        buf += data
+        end = len(buf)
+        pos = 0
+        while pos < end:
+            c = buf[pos]
+            if c != _SOF:
+                if c == _ACK:
+                    self.__acknowledged(True)
+                elif c in _failures:
+                    self.__acknowledged(False)
+                pos += 1
+                continue
+            if pos + 2 > end:
+                break
+            length = buf[pos + 1] or 256
+            if pos + 2 + length > end:
+                break
+            payload = bytes(buf[pos + 2 : pos + 1 + length])
+            if calcChecksum(payload) == buf[pos + 1 + length]:
+                self.__write(_ACK_BYTES)
+                self.__handleRequest(payload)
+            else:
+                self.__write(_NAK_BYTES)
+            pos += 2 + length
+        del buf[:pos]
+
+    def receiveFromNode(self, nodeId: int, payload: typing.ByteString):
+        """Passes a command received from node `nodeId` to the host."""
+
+        self.__send(
+            Message.ApplicationCommandHandlerRequest(
+                status=0, nodeId=nodeId, payload=bytes(payload)
+            )
+        )
+
+    def openPty(self) -> str:
+        """
+        Opens the stick for a host at the other end of a pseudo terminal.
+        Returns the path of the terminal device to open.
+        """
+
+        master, slave = os.openpty()
+        tty.setraw(master)
+        os.set_blocking(master, False)
+        self.__ptyMaster, self.__ptySlave = master, slave
+        asyncio.get_event_loop().add_reader(master, self.__ptyRead)
+        self.open(self.__ptyWrite)
+        return os.ttyname(slave)
+
+    def __ptyRead(self):
+        try:
+            data = os.read(self.__ptyMaster, 4096)
+        except BlockingIOError:
+            return
+        self.feed(data)
+
+    def __ptyWrite(self, data):
+        pending = self.__ptyPending
+        if not pending:
+            try:
+                written = os.write(self.__ptyMaster, data)
+            except BlockingIOError:
+                written = 0
+            data = data[written:]
+            if not data:
+                return
+            asyncio.get_event_loop().add_writer(
+                self.__ptyMaster, self.__ptyFlush
+            )
+        pending += data
+
+    def __ptyFlush(self):
+        pending = self.__ptyPending
+        try:
+            del pending[: os.write(self.__ptyMaster, pending)]
+        except BlockingIOError:
+            return
+        if not pending:
+            asyncio.get_event_loop().remove_writer(self.__ptyMaster)
+
+    def __write(self, data):
+        if self.__output is not None:
+            self.__output(data)
+
+    def __acknowledged(self, ok):
+        if self.__ack is not None and not self.__ack.done():
+            self.__ack.set_result(ok)
+
+    def __send(self, msg):
+        self.__frames.put_nowait(bytes(frameMessage(msg.toBytes())))
+
+    async def __writerImpl(self):
+        loop = asyncio.get_event_loop()
+        while True:
+            frame = await self.__frames.get()
+            for _ in range(3):
+                self.__ack = loop.create_future()
+                self.__write(frame)
+                try:
+                    if await asyncio.wait_for(self.__ack, 1.6):
+                        break
+                except asyncio.TimeoutError:
+                    pass
+            else:
+                logging.warning("SimulatedStick: frame not acknowledged")
+            self.__ack = None
+
+    def __handleRequest(self, payload):
+        if len(payload) < 2 or payload[0] != _REQUEST:
+            logging.warning(f"SimulatedStick: bad request { payload.hex() }")
+            return
+        try:
+            handler = self.__requestHandler[MessageClass(payload[1])]
+            msg = outboundMessageFromBytes(payload)
+        except Exception as ex:
+            logging.warning(
+                f"SimulatedStick: unsupported request { payload.hex() }: "
+                f"{ ex !r}"
+            )
+            return
+        handler(msg)
+
+    def __getCapabilities(self, msg):
+        self.__send(
+            Message.SerialApiGetCapabilitiesResponse(
+                serialApiVersion=1,
+                serialApiRevision=0,
+                manufacturerId=0,
+                manufacturerProduct=0,
+                manufacturerProductId=0,
+                supportedFunctions=[c.value for c in self.__requestHandler],
+            )
+        )
+
+    def __memoryGetId(self, msg):
+        self.__send(
+            Message.MemoryGetIdResponse(
+                homeId=self.homeId, controllerNodeId=self.controllerNodeId
+            )
+        )
+
+    def __getVersion(self, msg):
+        self.__send(
+            Message.GetVersionResponse(
+                libraryVersion="Z-Wave 4.05",
+                libraryType=LibraryType.STATIC_CONTROLLER,
+            )
+        )
+
+    def __getInitData(self, msg):
+        self.__send(
+            Message.SerialApiGetInitDataResponse(
+                serialApiApplicationVersion=5,
+                isSlave=False,
+                timerSupport=True,
+                isSecondary=False,
+                isSIS=True,
+                nodes=sorted((self.controllerNodeId, *self.nodes)),
+                chipType=5,
+                chipVersion=0,
+            )
+        )
+
+    def __setTimeouts(self, msg):
+        self.__send(
+            Message.SerialApiSetTimeoutsResponse(
+                oldRxAckTimeout=self.rxAckTimeout,
+                oldRxByteTimeout=self.rxByteTimeout,
+            )
+        )
+        self.rxAckTimeout = msg.rxAckTimeout
+        self.rxByteTimeout = msg.rxByteTimeout
+
+    def __getNodeProtocolInfo(self, msg):
+        node = self.nodes.get(msg.nodeId)
+        self.__send(
+            Message.GetNodeProtocolInfoResponse(
+                version=0 if node is None else 3,
+                maxBaudRate=0 if node is None else 2,
+                routing=node is not None,
+                listening=node is not None and node.listening,
+                security=False,
+                controller=False,
+                specificDevice=node is not None,
+                routingSlave=node is not None,
+                beamCapability=False,
+                sensor250ms=False,
+                sensor1000ms=False,
+                optionalFunctionality=node is not None,
+                reserved=0,
+                # routing slave
+                basic=0 if node is None else 4,
+                generic=0 if node is None else node.genericDeviceClass,
+                specific=0 if node is None else node.specificDeviceClass,
+            )
+        )
+
+    def __sendData(self, msg):
+        ok = self.__transmit(msg.nodeId, msg.data, msg.funcId)
+        self.__send(Message.SendDataResponse(retVal=ok))
+
+    def __requestNodeInfo(self, msg):
+        ok = self.__transmit(msg.nodeId, None, 0)
+        self.__send(Message.RequestNodeInfoResponse(success=ok))
+
+    def __transmit(self, nodeId, data, funcId):
+        """
+        Queues `data` for node `nodeId`, or a request for its node
+        information if `data` is None.
+        """
+
+        try:
+            self.__radio.put_nowait((nodeId, data, funcId))
+        except asyncio.QueueFull:
+            return False
+        return True
+
+    async def __radioImpl(self):
+        loop = asyncio.get_event_loop()
+        while True:
+            nodeId, data, funcId = await self.__radio.get()
+            node = self.nodes.get(nodeId)
+            if node is None:
+                latency = self.latency
+                acknowledged = False
+            else:
+                latency = self.latency + node.latency
+                acknowledged = node.awake and self.random.random() >= 1 - (
+                    1 - self.noAckProbability
+                ) * (1 - node.lossRate)
+            if not acknowledged:
+                # as long as three attempts take
+                await asyncio.sleep(3 * latency)
+                if data is None:
+                    self.__send(
+                        Message.ApplicationUpdateRequest(
+                            status=UpdateState.NODE_INFO_REQ_FAILED,
+                            nodeId=0,
+                            basic=None,
+                            generic=None,
+                            specific=None,
+                            commandClasses=[],
+                        )
+                    )
+                elif funcId:
+                    self.__sendDataCallback(funcId, TransmitComplete.NO_ACK)
+                continue
+
+            await asyncio.sleep(latency)
+            if data is None:
+                self.__send(
+                    Message.ApplicationUpdateRequest(
+                        status=UpdateState.NODE_INFO_RECEIVED,
+                        nodeId=nodeId,
+                        basic=4,
+                        generic=node.genericDeviceClass,
+                        specific=node.specificDeviceClass,
+                        commandClasses=list(node.commandClasses),
+                    )
+                )
+                continue
+            if funcId:
+                self.__sendDataCallback(funcId, TransmitComplete.OK)
+            try:
+                replies = node.handleCommand(data)
+            except Exception as ex:
+                logging.warning(
+                    f"SimulatedStick: node { nodeId } failed to handle "
+                    f"{ bytes(data).hex() }: { ex !r}"
+                )
+                continue
+            for reply in replies:
+                loop.call_later(latency, self.receiveFromNode, nodeId, reply)
+
+    def __sendDataCallback(self, funcId, txStatus):
+        self.__send(
+            Message.SendDataIncomingRequest(
+                funcId=funcId, txStatus=txStatus, extraData=b""
+            )
+        )
+
+    async def __wakeUpImpl(self, node):
+        # spread the first wake-ups over the interval
+        await asyncio.sleep(self.random.uniform(0, node.wakeUpInterval))
+        while True:
+            node.awake = True
+            self.receiveFromNode(node.id, _wakeUpNotification)
+            await asyncio.sleep(node.awakeTime)
+            node.awake = False
+            await asyncio.sleep(max(0, node.wakeUpInterval - node.awakeTime))
+
+
+_failures = frozenset((FrameType.NAK.value, FrameType.CAN.value))
+
+
+async def amain():
+    import argparse
+    from pywavez.VirtualNode import makeVirtualNodes
+
+    parser = argparse.ArgumentParser(
+        description="Serves a simulated controller stick on a pseudo "
+        "terminal, whose path is printed."
+    )
+    parser.add_argument("--nodes", type=int, default=20)
+    parser.add_argument("--sleeping", type=int, default=0)
+    parser.add_argument("--multi-channel", type=int, default=0)
+    parser.add_argument("--lossy", type=int, default=0)
+    parser.add_argument("--slow", type=int, default=0)
+    parser.add_argument("--wake-up-interval", type=float, default=60.0)
+    parser.add_argument("--latency", type=float, default=0.01)
+    parser.add_argument("--no-ack", type=float, default=0.0)
+    parser.add_argument("--seed", type=int)
+    options = parser.parse_args()
+
+    stick = SimulatedStick(
+        makeVirtualNodes(
+            options.nodes,
+            sleeping=options.sleeping,
+            multiChannel=options.multi_channel,
+            lossy=options.lossy,
+            slow=options.slow,
+            wakeUpInterval=options.wake_up_interval,
+        ),
+        latency=options.latency,
+        noAckProbability=options.no_ack,
+        seed=options.seed,
+    )
+    print(stick.openPty(), flush=True)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        stick.close()
+
+
+def main():
+    asyncio.run(amain())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import asyncio
+import logging
+import threading
+import typing
+
+from asyncinit import asyncinit
+import serial
+
+from pywavez.SerialDeviceBase import SerialDeviceBase
+
+
+@asyncinit
+class ThreadSerialDevice(SerialDeviceBase):
+    """
+    Serial device read by a dedicated thread doing blocking reads with
+    pyserial, which passes the data to the event loop with
+    `call_soon_threadsafe`. Writes block too, e.g. while the stick holds
+    CTS off, so they are done in the event loop's default executor.
+    """
+
+    async def __init__(self, device: str):
+        super().__init__()
+
+        self.__loop = asyncio.get_event_loop()
+        self.__serial = await self.__loop.run_in_executor(
+            None,
+            lambda: serial.serial_for_url(
+                device, baudrate=115200, rtscts=True
+            ),
+        )
+        self.__closing = False
+        self.__writeLock = asyncio.Lock()
+        self.__readerThread = threading.Thread(
+            target=self.__readerImpl,
+            name=f"ThreadSerialDevice({ device })",
+            daemon=True,
+        )
+        self.__readerThread.start()
+
+    def __readerImpl(self) -> None:
+        ser = self.__serial
+        try:
+            while not self.__closing:
+                # blocks until at least one byte is available
+                data = ser.read(max(1, ser.in_waiting))
+                if data:
+                    self.__loop.call_soon_threadsafe(self.__received, data)
+        except Exception as ex:
+            if not self.__closing:
+                logging.warning(f"ThreadSerialDevice read failed: { ex !r}")
+        finally:
+            try:
+                self.__loop.call_soon_threadsafe(self.__received, b"")
+            except RuntimeError:
+                # event loop closed
+                pass
+
+    def __received(self, data: bytes) -> None:
+        if data:
+            self._appendData(data)
+            self._notify()
+        else:
+            self._setEOF()
+
+    async def sendBreak(self) -> bool:
+        async with self.__writeLock:
+            self.__serial.break_condition = True
+            await asyncio.sleep(0.25)
+            self.__serial.break_condition = False
+        return True
+
+    async def send(self, data: typing.ByteString) -> None:
+        async with self.__writeLock:
+            await self.__loop.run_in_executor(None, self.__serial.write, data)
+
+    async def close(self) -> None:
+        self.__closing = True
+        # not every URL handler can cancel a read, closing the port ends it
+        cancelRead = getattr(self.__serial, "cancel_read", None)
+        if cancelRead is None:
+            self.__serial.close()
+        else:
+            cancelRead()
+        await self.__loop.run_in_executor(None, self.__readerThread.join)
+        self.__serial.close()
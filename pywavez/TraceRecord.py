@@ -0,0 +1,49 @@
+import collections
+import enum
+import typing
+
+
+class Direction(enum.IntEnum):
+    # received from the controller stick
+    INBOUND = 0
+    # sent to the controller stick
+    OUTBOUND = 1
+
+
+# A chunk of serial traffic. `timestamp` is monotonic time in nanoseconds.
+TraceRecord = collections.namedtuple(
+    "TraceRecord", ("timestamp", "direction", "data")
+)
+
+_textDirections = {"<": Direction.INBOUND, ">": Direction.OUTBOUND}
+
+
+def readTextTrace(path: str) -> typing.Iterator[TraceRecord]:
+    """
+    Reads a trace in text form: one record per line, made of the timestamp
+    in nanoseconds, `<` for inbound or `>` for outbound data, and the data
+    in hex. Empty lines and lines starting with `#` are skipped.
+    """
+
+    with open(path) as f:
+        for lineno, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            try:
+                timestamp, direction, data = line.split()
+                yield TraceRecord(
+                    int(timestamp),
+                    _textDirections[direction],
+                    bytes.fromhex(data),
+                )
+            except (KeyError, ValueError):
+                raise ValueError(f"{ path }:{ lineno }: invalid trace record")
+
+
+def writeTextTrace(
+    records: typing.Iterable[TraceRecord], f: typing.TextIO
+) -> None:
+    for timestamp, direction, data in records:
+        arrow = "<" if direction == Direction.INBOUND else ">"
+        f.write(f"{ timestamp } { arrow } { bytes(data).hex() }\n")
@@ -0,0 +1,272 @@
+import typing
+
+from pywavez.zwave import _command_classes, getCommandClassVersion
+from pywavez.zwave.Constants import CommandClass
+
+_defaultCommandClasses = (
+    CommandClass.SWITCH_BINARY,
+    CommandClass.MANUFACTURER_SPECIFIC,
+    CommandClass.VERSION,
+)
+
+
+class VirtualNode:
+    """
+    A node of the network simulated by `SimulatedStick`.
+
+    The node supports the command classes `commandClasses` and has an
+    endpoint for each sequence of command classes in `endpoints`, which
+    makes it a multi-channel node. Command classes are reported in the
+    highest version pywavez knows, unless given in `versions`.
+
+    A node that is not `listening` sleeps, waking up every
+    `wakeUpInterval` seconds, until it is told there is no more
+    information or `awakeTime` seconds have passed.
+
+    Frames sent to the node are not acknowledged with probability
+    `lossRate`, and take `latency` seconds more than the stick's radio
+    latency.
+
+    The node keeps a value per endpoint, which BASIC and SWITCH_BINARY
+    commands set and report.
+    """
+
+    def __init__(
+        self,
+        id: int,
+        *,
+        commandClasses: typing.Sequence[int] = _defaultCommandClasses,
+        endpoints: typing.Sequence[typing.Sequence[int]] = (),
+        versions: typing.Optional[typing.Mapping[int, int]] = None,
+        listening: bool = True,
+        wakeUpInterval: float = 60.0,
+        awakeTime: float = 10.0,
+        lossRate: float = 0.0,
+        latency: float = 0.0,
+        manufacturer: typing.Tuple[int, int, int] = (0x0086, 0x0003, 0x0006),
+        genericDeviceClass: int = 0x10,
+        specificDeviceClass: int = 0x01,
+    ):
+        if not 2 <= id <= 232:
+            raise ValueError(f"Invalid node id: { id }")
+        self.id = id
+        commandClasses = list(commandClasses)
+        if endpoints and CommandClass.MULTI_CHANNEL not in commandClasses:
+            commandClasses.append(CommandClass.MULTI_CHANNEL)
+        if not listening and CommandClass.WAKE_UP not in commandClasses:
+            commandClasses.append(CommandClass.WAKE_UP)
+        self.commandClasses = tuple(commandClasses)
+        self.endpoints = tuple(tuple(cc) for cc in endpoints)
+        self.versions = {}
+        for cc in set(self.commandClasses).union(*self.endpoints):
+            try:
+                self.versions[cc] = max(_command_classes[cc].versions)
+            except KeyError:
+                self.versions[cc] = 1
+        if versions is not None:
+            self.versions.update(versions)
+        self.listening = listening
+        self.wakeUpInterval = wakeUpInterval
+        self.awakeTime = awakeTime
+        self.lossRate = lossRate
+        self.latency = latency
+        self.manufacturer = manufacturer
+        self.genericDeviceClass = genericDeviceClass
+        self.specificDeviceClass = specificDeviceClass
+
+        # whether a sleeping node is awake, managed by the stick
+        self.awake = listening
+        # endpoint -> value
+        self.values = {}
+
+        self.commandHandler = {
+            (CommandClass.BASIC, 0x01): self.setHandler,
+            (CommandClass.BASIC, 0x02): self.getHandler,
+            (CommandClass.SWITCH_BINARY, 0x01): self.setHandler,
+            (CommandClass.SWITCH_BINARY, 0x02): self.getHandler,
+            (
+                CommandClass.MANUFACTURER_SPECIFIC,
+                0x04,
+            ): self.manufacturerSpecificGetHandler,
+            (
+                CommandClass.MULTI_CHANNEL,
+                0x07,
+            ): self.multiChannelEndPointGetHandler,
+            (
+                CommandClass.MULTI_CHANNEL,
+                0x09,
+            ): self.multiChannelCapabilityGetHandler,
+            (
+                CommandClass.MULTI_CHANNEL,
+                0x0D,
+            ): self.multiChannelCmdEncapHandler,
+            (CommandClass.VERSION, 0x13): self.versionCommandClassGetHandler,
+            (CommandClass.WAKE_UP, 0x08): self.wakeUpNoMoreInformationHandler,
+        }
+
+    def commandClassesOf(self, endpoint: int) -> typing.Tuple[int, ...]:
+        if endpoint == 0:
+            return self.commandClasses
+        return self.endpoints[endpoint - 1]
+
+    def commandClass(self, cc: int):
+        return getCommandClassVersion(cc, self.versions[cc])
+
+    def handleCommand(
+        self, payload: typing.ByteString, endpoint: int = 0
+    ) -> typing.Sequence[bytes]:
+        """
+        Handles a command sent to `endpoint` of this node. Returns the
+        payloads of the commands sent back to the controller.
+        """
+
+        if (
+            len(payload) < 2
+            or endpoint > len(self.endpoints)
+            or payload[0] not in self.versions
+        ):
+            return ()
+        handler = self.commandHandler.get((payload[0], payload[1]))
+        if handler is None:
+            return ()
+        # The controller may send the command in an older version of the
+        # command class, with fewer fields.
+        for version in range(self.versions[payload[0]], 0, -1):
+            try:
+                cmd = getCommandClassVersion(payload[0], version).commands[
+                    payload[1]
+                ]
+                cmd = cmd.fromBytes(payload)
+            except Exception:
+                continue
+            return handler(cmd, endpoint)
+        return ()
+
+    def setHandler(self, cmd, endpoint):
+        self.values[endpoint] = int(cmd.value)
+        return ()
+
+    def getHandler(self, cmd, endpoint):
+        value = self.values.get(endpoint, 0)
+        report = self.commandClass(cmd.CommandClassCode).Report
+        args = {"value": value}
+        if "targetValue" in report.__slots__:
+            args.update(targetValue=value, duration=0)
+        return (bytes(report(**args).toBytes()),)
+
+    def manufacturerSpecificGetHandler(self, cmd, endpoint):
+        manufacturerId, productTypeId, productId = self.manufacturer
+        report = self.commandClass(CommandClass.MANUFACTURER_SPECIFIC).Report(
+            manufacturerId=manufacturerId,
+            productTypeId=productTypeId,
+            productId=productId,
+        )
+        return (bytes(report.toBytes()),)
+
+    def multiChannelEndPointGetHandler(self, cmd, endpoint):
+        report = self.commandClass(CommandClass.MULTI_CHANNEL).EndPointReport
+        args = {
+            "identical": False,
+            "dynamic": False,
+            "individualEndPoints": len(self.endpoints),
+        }
+        if "aggregatedEndPoints" in report.__slots__:
+            args["aggregatedEndPoints"] = 0
+        return (bytes(report(**args).toBytes()),)
+
+    def multiChannelCapabilityGetHandler(self, cmd, endpoint):
+        if not 1 <= cmd.endPoint <= len(self.endpoints):
+            return ()
+        mc = self.commandClass(CommandClass.MULTI_CHANNEL)
+        report = mc.CapabilityReport(
+            endPoint=cmd.endPoint,
+            dynamic=False,
+            genericDeviceClass=self.genericDeviceClass,
+            specificDeviceClass=self.specificDeviceClass,
+            commandClass=bytes(self.endpoints[cmd.endPoint - 1]),
+        )
+        return (bytes(report.toBytes()),)
+
+    def multiChannelCmdEncapHandler(self, cmd, endpoint):
+        if endpoint != 0 or cmd.bitAddress:
+            return ()
+        destination = cmd.destinationEndPoint
+        payload = bytes((cmd.commandClass, cmd.command)) + cmd.parameter
+        encap = self.commandClass(
+            CommandClass.MULTI_CHANNEL
+        ).MultiChannelCmdEncap
+        return tuple(
+            bytes(
+                encap(
+                    sourceEndPoint=destination,
+                    destinationEndPoint=cmd.sourceEndPoint,
+                    bitAddress=False,
+                    commandClass=reply[0],
+                    command=reply[1],
+                    parameter=reply[2:],
+                ).toBytes()
+            )
+            for reply in self.handleCommand(payload, destination)
+        )
+
+    def versionCommandClassGetHandler(self, cmd, endpoint):
+        cc = cmd.requestedCommandClass
+        version = 0
+        if cc in self.commandClassesOf(endpoint) or cc == CommandClass.VERSION:
+            version = self.versions.get(cc, 1)
+        report = getCommandClassVersion(
+            CommandClass.VERSION, 1
+        ).CommandClassReport(
+            requestedCommandClass=cc, commandClassVersion=version
+        )
+        return (bytes(report.toBytes()),)
+
+    def wakeUpNoMoreInformationHandler(self, cmd, endpoint):
+        if not self.listening:
+            self.awake = False
+        return ()
+
+
+def makeVirtualNodes(
+    count: int,
+    *,
+    sleeping: int = 0,
+    multiChannel: int = 0,
+    lossy: int = 0,
+    slow: int = 0,
+    wakeUpInterval: float = 60.0,
+    lossRate: float = 0.2,
+    slowLatency: float = 0.2,
+) -> typing.List[VirtualNode]:
+    """
+    Returns `count` nodes with ids from 2 upward. Of these, the first
+    `sleeping` sleep, the next `multiChannel` have two switch endpoints,
+    and independently of that, the last `lossy` lose frames at `lossRate`
+    and the `slow` ones before them have `slowLatency` more latency.
+    """
+
+    if count > 231:
+        raise ValueError("A network has at most 231 nodes besides the stick")
+    if sleeping + multiChannel > count or lossy + slow > count:
+        raise ValueError("More special nodes than nodes")
+    nodes = []
+    for i in range(count):
+        args = {}
+        if i < sleeping:
+            args.update(
+                listening=False,
+                wakeUpInterval=wakeUpInterval,
+                commandClasses=(
+                    CommandClass.BATTERY,
+                    CommandClass.MANUFACTURER_SPECIFIC,
+                    CommandClass.VERSION,
+                ),
+            )
+        elif i < sleeping + multiChannel:
+            args["endpoints"] = ((CommandClass.SWITCH_BINARY,),) * 2
+        if i >= count - lossy:
+            args["lossRate"] = lossRate
+        elif i >= count - lossy - slow:
+            args["latency"] = slowLatency
+        nodes.append(VirtualNode(i + 2, **args))
+    return nodes
@@ -1,4 +1,7 @@
 from .Controller import Controller  # noqa: F401
 from .NodeUpdate import NodeUpdate  # noqa: F401
+from .PreparedCommand import PreparedCommand  # noqa: F401
 from .ReceivedCommand import ReceivedCommand  # noqa: F401
+from .serialization.DecodeCache import DecodeCache  # noqa: F401
+from .serialization.ObjectPool import ObjectPool  # noqa: F401
 from .zwave.Constants import CommandClass  # noqa: F401
@@ -0,0 +1,101 @@
+from .ParseError import ParseError
+
+
+class Batch:
+    """
+    State of decoding a batch of messages column by column with NumPy.
+
+    The messages are copied into the rows of a zero-padded two-dimensional
+    array. The read position is an int as long as it is the same for all
+    messages, and becomes an array of positions after the first item of
+    variable width.
+    """
+
+    # Reads of variable width items may go up to this many bytes beyond the
+    # end of the longest message, only to be masked out afterwards.
+    padding = 8
+
+    def __init__(self, np, payloads):
+        self.np = np
+        count = len(payloads)
+        self.lengths = np.fromiter(map(len, payloads), np.intp, count)
+        width = int(self.lengths.max()) if count else 0
+        self.buf = np.zeros((count, width + self.padding), np.uint8)
+        self.buf[np.arange(width + self.padding) < self.lengths[:, None]] = (
+            np.frombuffer(b"".join(payloads), np.uint8)
+        )
+        self.rows = np.arange(count)
+        self.pos = 0
+        self.columns = {}
+        # boolean array of the messages the current item is read from, or
+        # None for all messages
+        self.active = None
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def check(self, failed, message):
+        """
+        Raises ParseError if `failed` (a boolean array) is true for any of
+        the active messages.
+        """
+
+        if self.active is not None:
+            failed = failed & self.active
+        if failed.any():
+            index = int(self.np.argmax(failed))
+            raise ParseError(f"message { index }: { message }")
+
+    def advance(self, length):
+        """
+        Advances the read position by `length` bytes (an int or an array)
+        and returns the position before advancing.
+        """
+
+        start = self.pos
+        self.pos = start + length
+        self.check(self.pos > self.lengths, "position beyond data buffer")
+        return start
+
+    def byte(self, pos):
+        """Returns the bytes at position `pos` (an int or an array)."""
+
+        if type(pos) is int:
+            return self.buf[:, pos]
+        return self.buf[self.rows, pos]
+
+    def uint(self, start, length, signed=False):
+        """
+        Returns the big-endian integers of `length` bytes at position
+        `start`. `length` may be an int or an array of up to eight bytes.
+        """
+
+        np = self.np
+        value = np.zeros(len(self), np.int64)
+        if type(length) is int:
+            for i in range(length):
+                value = (value << 8) | self.byte(start + i)
+            if signed and 0 < length < 8:
+                bits = 8 * length
+                value -= ((value >> (bits - 1)) & 1) << bits
+        else:
+            self.check(length > 8, "integer too large")
+            for i in range(int(length.max(initial=0))):
+                value = np.where(
+                    i < length, (value << 8) | self.byte(start + i), value
+                )
+            if signed:
+                bits = 8 * length.astype(np.int64)
+                sign = (value >> np.maximum(bits - 1, 0)) & 1
+                value -= np.where(bits < 64, sign << np.minimum(bits, 63), 0)
+        return value
+
+    def value(self, key):
+        """
+        Returns the column of a field or virtualfield read before, or None
+        if there is none, like evaluating a `Value`.
+        """
+
+        if key == "_bytesRemaining":
+            return self.lengths - self.pos
+        return self.columns.get(key)
@@ -0,0 +1,152 @@
+import collections.abc
+import itertools
+import typing
+
+from .ParseError import ParseError
+
+# translation of the digits of `bin()` into selectors for
+# `itertools.compress`
+_binaryDigits = bytes.maketrans(b"01", b"\x00\x01")
+
+
+class Bitset(collections.abc.Set):
+    """
+    Immutable set of non-negative integers, stored as the bits of an int.
+
+    This is the value of `bitset` fields without enum: node ids and numbers
+    of supported functions take one bit each, and membership tests are a
+    shift and mask. A Bitset compares equal to a set or frozenset with the
+    same elements, and supports the operators of `collections.abc.Set`.
+    """
+
+    __slots__ = ("_bits",)
+
+    def __init__(self, elements: typing.Iterable[int] = ()):
+        if isinstance(elements, Bitset):
+            bits = elements._bits
+        else:
+            bits = 0
+            for x in elements:
+                if x < 0:
+                    raise ValueError(f"negative element in Bitset: { x !r}")
+                bits |= 1 << x
+        self._bits = bits
+
+    @classmethod
+    def fromInt(cls, bits: int) -> "Bitset":
+        """Returns the Bitset containing the numbers of the bits set."""
+
+        if bits < 0:
+            raise ValueError("negative int passed to Bitset.fromInt")
+        obj = cls.__new__(cls)
+        obj._bits = bits
+        return obj
+
+    @classmethod
+    def fromBytes(cls, ba: typing.ByteString, offset: int = 0) -> "Bitset":
+        """
+        Decodes the bitmask `ba`, in which bit `b` of byte `i` stands for
+        the number `i * 8 + b + offset`.
+        """
+
+        return cls.fromInt(int.from_bytes(ba, "little") << offset)
+
+    def toBytes(self, length: int, offset: int = 0) -> bytearray:
+        """
+        Returns the bitmask of `length` bytes, the reverse of `fromBytes`.
+        """
+
+        bits = self._bits
+        if bits & ((1 << offset) - 1) or bits >> (length * 8 + offset):
+            raise ParseError("bit number out of range")
+        return bytearray((bits >> offset).to_bytes(length, "little"))
+
+    def toInt(self) -> int:
+        return self._bits
+
+    def __contains__(self, x):
+        try:
+            return x >= 0 and (self._bits >> x) & 1 == 1
+        except TypeError:
+            return False
+
+    def __iter__(self):
+        # bin() lists the bits from the highest to the lowest, the reverse
+        # of the numbers counted by itertools.count()
+        selectors = bin(self._bits)[:1:-1].encode().translate(_binaryDigits)
+        return itertools.compress(itertools.count(), selectors)
+
+    def __len__(self):
+        return bin(self._bits).count("1")
+
+    def __bool__(self):
+        return self._bits != 0
+
+    def __repr__(self):
+        return f"Bitset({ list(self) !r})"
+
+    def __reduce__(self):
+        return Bitset.fromInt, (self._bits,)
+
+    def max(self) -> int:
+        """Returns the largest element, like `max(self)` but faster."""
+
+        if not self._bits:
+            raise ValueError("max() of empty Bitset")
+        return self._bits.bit_length() - 1
+
+    def __eq__(self, other):
+        if isinstance(other, Bitset):
+            return self._bits == other._bits
+        return super().__eq__(other)
+
+    __hash__ = collections.abc.Set._hash
+
+    def __le__(self, other):
+        if isinstance(other, Bitset):
+            return self._bits & ~other._bits == 0
+        return super().__le__(other)
+
+    def __lt__(self, other):
+        if isinstance(other, Bitset):
+            return self._bits != other._bits and self <= other
+        return super().__lt__(other)
+
+    def __ge__(self, other):
+        if isinstance(other, Bitset):
+            return other <= self
+        return super().__ge__(other)
+
+    def __gt__(self, other):
+        if isinstance(other, Bitset):
+            return other < self
+        return super().__gt__(other)
+
+    def __and__(self, other):
+        if isinstance(other, Bitset):
+            return Bitset.fromInt(self._bits & other._bits)
+        return super().__and__(other)
+
+    def __or__(self, other):
+        if isinstance(other, Bitset):
+            return Bitset.fromInt(self._bits | other._bits)
+        return super().__or__(other)
+
+    def __sub__(self, other):
+        if isinstance(other, Bitset):
+            return Bitset.fromInt(self._bits & ~other._bits)
+        return super().__sub__(other)
+
+    def __xor__(self, other):
+        if isinstance(other, Bitset):
+            return Bitset.fromInt(self._bits ^ other._bits)
+        return super().__xor__(other)
+
+    __rand__ = __and__
+    __ror__ = __or__
+    __rxor__ = __xor__
+
+    def isdisjoint(self, other):
+        if isinstance(other, Bitset):
+            return self._bits & other._bits == 0
+        return super().isdisjoint(other)
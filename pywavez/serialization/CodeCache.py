@@ -0,0 +1,124 @@
+import atexit
+import hashlib
+import logging
+import marshal
+import os
+import sys
+import time
+
+from ..__version__ import version
+
+
+class CodeCache:
+    """
+    Cache of the code objects of generated functions, kept in a file
+    between runs.
+
+    Code objects are keyed on a hash of their source and file name, so a
+    changed description, or a change to the code generator, just misses
+    the cache: the source is compiled as usual. At exit, the code objects
+    compiled or used in this run are merged into the file, which processes
+    using different parts of pywavez thus share. Each entry records the day
+    it was last used, and entries not used for `maxAge` days are dropped.
+    """
+
+    def __init__(self, path, maxAge=30):
+        self.path = path
+        self.maxAge = maxAge
+        self.hits = 0
+        self.misses = 0
+        # key -> (day last used, code object)
+        self.__codes = None
+        self.__dirty = False
+
+    def compile(self, source, filename):
+        key = hashlib.sha1(f"{ filename }\0{ source }".encode()).digest()
+        if self.__codes is None:
+            self.__codes = self.__load()
+            if self.path is not None:
+                atexit.register(self.save)
+        today = _today()
+        entry = self.__codes.get(key)
+        if entry is not None:
+            self.hits += 1
+            day, code = entry
+            if day != today:
+                self.__codes[key] = today, code
+                self.__dirty = True
+            return code
+
+        self.misses += 1
+        code = compile(source, filename, "exec")
+        self.__codes[key] = today, code
+        self.__dirty = True
+        return code
+
+    def __load(self):
+        if self.path is None:
+            return {}
+        try:
+            with open(self.path, "rb") as f:
+                codes = marshal.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, EOFError, ValueError, TypeError) as ex:
+            logging.debug(f"Not using code cache { self.path }: { ex !r}")
+            return {}
+        if not isinstance(codes, dict) or not all(
+            type(entry) is tuple and len(entry) == 2
+            for entry in codes.values()
+        ):
+            return {}
+        return codes
+
+    def save(self):
+        """
+        Merges the code objects compiled or used in this run into the file,
+        if that changes it.
+        """
+
+        if self.path is None or not self.__dirty:
+            return
+        self.__dirty = False
+        # other processes may have written the file since it was read
+        codes = self.__load()
+        for key, entry in self.__codes.items():
+            other = codes.get(key)
+            if other is None or other[0] < entry[0]:
+                codes[key] = entry
+        oldest = _today() - self.maxAge
+        self.__codes = {
+            key: entry for key, entry in codes.items() if entry[0] >= oldest
+        }
+        tmppath = f"{ self.path }.{ os.getpid() }.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(tmppath, "wb") as f:
+                marshal.dump(self.__codes, f)
+            os.replace(tmppath, self.path)
+        except OSError as ex:
+            logging.debug(f"Cannot write code cache { self.path }: { ex !r}")
+
+
+def _today():
+    return int(time.time() // 86400)
+
+
+def defaultCachePath():
+    """
+    Returns the path of the code cache file in the directory named by the
+    environment variable PYWAVEZ_CACHE_DIR. Returns None, disabling the
+    file, if PYWAVEZ_CACHE_DIR is not set or empty.
+    """
+
+    directory = os.environ.get("PYWAVEZ_CACHE_DIR")
+    if not directory:
+        return None
+    # marshal data is specific to the Python version
+    return os.path.join(
+        directory,
+        f"codecache-{ version }-{ sys.implementation.cache_tag }.marshal",
+    )
+
+
+codeCache = CodeCache(defaultCachePath())
@@ -0,0 +1,103 @@
+import contextlib
+import keyword
+
+from .CodeCache import codeCache
+
+
+class NotCompilable(Exception):
+    pass
+
+
+class CodeGenerator:
+    """
+    Accumulates the source of one generated function.
+
+    Constants that cannot be written as literals are stored in a namespace
+    under generated names (``__c0``, ``__c1``, ...) and become globals of
+    the generated function. Temporary variables are named ``__t0``,
+    ``__t1``, ... - field names must not start with a double underscore,
+    so neither can clash with the local variables holding field values.
+    """
+
+    def __init__(self, funcname, args):
+        self.__lines = [f"def { funcname }({ ', '.join(args) }):"]
+        self.__indent = 1
+        self.__tmpcount = 0
+        self.__prologue_index = len(self.__lines)
+        self.__prologue = []
+        self.namespace = {}
+        self.__constants = {}
+        self.assigned = set()
+        # names of the local variables holding field values
+        self.localNames = set()
+        # whether writers append to `__ba` rather than store at `__pos`
+        self.appending = False
+
+    def line(self, code):
+        self.__lines.append("    " * self.__indent + code)
+
+    @contextlib.contextmanager
+    def block(self, head):
+        self.line(head)
+        self.__indent += 1
+        try:
+            yield
+        finally:
+            self.__indent -= 1
+
+    def const(self, value):
+        if value is None or type(value) in (bool, int):
+            return repr(value)
+        key = id(value)
+        try:
+            return self.__constants[key][0]
+        except KeyError:
+            pass
+        name = f"__c{ len(self.__constants) }"
+        # keep a reference to value so that its id stays unique
+        self.__constants[key] = name, value
+        self.namespace[name] = value
+        return name
+
+    def tmp(self):
+        name = f"__t{ self.__tmpcount }"
+        self.__tmpcount += 1
+        return name
+
+    def assign(self, name):
+        self.assigned.add(name)
+
+    def reference(self, name):
+        """
+        Returns name of local variable `name`, making sure it is bound.
+
+        Unbound references evaluate to None, mirroring the lookup of
+        missing keys in the interpreter's state dictionary.
+        """
+
+        if name not in self.assigned:
+            self.assigned.add(name)
+            self.__prologue.append(f"    { name } = None")
+        return name
+
+    def source(self):
+        lines = list(self.__lines)
+        lines[self.__prologue_index : self.__prologue_index] = self.__prologue
+        return "\n".join(lines) + "\n"
+
+    def build(self, filename):
+        code = codeCache.compile(self.source(), filename)
+        namespace = dict(self.namespace)
+        exec(code, namespace)
+        return namespace
+
+
+def checkLocalName(name):
+    if (
+        not isinstance(name, str)
+        or not name.isidentifier()
+        or keyword.iskeyword(name)
+        or name.startswith("__")
+    ):
+        raise NotCompilable(f"not usable as local variable: { name !r}")
+    return name
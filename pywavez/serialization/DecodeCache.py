@@ -0,0 +1,52 @@
+import collections
+import typing
+
+
+class DecodeCache:
+    """
+    Bounded cache of decoded messages, for data that repeats byte for byte
+    (periodic reports, interview responses).
+
+    Entries are keyed on the class decoding the data, which includes the
+    command class version for commands, and the raw bytes. The cached
+    objects are frozen (see `freeze`), so they can be shared. The least
+    recently used entry is evicted when the cache is full. The `hits` and
+    `misses` counters help choosing `maxsize`.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.__entries = collections.OrderedDict()
+
+    def fromBytes(self, cls, data: typing.ByteString):
+        """
+        Returns the frozen object `cls.fromBytes(data)` decodes. Data that
+        cannot be decoded raises the exception and is not cached.
+        """
+
+        key = cls, bytes(data)
+        entries = self.__entries
+        try:
+            obj = entries[key]
+        except KeyError:
+            pass
+        else:
+            entries.move_to_end(key)
+            self.hits += 1
+            return obj
+
+        self.misses += 1
+        obj = cls.fromBytes(key[1]).freeze()
+        entries[key] = obj
+        if len(entries) > self.maxsize:
+            entries.popitem(last=False)
+        return obj
+
+    def clear(self):
+        self.__entries.clear()
+        self.hits = self.misses = 0
+
+    def __len__(self):
+        return len(self.__entries)
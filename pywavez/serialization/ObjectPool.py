@@ -0,0 +1,70 @@
+import logging
+import typing
+
+
+class ObjectPool:
+    """
+    Free lists of decoded objects, to avoid allocating a new object for
+    every message of classes received at a high rate (meter and sensor
+    reports, APPLICATION_COMMAND_HANDLER requests).
+
+    Consumers pass objects they are done with to `release`. `fromBytes`
+    takes an object of the class from its free list, if there is one, and
+    decodes the data into its slots, passing it to `readFromBytes`. A
+    released object must not be used afterwards: its fields change when it
+    is reused. At most `maxsize` objects are kept per class. The `hits` and
+    `misses` counters and `sizes` help choosing `maxsize`.
+
+    Frozen objects cannot be refilled and are not kept, nor objects of
+    other than `Serialization` classes.
+    """
+
+    def __init__(self, maxsize: int = 64):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.__free = {}
+
+    def fromBytes(self, cls, data: typing.ByteString):
+        """
+        Returns the object of class `cls` decoded from `data`, reusing a
+        released one if possible.
+        """
+
+        free = self.__free.get(cls)
+        if free:
+            self.hits += 1
+            pos, obj = cls.readFromBytes(data, 0, free.pop())
+        else:
+            self.misses += 1
+            pos, obj = cls.readFromBytes(data)
+        if pos < len(data):
+            logging.warning(
+                f"spurious data at end of message: { data[pos:].hex() }"
+            )
+        return obj
+
+    def release(self, obj):
+        """Returns `obj` to the free list of its class."""
+
+        cls = type(obj)
+        if getattr(cls, "Frozen", True):
+            # frozen, or not a decoded object at all
+            return
+        free = self.__free.get(cls)
+        if free is None:
+            free = self.__free[cls] = []
+        if len(free) < self.maxsize:
+            free.append(obj)
+
+    def sizes(self):
+        """Returns a dict of the number of free objects by class."""
+
+        return {cls: len(free) for cls, free in self.__free.items() if free}
+
+    def clear(self):
+        self.__free.clear()
+        self.hits = self.misses = 0
+
+    def __len__(self):
+        return sum(len(free) for free in self.__free.values())
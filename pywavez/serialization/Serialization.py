@@ -1,18 +1,25 @@
+import ast
 import enum
 import functools
 import inspect
 import keyword
 import logging
+import operator
+import struct
 import sys
 import types
 import typing
 
+from .Batch import Batch
+from .Bitset import Bitset
+from .CodeCache import codeCache
+from .CodeGenerator import CodeGenerator, NotCompilable, checkLocalName
 from .ParseError import ParseError
 
 
 class Serialization:
     @classmethod
-    def createClass(cls, name, description):
+    def createClass(cls, name, description, *, compiled=True, lazy=False):
         self = cls()
         slots = []
         attributes = {"__slots__": slots, "__annotations__": {}}
@@ -56,10 +63,13 @@ class Serialization:
             if writer:
                 writer_funcs.append(writer)
 
-        def readFromBytes(cls, ba: bytes, pos: int = 0):
-            obj = cls.__new__(cls)
+        def readFromBytes(cls, ba: typing.ByteString, pos: int = 0, obj=None):
+            # fields are decoded into `obj`, if given, instead of a new
+            # instance (see `ObjectPool`)
+            if obj is None:
+                obj = cls.__new__(cls)
             d = {"__obj": obj}
-            ba = bytes(ba)
+            ba = memoryview(ba)
             for f in reader_funcs:
                 d["_bytesRemaining"] = len(ba) - pos
                 pos = f(d, ba, pos)
@@ -69,7 +79,9 @@ class Serialization:
                 setattr(obj, key, d[key])
             return pos, obj
 
-        def fromBytes(cls, ba: bytes):
+        def fromBytes(cls, ba: typing.ByteString, *, copy: bool = False):
+            if copy:
+                ba = bytes(ba)
             pos, obj = cls.readFromBytes(ba)
             if pos < len(ba):
                 logging.warning(
@@ -78,7 +90,7 @@ class Serialization:
             return obj
 
         def toBytes(self) -> bytearray:
-            d = dict((k, getattr(self, k)) for k in self.__slots__)
+            d = dict((k, getattr(self, k)) for k in slots)
             d["__obj"] = self
             ba = bytearray()
             pos = 0
@@ -90,6 +102,48 @@ class Serialization:
                 raise SystemExit("toBytes produced short output")
             return ba
 
+        def encodedSize(self) -> int:
+            return len(self.toBytes())
+
+        def decodeBatch(cls, payloads: typing.Sequence[typing.ByteString]):
+            """
+            Decodes a sequence of messages into a NumPy structured array,
+            with one record per message and one column per field.
+
+            Fields are decoded column by column, with vectorized operations
+            on all messages at once. Enum fields hold the numeric values.
+            Optional fields hold 0 in messages they are not present in.
+            Raises ParseError naming the index of the first message that
+            cannot be decoded. Trailing data is ignored.
+
+            Requires NumPy, and is only supported for messages consisting of
+            fixed and variable width integers, bit fields and booleans.
+            """
+
+            return self._decodeBatch(name, description, payloads)
+
+        def freeze(self):
+            """
+            Returns an immutable and hashable copy of this object, or the
+            object itself if it is frozen already.
+
+            The copy is an instance of a subclass whose fields cannot be
+            assigned, and which compares equal to frozen objects of the
+            same class with equal fields. Field values are frozen as well:
+            lists become tuples, sets frozensets, binary data bytes, and
+            nested objects are frozen in turn.
+            """
+
+            return freezeObject(self, slots)
+
+        def writeInto(self, buf: typing.ByteString, pos: int = 0) -> int:
+            data = self.toBytes()
+            end = pos + len(data)
+            if len(buf) < end:
+                raise ValueError("buffer too small")
+            buf[pos:end] = data
+            return end
+
         if slots:
             constructor_def = "def __init__(__self, *, {}):\n".format(
                 ", ".join(slots)
@@ -97,19 +151,67 @@ class Serialization:
             for key in slots:
                 constructor_def += f"    __self.{ key } = { key }\n"
             namespace = {}
-            exec(constructor_def, namespace)
+            exec(
+                codeCache.compile(
+                    constructor_def, f"<Serialization { name }.__init__>"
+                ),
+                namespace,
+            )
             constructor = attributes["__init__"] = namespace["__init__"]
             constructor.__kwdefaults__ = default_values
 
         attributes["readFromBytes"] = classmethod(readFromBytes)
         attributes["fromBytes"] = classmethod(fromBytes)
         attributes["toBytes"] = toBytes
-        attributes["__repr__"] = objectRepr(name)
+        attributes["__repr__"] = objectRepr(name, slots)
+
+        # The closure-based implementation stays available for classes the
+        # compiler cannot handle and for checking the generated code.
+        attributes["readFromBytesInterpreted"] = classmethod(readFromBytes)
+        attributes["toBytesInterpreted"] = toBytes
+        attributes["Compiled"] = False
+        attributes["FixedSize"] = None
+        attributes["Lazy"] = False
+        attributes["Frozen"] = False
+        attributes["freeze"] = freeze
+
+        attributes["encodedSize"] = encodedSize
+        attributes["writeInto"] = writeInto
+        attributes["decodeBatch"] = classmethod(decodeBatch)
+
+        if compiled:
+            try:
+                fixed = self._compileFixed(name, description, slots)
+                if fixed is not None:
+                    reader, writers, attributes["FixedSize"] = fixed
+                else:
+                    reader = self._compileReader(name, description, slots)
+                    writers = self._compileWriters(name, description, slots)
+                if lazy:
+                    lazyattributes = self._compileLazy(
+                        name, description, slots
+                    )
+            except NotCompilable as ex:
+                logging.debug(f"Not compiling { name }: { ex }")
+            else:
+                attributes["readFromBytes"] = classmethod(reader)
+                attributes.update(writers)
+                attributes["Compiled"] = True
+                if lazy:
+                    if lazySlot in slots:
+                        raise Exception(f"Invalid field name: { lazySlot !r}")
+                    attributes["__slots__"] = slots + [lazySlot]
+                    attributes.update(lazyattributes)
 
         return type(name, (), attributes)
 
     @classmethod
     def functions(cls):
+        return dict(cls._functions())
+
+    @classmethod
+    @functools.lru_cache(maxsize=None)
+    def _functions(cls):
         result = {}
         for funcname in (x for x in dir(cls) if x.startswith("_func_")):
             func = getattr(cls, funcname)
@@ -139,6 +241,644 @@ class Serialization:
             **dict((k, v) for k, v in item.items() if k.startswith("_")),
         )
 
+    def _getItemCompiler(self, item):
+        funcname = item["func"]
+        try:
+            func = getattr(self, "_compile_" + funcname)
+        except AttributeError:
+            raise NotCompilable(f"no compiler for { funcname !r}")
+        return func(
+            **dict((k, v) for k, v in item.items() if k.startswith("_"))
+        )
+
+    def _getItemLayout(self, item):
+        funcname = item["func"]
+        func = getattr(self, "_layout_" + funcname, None)
+        if func is None:
+            return None
+        return func(
+            **dict((k, v) for k, v in item.items() if k.startswith("_"))
+        )
+
+    def _getItemBatchDecoder(self, item):
+        funcname = item["func"]
+        func = getattr(self, "_batch_" + funcname, None)
+        if func is None:
+            return None
+        return func(
+            **dict((k, v) for k, v in item.items() if k.startswith("_"))
+        )
+
+    def _decodeBatch(self, name, description, payloads):
+        import numpy
+
+        decoders = []
+        dtypes = []
+        for item in description:
+            batchdecoder = self._getItemBatchDecoder(item)
+            if batchdecoder is None:
+                raise Exception(f"{ name } does not support batch decoding")
+            dtype, decoder = batchdecoder
+            if decoder is None:
+                continue
+            field = item.get("field")
+            target = item.get("virtualfield") if field is None else field
+            decoders.append((target, decoder))
+            if field is not None and dtype is not None:
+                dtypes.append((field, dtype))
+
+        batch = Batch(numpy, payloads)
+        for target, decoder in decoders:
+            value = decoder(batch)
+            if target is not None:
+                batch.columns[target] = value
+
+        result = numpy.empty(len(batch), dtype=dtypes)
+        for field, dtype in dtypes:
+            result[field] = batch.columns[field]
+        return result
+
+    def _compileFixed(self, name, description, slots):
+        """
+        Compiles descriptions consisting only of fixed-width items into
+        functions using a single precomputed `struct.Struct`.
+
+        Returns None if the description has a variable-width item.
+        Otherwise returns reader and writer function and the size of the
+        encoded data.
+        """
+
+        readfmt = writefmt = ">"
+        layouts = []
+        values = []
+        # field -> offset and write format of the items writing only the
+        # bytes of one field
+        patchable = {}
+        sharable = False
+        for item in description:
+            layout = self._getItemLayout(item)
+            if layout is None:
+                return None
+            rfmt, wfmt, reader, writer = layout
+            shared = rfmt is None
+            if shared:
+                # shares the byte of the previous item
+                if not sharable:
+                    return None
+                itemvalues = values[-1:]
+                patchable.pop(layouts[-1][0].get("field"), None)
+            else:
+                sharable = rfmt in ("B", "b")
+                itemstruct = struct.Struct(">" + rfmt)
+                count = len(itemstruct.unpack(bytes(itemstruct.size)))
+                itemvalues = [f"__v{ len(values) + i }" for i in range(count)]
+                values.extend(itemvalues)
+                field = item.get("field")
+                if field is not None and writer is not None:
+                    patchable[field] = (struct.calcsize(readfmt), wfmt)
+                readfmt += rfmt
+                writefmt += wfmt
+            layouts.append((item, itemvalues, reader, writer, shared))
+
+        readstruct = struct.Struct(readfmt)
+        writestruct = struct.Struct(writefmt)
+        size = readstruct.size
+
+        gen = CodeGenerator(
+            "readFromBytes", ("__cls", "__ba", "__pos=0", "__into=None")
+        )
+        with gen.block(f"if len(__ba) - __pos < { size }:"):
+            gen.line('raise Exception("short message")')
+        if values:
+            gen.line(
+                f"{ ', '.join(values) }, = "
+                f"{ gen.const(readstruct.unpack_from) }(__ba, __pos)"
+            )
+        for item, itemvalues, reader, writer, shared in layouts:
+            if reader is not None:
+                target = item.get("field")
+                if target is not None:
+                    target = checkLocalName(target)
+                reader(gen, itemvalues, target)
+        gen.line("__obj = __cls.__new__(__cls) if __into is None else __into")
+        for key in slots:
+            gen.line(f"__obj.{ key } = { key }")
+        gen.line(f"return __pos + { size }, __obj")
+        readFromBytes = gen.build(f"<Serialization { name }.readFromBytes>")[
+            "readFromBytes"
+        ]
+
+        writers = {}
+        for funcname, args in self._writerSignatures.items():
+            if funcname == "encodedSize":
+                continue
+            gen = CodeGenerator(funcname, args)
+            gen.localNames = descriptionFields(description) | {"__obj"}
+            for key in slots:
+                gen.line(f"{ key } = __obj.{ key }")
+                gen.assign(key)
+            packvalues = []
+            for item, itemvalues, reader, writer, shared in layouts:
+                if writer is None:
+                    continue
+                value = self._compileItemValue(gen, item)
+                exprs = writer(gen, value)
+                if shared:
+                    packvalues[-1] = f"{ packvalues[-1] } | { exprs[0] }"
+                else:
+                    packvalues.extend(exprs)
+            if funcname == "toBytes":
+                gen.line(f"__ba = bytearray({ size })")
+                position = "0"
+            else:
+                with gen.block(f"if len(__ba) - __pos < { size }:"):
+                    gen.line('raise ValueError("buffer too small")')
+                position = "__pos"
+            gen.line(
+                f"{ gen.const(writestruct.pack_into) }(__ba, { position }"
+                f"{ ''.join(', ' + v for v in packvalues) })"
+            )
+            if funcname == "toBytes":
+                gen.line("return __ba")
+            else:
+                gen.line(f"return __pos + { size }")
+            writers[funcname] = gen.build(
+                f"<Serialization { name }.{ funcname }>"
+            )[funcname]
+
+        def encodedSize(self):
+            return size
+
+        @functools.lru_cache(maxsize=None)
+        def compilePatcher(fields):
+            gen = CodeGenerator("patch", ("__ba", "__pos", *fields))
+            for item, itemvalues, reader, writer, shared in layouts:
+                field = item.get("field")
+                if field not in fields:
+                    continue
+                offset, wfmt = patchable[field]
+                exprs = writer(gen, checkLocalName(field))
+                gen.line(
+                    f"{ gen.const(struct.Struct('>' + wfmt).pack_into) }"
+                    f"(__ba, __pos + { offset }, { ', '.join(exprs) })"
+                )
+            return gen.build(f"<Serialization { name }.patch>")["patch"]
+
+        def fieldPatcher(cls, *fields):
+            """
+            Returns a function `patch(buf, pos, *values)` writing the values
+            of `fields` into the encoding at `pos` in `buf`, leaving the
+            other bytes alone. Fields sharing a byte with other items cannot
+            be patched.
+            """
+
+            if len(set(fields)) < len(fields):
+                raise ValueError(f"duplicate fields: { fields !r}")
+            for field in fields:
+                if field not in patchable:
+                    raise ValueError(f"cannot patch { name }.{ field }")
+            return compilePatcher(fields)
+
+        writers["encodedSize"] = encodedSize
+        writers["fieldPatcher"] = classmethod(fieldPatcher)
+        return readFromBytes, writers, size
+
+    def _compileLazy(self, name, description, slots):
+        """
+        Returns the attributes of a lazy class, whose `fromBytes` only keeps
+        the message in the new object. Each field is decoded on first access
+        and stored in its slot: `__getattr__` is only called while the slot
+        is empty.
+
+        The leading fixed-width items of the message are at offsets known in
+        advance. `fromBytes` checks their length and magic numbers. Fields
+        among them are decoded one by one, except that fields decoded by
+        mere arithmetic are unpacked right away, along with the magic
+        numbers. Accessing any other field decodes the whole message.
+        """
+
+        # segments of the message, lists of format, offset, the names of the
+        # unpacked values and whether `fromBytes` needs to unpack them
+        segments = []
+        checkitems = []
+        fields = []
+        offset = 0
+        valuecount = 0
+        sharable = False
+        complete = True
+        for item in description:
+            layout = self._getItemLayout(item)
+            if layout is None:
+                complete = False
+                break
+            rfmt, wfmt, reader, writer = layout
+            if rfmt is None:
+                # shares the byte of the previous item
+                if not sharable:
+                    complete = False
+                    break
+                segment = segments[-1]
+            else:
+                sharable = rfmt in ("B", "b")
+                itemstruct = struct.Struct(">" + rfmt)
+                count = len(itemstruct.unpack(bytes(itemstruct.size)))
+                values = [f"__v{ valuecount + i }" for i in range(count)]
+                valuecount += count
+                segment = [rfmt, offset, values, False]
+                segments.append(segment)
+                offset += itemstruct.size
+            if reader is None:
+                continue
+            itemfmt, itemoffset, values, used = segment
+            target = item.get("field")
+            if target is not None:
+                target = checkLocalName(target)
+                scratch = CodeGenerator("scratch", ())
+                reader(scratch, values, target)
+                if scratch.namespace:
+                    fields.append((target, itemfmt, itemoffset, reader))
+                    continue
+            elif item.get("virtualfield") is not None:
+                continue
+            segment[3] = True
+            checkitems.append((target, values, reader))
+
+        gen = CodeGenerator("fromBytes", ("__cls", "__ba", "*", "copy=False"))
+        with gen.block("if copy:"):
+            gen.line("__ba = bytes(__ba)")
+        with gen.block(f"if len(__ba) < { offset }:"):
+            gen.line('raise Exception("short message")')
+        unpackfmt = ">"
+        unpackvalues = []
+        for itemfmt, itemoffset, values, used in segments:
+            if used:
+                unpackfmt += itemfmt
+                unpackvalues.extend(values)
+            else:
+                unpackfmt += f"{ struct.calcsize('>' + itemfmt) }x"
+        if unpackvalues:
+            unpack = struct.Struct(unpackfmt).unpack_from
+            gen.line(
+                f"{ ', '.join(unpackvalues) }, = { gen.const(unpack) }(__ba)"
+            )
+        for target, values, reader in checkitems:
+            if target is None:
+                reader(gen, values, target)
+        gen.line("__obj = __cls.__new__(__cls)")
+        for target, values, reader in checkitems:
+            if target is not None:
+                reader(gen, values, target)
+                gen.line(f"__obj.{ target } = { target }")
+        if complete:
+            with gen.block(f"if len(__ba) > { offset }:"):
+                gen.line(
+                    f"{ gen.const(logging.warning) }("
+                    f'"spurious data at end of message: " '
+                    f"+ __ba[{ offset }:].hex())"
+                )
+        gen.line(f"__obj.{ lazySlot } = __ba")
+        gen.line("return __obj")
+        fromBytes = gen.build(f"<Serialization { name }.fromBytes>")[
+            "fromBytes"
+        ]
+
+        decoders = {}
+        for target, itemfmt, itemoffset, reader in fields:
+            gen = CodeGenerator("decode", ("__ba",))
+            itemstruct = struct.Struct(">" + itemfmt)
+            count = len(itemstruct.unpack(bytes(itemstruct.size)))
+            values = [f"__v{ i }" for i in range(count)]
+            gen.line(
+                f"{ ', '.join(values) }, = "
+                f"{ gen.const(itemstruct.unpack_from) }(__ba, { itemoffset })"
+            )
+            reader(gen, values, target)
+            gen.line(f"return { target }")
+            decoders[target] = gen.build(
+                f"<Serialization { name }.{ target }>"
+            )["decode"]
+
+        # The lazy slot holds the message, and once the fields following the
+        # leading fixed-width items are needed, the fully decoded object.
+        gen = CodeGenerator("__getattr__", ("__obj", "__key"))
+        with gen.block(f"if __key not in { gen.const(frozenset(slots)) }:"):
+            gen.line(
+                "raise AttributeError(f'{ type(__obj).__name__ !r} object "
+                "has no attribute { __key !r}')"
+            )
+        gen.line(f"__data = __obj.{ lazySlot }")
+        with gen.block("if __data.__class__ is not __obj.__class__:"):
+            gen.line(f"__decode = { gen.const(decoders) }.get(__key)")
+            with gen.block("if __decode is not None:"):
+                gen.line("__value = __decode(__data)")
+                gen.line("setattr(__obj, __key, __value)")
+                gen.line("return __value")
+            gen.line("__pos, __full = __obj.readFromBytes(__data)")
+            with gen.block("if __pos < len(__data):"):
+                gen.line(
+                    f"{ gen.const(logging.warning) }("
+                    f'"spurious data at end of message: " '
+                    f"+ __data[__pos:].hex())"
+                )
+            gen.line(f"__obj.{ lazySlot } = __data = __full")
+        gen.line("__value = getattr(__data, __key)")
+        gen.line("setattr(__obj, __key, __value)")
+        gen.line("return __value")
+        getattr_ = gen.build(f"<Serialization { name }.__getattr__>")[
+            "__getattr__"
+        ]
+
+        return {
+            "fromBytes": classmethod(fromBytes),
+            "__getattr__": getattr_,
+            "Lazy": True,
+        }
+
+    def _compileReader(self, name, description, slots):
+        gen = CodeGenerator(
+            "readFromBytes", ("__cls", "__ba", "__pos=0", "__into=None")
+        )
+        gen.line("__obj = __cls.__new__(__cls) if __into is None else __into")
+        gen.line("__ba = memoryview(__ba)")
+        gen.line("__end = len(__ba)")
+        gen.assign("__obj")
+        gen.localNames = descriptionFields(description) | {"__obj"}
+        bytesRemaining = "_bytesRemaining" in descriptionNames(description)
+        if bytesRemaining:
+            gen.localNames.add("_bytesRemaining")
+
+        for item in description:
+            reader, writer, sizer = self._getItemCompiler(item)
+            if reader is None:
+                continue
+            target = item.get("field")
+            if target is None:
+                target = item.get("virtualfield")
+            if target is not None:
+                target = checkLocalName(target)
+            if bytesRemaining:
+                gen.line("_bytesRemaining = __end - __pos")
+                gen.assign("_bytesRemaining")
+            reader(gen, target)
+            if target is not None:
+                gen.assign(target)
+
+        for key in slots:
+            gen.line(f"__obj.{ key } = { gen.reference(key) }")
+        gen.line("return __pos, __obj")
+        return gen.build(f"<Serialization { name }.readFromBytes>")[
+            "readFromBytes"
+        ]
+
+    _writerSignatures = {
+        "encodedSize": ("__obj",),
+        "toBytes": ("__obj",),
+        "writeInto": ("__obj", "__ba", "__pos=0"),
+    }
+
+    def _compileWriters(self, name, description, slots):
+        """
+        Returns a dictionary of the generated `encodedSize`, `toBytes` and
+        `writeInto` functions.
+
+        `writeInto` first computes the size of the encoded data and checks
+        that the given buffer is large enough, so that the item writers can
+        store their data at fixed positions. `toBytes` appends to a new
+        bytearray instead: for messages of a few dozen bytes, growing a
+        bytearray is cheaper than filling a presized one, as assigning
+        bytes to a bytearray slice copies them into a temporary bytearray
+        first. Runs of items with a fixed layout are packed with a single
+        `struct` call in both cases.
+        """
+
+        writers = {}
+        for funcname, args in self._writerSignatures.items():
+            gen = CodeGenerator(funcname, args)
+            gen.localNames = descriptionFields(description) | {"__obj"}
+            gen.appending = funcname == "toBytes"
+            for key in slots:
+                gen.line(f"{ key } = __obj.{ key }")
+                gen.assign(key)
+
+            items = []
+            for item in description:
+                reader, writer, sizer = self._getItemCompiler(item)
+                if writer is not None:
+                    value = self._compileItemValue(gen, item)
+                    layout = self._getItemLayout(item)
+                    items.append((writer, sizer, value, layout))
+
+            if funcname == "toBytes":
+                gen.line("__ba = bytearray()")
+                self._compileStores(gen, items)
+                gen.line("return __ba")
+            else:
+                fixedsize = 0
+                sizes = []
+                for writer, sizer, value, layout in items:
+                    itemsize = sizer(gen, value)
+                    if type(itemsize) is int:
+                        fixedsize += itemsize
+                    else:
+                        sizes.append(itemsize)
+                if fixedsize or not sizes:
+                    sizes.append(str(fixedsize))
+                size = " + ".join(sizes)
+                if funcname == "encodedSize":
+                    gen.line(f"return { size }")
+                else:
+                    with gen.block(f"if len(__ba) - __pos < { size }:"):
+                        gen.line('raise ValueError("buffer too small")')
+                    self._compileStores(gen, items)
+                    gen.line("return __pos")
+
+            writers[funcname] = gen.build(
+                f"<Serialization { name }.{ funcname }>"
+            )[funcname]
+        return writers
+
+    @classmethod
+    def _compileStores(cls, gen, items):
+        """
+        Emits the code storing `items`, which are tuples of item writer,
+        sizer, value and layout.
+        """
+
+        fmt = ""
+        packvalues = []
+        sharable = False
+
+        def flush():
+            if fmt:
+                cls._compilePack(gen, fmt, packvalues)
+
+        for writer, sizer, value, layout in items:
+            if layout is not None and layout[1] is None and sharable:
+                exprs = layout[3](gen, value)
+                packvalues[-1] = f"{ packvalues[-1] } | { exprs[0] }"
+            elif layout is not None and layout[1] is not None:
+                packvalues.extend(layout[3](gen, value))
+                fmt += layout[1]
+                sharable = layout[1] in ("B", "b")
+            else:
+                flush()
+                fmt = ""
+                packvalues = []
+                sharable = False
+                writer(gen, value)
+        flush()
+
+    def _compileItemValue(self, gen, item):
+        """
+        Returns the name of the local variable holding the value of a field
+        or virtualfield, emitting the assignment of virtualfields, or an
+        expression for the value of an item without field.
+        """
+
+        field = item.get("field")
+        if field is not None:
+            return field
+        value = self._compileValue(gen, item.get("value"))
+        virtualfield = item.get("virtualfield")
+        if virtualfield is not None:
+            virtualfield = checkLocalName(virtualfield)
+            gen.line(f"{ virtualfield } = { value }")
+            gen.assign(virtualfield)
+            value = virtualfield
+        return value
+
+    @staticmethod
+    def _compileValue(gen, x):
+        """
+        Returns Python expression for a description parameter, which may be
+        a constant, a `Value` or an `Expr`.
+        """
+
+        if isinstance(x, Value):
+            key = x.key
+            if key == "__obj":
+                return key
+            try:
+                return gen.reference(checkLocalName(key))
+            except NotCompilable:
+                return "None"
+        elif isinstance(x, Expr):
+            # Names that are neither fields of the message nor in the
+            # restricted set of builtins would resolve to Python's builtins
+            # in generated code, so such expressions are not inlined.
+            if x.inlinable and all(
+                n in gen.localNames or hasattr(stripped_down_builtins, n)
+                for n in x.names
+            ):
+                for n in x.names:
+                    if n not in gen.localNames:
+                        gen.namespace[n] = getattr(stripped_down_builtins, n)
+                return f"({ x.source })"
+            return f"{ gen.const(x) }(locals())"
+        else:
+            return gen.const(x)
+
+    @classmethod
+    def _compileTemporary(cls, gen, x):
+        """
+        Like `_compileValue`, but stores anything that is not a literal in a
+        temporary variable, so that it can be used repeatedly.
+        """
+
+        value = cls._compileValue(gen, x)
+        if value == "None" or value.isdigit():
+            return value
+        tmp = gen.tmp()
+        gen.line(f"{ tmp } = { value }")
+        return tmp
+
+    @staticmethod
+    def _compileAdvance(gen, length):
+        """
+        Emits code advancing the read position by `length` bytes (which must
+        be a literal or a variable name), and returns an expression for the
+        position before advancing.
+        """
+
+        gen.line(f"__pos += { length }")
+        with gen.block("if __pos > __end:"):
+            gen.line('raise Exception("position beyond data buffer")')
+        return f"__pos - { length }"
+
+    # The item writers emit code through the following functions, which
+    # either append to `__ba` (if `gen.appending` is set) or store at
+    # position `__pos` in the presized buffer `__ba`, advancing `__pos`.
+
+    @staticmethod
+    def _compileStoreByte(gen, value):
+        if gen.appending:
+            gen.line(f"__ba.append({ value })")
+        else:
+            gen.line(f"__ba[__pos] = { value }")
+            gen.line("__pos += 1")
+
+    @staticmethod
+    def _compileOrPrevByte(gen, value):
+        """
+        Emits code combining `value` with the last byte written, for items
+        sharing the byte of the previous item.
+        """
+
+        if gen.appending:
+            gen.line(f"__ba[-1] |= { value }")
+        else:
+            gen.line(f"__ba[__pos - 1] |= { value }")
+
+    @staticmethod
+    def _compileStore(gen, value, length=None):
+        """
+        Emits code storing the bytes-like `value`, which has `length` bytes
+        (an int or an expression). If `length` is None, `value` must be a
+        variable.
+        """
+
+        if gen.appending:
+            gen.line(f"__ba += { value }")
+            return
+        end = gen.tmp()
+        if length is None:
+            gen.line(f"{ end } = __pos + len({ value })")
+        else:
+            gen.line(f"{ end } = __pos + { length }")
+        gen.line(f"__ba[__pos:{ end }] = { value }")
+        gen.line(f"__pos = { end }")
+
+    @classmethod
+    def _compileStoreBytes(cls, gen, data):
+        """
+        Emits code storing the constant `data`. Short constants are stored
+        byte by byte, which is faster than assigning to a bytearray slice.
+        """
+
+        if gen.appending:
+            cls._compileStore(gen, gen.const(data))
+        elif len(data) <= 4:
+            for i, byte in enumerate(data):
+                gen.line(f"__ba[__pos + { i }] = { byte }")
+            gen.line(f"__pos += { len(data) }")
+        else:
+            cls._compileStore(gen, gen.const(data), len(data))
+
+    @staticmethod
+    def _compilePack(gen, fmt, values):
+        """
+        Emits code storing `values` packed with the big-endian struct
+        format `fmt`.
+        """
+
+        packer = struct.Struct(">" + fmt)
+        args = "".join(", " + v for v in values)
+        if gen.appending:
+            gen.line(f"__ba += { gen.const(packer.pack) }({ args[2:] })")
+        else:
+            gen.line(f"{ gen.const(packer.pack_into) }(__ba, __pos{ args })")
+            gen.line(f"__pos += { packer.size }")
+
     @staticmethod
     def _func_noop():
         def reader(ba, pos, eval):
@@ -181,10 +921,10 @@ class Serialization:
 
     def _func_nulTerminatedString(self, attributes, *, _encoding="ascii"):
         def reader(ba, pos, eval):
-            nul = ba.find(0, pos)
+            nul = findByte(ba, 0, pos)
             if nul == -1:
                 raise Exception("no nul")
-            return nul + 1, ba[pos:nul].decode(_encoding)
+            return nul + 1, str(ba[pos:nul], _encoding)
 
         def writer(value, ba, pos, eval):
             val = value.encode(_encoding) + b"\x00"
@@ -275,6 +1015,11 @@ class Serialization:
                 length = len(ba) - pos
             else:
                 length = eval(_bytes)
+            if _enum is None:
+                return (
+                    pos + length,
+                    Bitset.fromBytes(ba[pos : pos + length], _offset),
+                )
             res = set()
 
             for idx in range(length):
@@ -296,7 +1041,11 @@ class Serialization:
 
             return ba, pos + length
 
-        return reader, writer, typing.Set[elementtype]
+        return (
+            reader,
+            writer,
+            (Bitset if _enum is None else typing.Set[elementtype]),
+        )
 
     def _func_binary(self, attributes, *, _bytes=None):
         def reader(ba, pos, eval):
@@ -398,15 +1147,700 @@ class Serialization:
 
         return reader, writer, None
 
+    # Code generators
+    #
+    # Each `_compile_<func>` method corresponds to the `_func_<func>` method
+    # of the same name and takes the same parameters. It returns a triple of
+    # functions: `reader(gen, target)` emits code that reads a value from
+    # `__ba` at position `__pos` into the local variable `target` (or
+    # discards it if `target` is None). `writer(gen, value)` emits code
+    # storing the Python expression `value` in the presized buffer `__ba`
+    # at position `__pos` and advancing `__pos`. `sizer(gen, value)`
+    # returns the number of bytes `writer` will store, either as an int
+    # (without emitting any code) or as an expression, which it may emit
+    # code to compute.
+
+    def _compile_magic(self, *, _bytes: typing.ByteString):
+        length = len(_bytes)
+
+        def reader(gen, target):
+            with gen.block(f"if __end < __pos + { length }:"):
+                gen.line('raise Exception("short message")')
+            magic = gen.const(_bytes)
+            with gen.block(
+                f"if __ba[__pos : __pos + { length }] != { magic }:"
+            ):
+                gen.line('raise Exception("magic mismatch")')
+            gen.line(f"__pos += { length }")
+            if target is not None:
+                gen.line(f"{ target } = None")
+
+        def writer(gen, value):
+            self._compileStoreBytes(gen, bytes(_bytes))
+
+        def sizer(gen, value):
+            return length
+
+        return reader, writer, sizer
+
+    def _compile_skip(self, *, _bytes: int = 1):
+        def reader(gen, target):
+            with gen.block(f"if __end < __pos + { _bytes }:"):
+                gen.line('raise Exception("short message")')
+            gen.line(f"__pos += { _bytes }")
+            if target is not None:
+                gen.line(f"{ target } = None")
+
+        def writer(gen, value):
+            self._compileStoreBytes(gen, bytes(_bytes))
+
+        def sizer(gen, value):
+            return _bytes
+
+        return reader, writer, sizer
+
+    def _compile_nulTerminatedString(self, *, _encoding="ascii"):
+        def reader(gen, target):
+            nul = gen.tmp()
+            gen.line(f"{ nul } = { gen.const(findByte) }(__ba, 0, __pos)")
+            with gen.block(f"if { nul } == -1:"):
+                gen.line('raise Exception("no nul")')
+            if target is not None:
+                gen.line(
+                    f"{ target } = str(__ba[__pos:{ nul }], { _encoding !r})"
+                )
+            gen.line(f"__pos = { nul } + 1")
+
+        def writer(gen, value):
+            encoded = gen.tmp()
+            gen.line(f"{ encoded } = { value }.encode({ _encoding !r})")
+            self._compileStore(gen, encoded)
+            self._compileStoreByte(gen, "0")
+
+        def sizer(gen, value):
+            return f"len({ value }.encode({ _encoding !r})) + 1"
+
+        return reader, writer, sizer
+
+    def _compile_int(
+        self,
+        *,
+        _bytes=1,
+        _unsigned=False,
+        _enum: typing.Optional[type] = None,
+    ):
+        def reader(gen, target):
+            length = self._compileTemporary(gen, _bytes)
+            if not _unsigned and not length.isdigit():
+                with gen.block(f"if not { length }:"):
+                    gen.line('raise Exception("zero-length integer")')
+            start = self._compileAdvance(gen, length)
+            if target is None:
+                return
+            if _unsigned and length == "1":
+                compileEnumConv(gen, _enum, "__ba[__pos - 1]", target, 256)
+                return
+            value = (
+                f"int.from_bytes(__ba[{ start }:__pos], 'big', "
+                f"signed={ not _unsigned })"
+            )
+            compileEnumConv(gen, _enum, value, target)
+
+        def writer(gen, value):
+            length = self._compileTemporary(gen, _bytes)
+            value = compileEnumConvback(gen, _enum, value)
+            if length == "1":
+                self._compileStoreByte(gen, f"{ value } & 0xFF")
+            elif length in ("2", "4"):
+                mask = (1 << (8 * int(length))) - 1
+                fmt = "H" if length == "2" else "I"
+                self._compilePack(gen, fmt, [f"{ value } & { mask }"])
+            else:
+                self._compileStore(
+                    gen,
+                    f"({ value } & ((1 << (8 * { length })) - 1))"
+                    f".to_bytes({ length }, 'big')",
+                    length,
+                )
+
+        def sizer(gen, value):
+            length = self._compileTemporary(gen, _bytes)
+            return int(length) if length.isdigit() else length
+
+        return reader, writer, sizer
+
+    _compile_int8 = _compile_int
+    _compile_int16 = functools.partialmethod(_compile_int, _bytes=2)
+    _compile_int24 = functools.partialmethod(_compile_int, _bytes=3)
+    _compile_int32 = functools.partialmethod(_compile_int, _bytes=4)
+
+    _compile_uint = functools.partialmethod(_compile_int, _unsigned=True)
+    _compile_uint8 = _compile_uint
+    _compile_uint16 = functools.partialmethod(
+        _compile_int, _unsigned=True, _bytes=2
+    )
+    _compile_uint24 = functools.partialmethod(
+        _compile_int, _unsigned=True, _bytes=3
+    )
+    _compile_uint32 = functools.partialmethod(
+        _compile_int, _unsigned=True, _bytes=4
+    )
+
+    def _compile_uintbits(
+        self,
+        *,
+        _shift=0,
+        _mask=0xFF,
+        _prevbyte=False,
+        _enum: typing.Optional[type] = None,
+    ):
+        def reader(gen, target):
+            if not _prevbyte:
+                self._compileAdvance(gen, 1)
+            if target is None:
+                return
+            value = f"(__ba[__pos - 1] >> { _shift }) & { _mask }"
+            compileEnumConv(gen, _enum, value, target, enumSize(_mask))
+
+        def writer(gen, value):
+            value = compileEnumConvback(gen, _enum, value)
+            value = f"({ value } & { _mask }) << { _shift }"
+            if _prevbyte:
+                self._compileOrPrevByte(gen, value)
+            else:
+                self._compileStoreByte(gen, value)
+
+        def sizer(gen, value):
+            return 0 if _prevbyte else 1
+
+        return reader, writer, sizer
+
+    def _compile_bitset(self, *, _offset=0, _bytes=1, _enum=None):
+        conv, convback, elementtype = prepareEnum(_enum)
+        if _enum is None:
+            conv = convback = None
+
+        def reader(gen, target):
+            if _bytes is None:
+                length = gen.tmp()
+                gen.line(f"{ length } = __end - __pos")
+            else:
+                length = self._compileTemporary(gen, _bytes)
+            start = self._compileAdvance(gen, length)
+            if target is not None:
+                gen.line(
+                    f"{ target } = { gen.const(bitsetFromBytes) }("
+                    f"__ba, { start }, __pos, { _offset }, "
+                    f"{ gen.const(conv) })"
+                )
+
+        def writer(gen, value):
+            length = self._compileValue(gen, _bytes)
+            encoded = gen.tmp()
+            gen.line(
+                f"{ encoded } = { gen.const(bitsetToBytes) }("
+                f"{ value }, { length }, { _offset }, "
+                f"{ gen.const(convback) })"
+            )
+            self._compileStore(gen, encoded)
+
+        def sizer(gen, value):
+            if _bytes is None:
+                return f"(max({ value }) - { _offset }) // 8 + 1"
+            length = self._compileTemporary(gen, _bytes)
+            return int(length) if length.isdigit() else length
+
+        return reader, writer, sizer
+
+    def _compile_binary(self, *, _bytes=None):
+        def reader(gen, target):
+            if _bytes is None:
+                if target is not None:
+                    gen.line(f"{ target } = __ba[__pos:]")
+                gen.line("__pos = __end")
+                return
+            length = self._compileTemporary(gen, _bytes)
+            start = self._compileAdvance(gen, length)
+            if target is not None:
+                gen.line(f"{ target } = __ba[{ start }:__pos]")
+
+        def writer(gen, value):
+            if _bytes is not None:
+                length = self._compileValue(gen, _bytes)
+                with gen.block(f"if len({ value }) != { length }:"):
+                    gen.line('raise Exception("binary length mismatch")')
+            self._compileStore(gen, value)
+
+        def sizer(gen, value):
+            return f"len({ value })"
+
+        return reader, writer, sizer
+
+    def _compile_boolean(self, *, _mask=0xFF, _prevbyte=False):
+        def reader(gen, target):
+            if not _prevbyte:
+                self._compileAdvance(gen, 1)
+            if target is not None:
+                gen.line(f"{ target } = bool(__ba[__pos - 1] & { _mask })")
+
+        def writer(gen, value):
+            if _prevbyte:
+                with gen.block(f"if { value }:"):
+                    self._compileOrPrevByte(gen, _mask)
+            else:
+                self._compileStoreByte(gen, f"{ _mask } if { value } else 0")
+
+        def sizer(gen, value):
+            return 0 if _prevbyte else 1
+
+        return reader, writer, sizer
+
+    def _compile_optional(self, *, _item, _present):
+        itemrdr, itemwtr, itemszr = self._getItemCompiler(_item)
+
+        def reader(gen, target):
+            present = self._compileValue(gen, _present)
+            with gen.block(f"if { present }:"):
+                itemrdr(gen, target)
+            if target is not None:
+                with gen.block("else:"):
+                    gen.line(f"{ target } = None")
+
+        def writer(gen, value):
+            present = gen.tmp()
+            gen.line(f"{ present } = { self._compileValue(gen, _present) }")
+            with gen.block(
+                f"if { present } is not None and not { present } "
+                f"and { value } is not None:"
+            ):
+                gen.line('raise Exception("optional mismatch")')
+            with gen.block(f"if { present } or { value } is not None:"):
+                itemwtr(gen, value)
+
+        def sizer(gen, value):
+            size = gen.tmp()
+            gen.line(f"{ size } = 0")
+            present = self._compileValue(gen, _present)
+            with gen.block(f"if { present } or { value } is not None:"):
+                gen.line(f"{ size } = { itemszr(gen, value) }")
+            return size
+
+        return reader, writer, sizer
+
+    def _compile_array(self, *, _items, _length=None):
+        itemrdr, itemwtr, itemszr = self._getItemCompiler(_items)
+
+        def reader(gen, target):
+            length = self._compileTemporary(gen, _length)
+            result = gen.tmp() if target is None else target
+            item = gen.tmp()
+            counter = gen.tmp()
+            gen.line(f"{ result } = []")
+
+            def readItems(head):
+                with gen.block(head):
+                    itemrdr(gen, item)
+                    gen.line(f"{ result }.append({ item })")
+
+            if length == "None":
+                readItems("while __pos < __end:")
+            elif length.isdigit():
+                readItems(f"for { counter } in range({ length }):")
+            else:
+                with gen.block(f"if { length } is None:"):
+                    readItems("while __pos < __end:")
+                with gen.block("else:"):
+                    readItems(f"for { counter } in range({ length }):")
+
+        def writer(gen, value):
+            length = self._compileTemporary(gen, _length)
+            if length != "None":
+                check = f"len({ value }) != { length }"
+                if not length.isdigit():
+                    check = f"{ length } is not None and " + check
+                with gen.block(f"if { check }:"):
+                    gen.line('raise Exception("array length mismatch")')
+            item = gen.tmp()
+            with gen.block(f"for { item } in { value }:"):
+                itemwtr(gen, item)
+
+        def sizer(gen, value):
+            # Sizers returning an int do not emit any code, so try the
+            # item sizer on a scratch generator first.
+            itemsize = itemszr(CodeGenerator("sizer", ()), "__item")
+            if type(itemsize) is int:
+                return f"len({ value }) * { itemsize }"
+            size = gen.tmp()
+            item = gen.tmp()
+            gen.line(f"{ size } = 0")
+            with gen.block(f"for { item } in { value }:"):
+                gen.line(f"{ size } += { itemszr(gen, item) }")
+            return size
+
+        return reader, writer, sizer
+
+    def _compile_classvar(self, *, _name, _val):
+        return None, None, None
+
+    def _compile_object(self, *, _type):
+        def reader(gen, target):
+            objtype = self._compileValue(gen, _type)
+            if target is None:
+                target = gen.tmp()
+            gen.line(
+                f"__pos, { target } = { objtype }.readFromBytes(__ba, __pos)"
+            )
+
+        def writer(gen, value):
+            objtype = self._compileTemporary(gen, _type)
+            with gen.block(f"if not isinstance({ value }, { objtype }):"):
+                gen.line(
+                    "raise Exception("
+                    f'f"object does not match type {{ { objtype } !r}}")'
+                )
+            if gen.appending:
+                gen.line(f"__ba += { value }.toBytes()")
+            else:
+                gen.line(f"__pos = { value }.writeInto(__ba, __pos)")
+
+        def sizer(gen, value):
+            return f"{ value }.encodedSize()"
+
+        return reader, writer, sizer
+
+    # Fixed layouts
+    #
+    # A `_layout_<func>` method returns None if the item, with the given
+    # parameters, does not have a fixed width. Otherwise it returns a tuple
+    # `(readfmt, writefmt, reader, writer)`. The formats are `struct` format
+    # codes for reading and writing the item's bytes, or None if the item
+    # shares the byte of the previous item (`prevbyte`).
+    # `reader(gen, values, target)` emits code computing `target` from the
+    # variables named in `values`, which hold the unpacked values.
+    # `writer(gen, value)` returns the list of expressions to pack.
+
+    def _layout_magic(self, *, _bytes: typing.ByteString):
+        length = len(_bytes)
+        fmt = {1: "B", 2: "H", 4: "I"}.get(length)
+        if fmt is None:
+            fmt = f"{ length }s"
+            magic = bytes(_bytes)
+        else:
+            magic = int.from_bytes(_bytes, "big")
+
+        def reader(gen, values, target):
+            with gen.block(f"if { values[0] } != { gen.const(magic) }:"):
+                gen.line('raise Exception("magic mismatch")')
+            if target is not None:
+                gen.line(f"{ target } = None")
+
+        def writer(gen, value):
+            return [gen.const(magic)]
+
+        return fmt, fmt, reader, writer
+
+    def _layout_skip(self, *, _bytes: int = 1):
+        def reader(gen, values, target):
+            if target is not None:
+                gen.line(f"{ target } = None")
+
+        def writer(gen, value):
+            return []
+
+        return f"{ _bytes }x", f"{ _bytes }x", reader, writer
+
+    def _layout_int(
+        self,
+        *,
+        _bytes=1,
+        _unsigned=False,
+        _enum: typing.Optional[type] = None,
+    ):
+        if type(_bytes) is not int or _bytes < 1:
+            return None
+        mask = (1 << (8 * _bytes)) - 1
+        fmt = {1: "B", 2: "H", 3: "BH", 4: "I", 8: "Q"}.get(_bytes)
+        if fmt is None:
+            readfmt = writefmt = f"{ _bytes }s"
+        else:
+            writefmt = fmt
+            readfmt = fmt if _unsigned else fmt[0].lower() + fmt[1:]
+
+        def reader(gen, values, target):
+            if target is None:
+                return
+            if fmt is None:
+                value = (
+                    f"int.from_bytes({ values[0] }, 'big', "
+                    f"signed={ not _unsigned })"
+                )
+            elif _bytes == 3:
+                value = f"({ values[0] } << 16) | { values[1] }"
+            else:
+                value = values[0]
+            size = 256 if _bytes == 1 and _unsigned else None
+            compileEnumConv(gen, _enum, value, target, size)
+
+        def writer(gen, value):
+            value = compileEnumConvback(gen, _enum, value)
+            if fmt is None:
+                return [f"({ value } & { mask }).to_bytes({ _bytes }, 'big')"]
+            elif _bytes == 3:
+                return [f"(({ value }) >> 16) & 0xFF", f"({ value }) & 0xFFFF"]
+            else:
+                return [f"({ value }) & { mask }"]
+
+        return readfmt, writefmt, reader, writer
+
+    _layout_int8 = _layout_int
+    _layout_int16 = functools.partialmethod(_layout_int, _bytes=2)
+    _layout_int24 = functools.partialmethod(_layout_int, _bytes=3)
+    _layout_int32 = functools.partialmethod(_layout_int, _bytes=4)
+
+    _layout_uint = functools.partialmethod(_layout_int, _unsigned=True)
+    _layout_uint8 = _layout_uint
+    _layout_uint16 = functools.partialmethod(
+        _layout_int, _unsigned=True, _bytes=2
+    )
+    _layout_uint24 = functools.partialmethod(
+        _layout_int, _unsigned=True, _bytes=3
+    )
+    _layout_uint32 = functools.partialmethod(
+        _layout_int, _unsigned=True, _bytes=4
+    )
+
+    def _layout_uintbits(
+        self,
+        *,
+        _shift=0,
+        _mask=0xFF,
+        _prevbyte=False,
+        _enum: typing.Optional[type] = None,
+    ):
+        fmt = None if _prevbyte else "B"
+
+        def reader(gen, values, target):
+            if target is None:
+                return
+            value = f"({ values[0] } >> { _shift }) & { _mask }"
+            compileEnumConv(gen, _enum, value, target, enumSize(_mask))
+
+        def writer(gen, value):
+            value = compileEnumConvback(gen, _enum, value)
+            return [f"(({ value } & { _mask }) << { _shift })"]
+
+        return fmt, fmt, reader, writer
+
+    def _layout_boolean(self, *, _mask=0xFF, _prevbyte=False):
+        fmt = None if _prevbyte else "B"
+
+        def reader(gen, values, target):
+            if target is not None:
+                gen.line(f"{ target } = bool({ values[0] } & { _mask })")
+
+        def writer(gen, value):
+            return [f"({ _mask } if { value } else 0)"]
+
+        return fmt, fmt, reader, writer
+
+    def _layout_bitset(self, *, _offset=0, _bytes=1, _enum=None):
+        if type(_bytes) is not int:
+            return None
+        conv, convback, elementtype = prepareEnum(_enum)
+        if _enum is None:
+            conv = convback = None
+        fmt = f"{ _bytes }s"
+
+        def reader(gen, values, target):
+            if target is not None:
+                gen.line(
+                    f"{ target } = { gen.const(bitsetFromBytes) }("
+                    f"{ values[0] }, 0, { _bytes }, { _offset }, "
+                    f"{ gen.const(conv) })"
+                )
+
+        def writer(gen, value):
+            return [
+                f"{ gen.const(bitsetToBytes) }({ value }, { _bytes }, "
+                f"{ _offset }, { gen.const(convback) })"
+            ]
+
+        return fmt, fmt, reader, writer
+
+    def _layout_classvar(self, *, _name, _val):
+        return "", "", None, None
+
+    # Batch decoders
+    #
+    # A `_batch_<func>` method returns None if the item, with the given
+    # parameters, cannot be decoded column by column. Otherwise it returns a
+    # pair `(dtype, decoder)`. `dtype` is the NumPy type code of the decoded
+    # values, or None if the item has no value. `decoder(batch)` reads the
+    # item from all messages of the `Batch` at once and returns the array of
+    # values (or None), advancing the batch's read position.
+
+    def _batch_magic(self, *, _bytes: typing.ByteString):
+        def decoder(batch):
+            start = batch.advance(len(_bytes))
+            for i, byte in enumerate(_bytes):
+                batch.check(batch.byte(start + i) != byte, "magic mismatch")
+
+        return None, decoder
+
+    def _batch_skip(self, *, _bytes: int = 1):
+        def decoder(batch):
+            batch.advance(_bytes)
+
+        return None, decoder
+
+    def _batch_int(
+        self,
+        *,
+        _bytes=1,
+        _unsigned=False,
+        _enum: typing.Optional[type] = None,
+    ):
+        if type(_bytes) is int:
+            if not 0 < _bytes <= 8:
+                return None
+            width = {1: 1, 2: 2, 3: 4, 4: 4}.get(_bytes, 8)
+            dtype = f"{ 'u' if _unsigned else 'i' }{ width }"
+        elif isinstance(_bytes, Value):
+            dtype = "i8"
+        else:
+            return None
+
+        def decoder(batch):
+            if type(_bytes) is int:
+                length = _bytes
+            else:
+                length = batch.value(_bytes.key)
+                if length is None:
+                    raise ParseError(f"no value for { _bytes.key !r}")
+                if not _unsigned:
+                    batch.check(length == 0, "zero-length integer")
+            start = batch.advance(length)
+            return batch.uint(start, length, signed=not _unsigned)
+
+        return dtype, decoder
+
+    _batch_int8 = _batch_int
+    _batch_int16 = functools.partialmethod(_batch_int, _bytes=2)
+    _batch_int24 = functools.partialmethod(_batch_int, _bytes=3)
+    _batch_int32 = functools.partialmethod(_batch_int, _bytes=4)
+
+    _batch_uint = functools.partialmethod(_batch_int, _unsigned=True)
+    _batch_uint8 = _batch_uint
+    _batch_uint16 = functools.partialmethod(
+        _batch_int, _unsigned=True, _bytes=2
+    )
+    _batch_uint24 = functools.partialmethod(
+        _batch_int, _unsigned=True, _bytes=3
+    )
+    _batch_uint32 = functools.partialmethod(
+        _batch_int, _unsigned=True, _bytes=4
+    )
+
+    def _batch_uintbits(
+        self,
+        *,
+        _shift=0,
+        _mask=0xFF,
+        _prevbyte=False,
+        _enum: typing.Optional[type] = None,
+    ):
+        def decoder(batch):
+            if _prevbyte:
+                byte = batch.byte(batch.pos - 1)
+            else:
+                byte = batch.byte(batch.advance(1))
+            return (byte >> _shift) & _mask
+
+        return "u1", decoder
+
+    def _batch_boolean(self, *, _mask=0xFF, _prevbyte=False):
+        def decoder(batch):
+            if _prevbyte:
+                byte = batch.byte(batch.pos - 1)
+            else:
+                byte = batch.byte(batch.advance(1))
+            return (byte & _mask) != 0
+
+        return "?", decoder
+
+    def _batch_optional(self, *, _item, _present):
+        item = self._getItemBatchDecoder(_item)
+        if item is None or not isinstance(_present, Value):
+            return None
+        dtype, itemdecoder = item
+
+        def decoder(batch):
+            np = batch.np
+            present = batch.value(_present.key)
+            if present is None:
+                present = np.zeros(len(batch), bool)
+            present = present != 0
+            active, pos = batch.active, batch.pos
+            batch.active = present if active is None else active & present
+            try:
+                value = itemdecoder(batch)
+            finally:
+                batch.active = active
+            batch.pos = np.where(present, batch.pos, pos)
+            return np.where(present, value, 0)
+
+        return dtype, decoder
+
+    def _batch_classvar(self, *, _name, _val):
+        return None, None
+
 
 class Expr:
+    """
+    Expression evaluated over the fields of a message.
+
+    The expression is translated once into a Python function that takes
+    the referenced fields as arguments. Only the functions in
+    `stripped_down_builtins` are available to it.
+    """
+
     def __init__(self, expr):
-        self.__expr = compile(expr, f"<Expr { expr !r}>", "eval")
+        self.__source = expr
+        tree = ast.parse(expr, f"<Expr { expr !r}>", "eval")
+        self.__names = freeNames(tree)
+        self.__args = tuple(
+            n for n in self.__names if not hasattr(stripped_down_builtins, n)
+        )
+        namespace = {"__builtins__": stripped_down_builtins.__dict__}
+        exec(
+            compile(
+                f"def expr({ ', '.join(self.__args) }):\n"
+                f"    return ({ expr }\n)\n",
+                f"<Expr { expr !r}>",
+                "exec",
+            ),
+            namespace,
+        )
+        self.__func = namespace["expr"]
 
     def __call__(self, locals_dict):
-        return eval(
-            self.__expr, {"__builtins__": stripped_down_builtins}, locals_dict
-        )
+        try:
+            args = [locals_dict[n] for n in self.__args]
+        except KeyError as ex:
+            raise NameError(f"name { ex.args[0] !r} is not defined")
+        return self.__func(*args)
+
+    @property
+    def source(self):
+        return self.__source
+
+    @property
+    def names(self):
+        return self.__names
+
+    @property
+    def inlinable(self):
+        return "#" not in self.__source and "\n" not in self.__source
 
 
 class Value:
@@ -416,6 +1850,10 @@ class Value:
     def __call__(self, locals_dict):
         return locals_dict.get(self.__key)
 
+    @property
+    def key(self):
+        return self.__key
+
 
 class ExprValueEvaluator:
     def __init__(self, state):
@@ -465,39 +1903,292 @@ def prepareEnum(_enum):
         conv = convback = lambda x: x
         returntype = int
     elif issubclass(_enum, enum.IntEnum):
+        members = enumMembers(_enum)
 
         def conv(x):
-            try:
-                return _enum(x)
-            except ValueError:
-                return int(x)
+            return members.get(x, x)
 
         def convback(x):
             return int(x)
 
         returntype = typing.Union[_enum, int]
     else:
-        conv = _enum
+        members = enumMembers(_enum)
 
-        def convback(x):
-            return x.value
+        def conv(x):
+            member = members.get(x)
+            if member is None:
+                # raises ValueError, or makes a combination of flags
+                return _enum(x)
+            return member
 
+        convback = enumValues(_enum).__getitem__
         returntype = _enum
 
     return conv, convback, returntype
 
 
-def objectRepr(name):
+@functools.lru_cache(maxsize=None)
+def enumMembers(_enum):
+    """Returns a dict mapping the values of `_enum` to its members."""
+
+    return {member.value: member for member in _enum.__members__.values()}
+
+
+class EnumValues(dict):
+    """
+    Dict mapping the members of an enum to their values. Members missing
+    from it, like combinations of flags, are looked up in the member.
+    """
+
+    def __missing__(self, member):
+        return member.value
+
+
+@functools.lru_cache(maxsize=None)
+def enumValues(_enum):
+    return EnumValues(
+        (member, member.value) for member in _enum.__members__.values()
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def enumTable(_enum, size):
+    """
+    Returns a tuple of the conversions of the numbers 0 to `size - 1` by the
+    `conv` function `prepareEnum` returns, or None for numbers that are
+    not valid for an enum other than IntEnum.
+    """
+
+    conv = prepareEnum(_enum)[0]
+    table = []
+    for x in range(size):
+        try:
+            table.append(conv(x))
+        except ValueError:
+            table.append(None)
+    return tuple(table)
+
+
+def descriptionNames(description):
+    """
+    Returns the set of names referenced by `Expr` and `Value` parameters of
+    the given description items, including nested ones.
+    """
+
+    names = set()
+    for item in description:
+        for k, v in item.items():
+            if not k.startswith("_") and k != "value":
+                continue
+            if isinstance(v, Expr):
+                names.update(v.names)
+            elif isinstance(v, Value):
+                names.add(v.key)
+            elif isinstance(v, dict) and "func" in v:
+                names.update(descriptionNames((v,)))
+    return names
+
+
+def descriptionFields(description):
+    """
+    Returns the set of field and virtual field names of the description.
+    """
+
+    return set(
+        name
+        for item in description
+        for name in (item.get("field"), item.get("virtualfield"))
+        if name is not None
+    )
+
+
+def freeNames(tree):
+    """
+    Returns the names an expression reads that are not bound inside of it
+    (e.g. by a comprehension or lambda), in order of appearance.
+    """
+
+    bound = set()
+    loaded = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name):
+            if isinstance(node.ctx, ast.Load):
+                if node.id not in loaded:
+                    loaded.append(node.id)
+            else:
+                bound.add(node.id)
+        elif isinstance(node, ast.arg):
+            bound.add(node.arg)
+    return tuple(n for n in loaded if n not in bound)
+
+
+def bitsetFromBytes(ba, start, end, offset, conv):
+    if conv is None:
+        return Bitset.fromBytes(ba[start:end], offset)
+    res = set()
+    for idx in range(start, end):
+        byte = ba[idx]
+        for bit in range(8):
+            if byte & (1 << bit):
+                value = (idx - start) * 8 + bit + offset
+                res.add(value if conv is None else conv(value))
+    return res
+
+
+def bitsetToBytes(value, length, offset, convback):
+    if isinstance(value, Bitset) and convback is None:
+        if length is None:
+            length = (value.max() - offset) // 8 + 1
+        return value.toBytes(length, offset)
+    if length is None:
+        length = (max(value) - offset) // 8 + 1
+    if convback is not None:
+        value = map(convback, value)
+    return setbits(bytearray(length), value, offset)
+
+
+def compileEnumConv(gen, _enum, value, target, size=None):
+    """
+    Generates code storing `value` converted to a member of `_enum` in
+    `target`, like the `conv` function returned by `prepareEnum`. If `size`
+    is given, `value` is smaller than that and the conversion is looked up
+    in a table.
+    """
+
+    if _enum is None:
+        gen.line(f"{ target } = { value }")
+        return
+    if size is None:
+        conv = gen.const(prepareEnum(_enum)[0])
+        gen.line(f"{ target } = { conv }({ value })")
+        return
+    table = gen.const(enumTable(_enum, size))
+    if issubclass(_enum, enum.IntEnum):
+        gen.line(f"{ target } = { table }[{ value }]")
+        return
+    number = gen.tmp()
+    gen.line(f"{ number } = { value }")
+    gen.line(f"{ target } = { table }[{ number }]")
+    with gen.block(f"if { target } is None:"):
+        gen.line(f"{ target } = { gen.const(_enum) }({ number })")
+
+
+def enumSize(mask):
+    """
+    Returns the size of the enum table for values masked with `mask`, or
+    None if it is not a small int.
+    """
+
+    if type(mask) is int and 0 <= mask < 256:
+        return mask + 1
+    return None
+
+
+def compileEnumConvback(gen, _enum, value):
+    """
+    Returns expression converting `value` back to the number representing
+    it, like the `convback` function returned by `prepareEnum`.
+    """
+
+    if _enum is None or issubclass(_enum, enum.IntEnum):
+        return value
+    return f"{ gen.const(enumValues(_enum)) }[{ value }]"
+
+
+def objectRepr(name, slots):
     def __repr__(self):
         p = ", ".join(
-            f"{ k }={ getattr(self, k, '<undefined>') !r}"
-            for k in self.__slots__
+            f"{ k }={ reprValue(getattr(self, k, '<undefined>')) }"
+            for k in slots
         )
         return f"{ name }({ p })"
 
     return __repr__
 
 
+# slot of lazy objects holding the message, see `Serialization._compileLazy`
+lazySlot = "_lazyData"
+
+
+# frozen subclasses of the classes created by `Serialization.createClass`
+frozenClasses = {}
+
+
+def freezeObject(obj, slots):
+    cls = type(obj)
+    if cls.Frozen:
+        return obj
+    try:
+        frozencls = frozenClasses[cls]
+    except KeyError:
+        frozencls = frozenClasses[cls] = makeFrozenClass(cls, slots)
+    frozen = frozencls.__new__(frozencls)
+    for key in slots:
+        object.__setattr__(frozen, key, freezeValue(getattr(obj, key)))
+    return frozen
+
+
+def freezeValue(value):
+    if isinstance(value, (list, tuple)):
+        return tuple(map(freezeValue, value))
+    if isinstance(value, set):
+        return frozenset(value)
+    if isinstance(value, (bytearray, memoryview)):
+        return bytes(value)
+    freeze = getattr(type(value), "freeze", None)
+    if freeze is not None:
+        return freeze(value)
+    return value
+
+
+def makeFrozenClass(cls, slots):
+    def __setattr__(self, key, value):
+        raise AttributeError(f"frozen { cls.__name__ } object is read-only")
+
+    def __delattr__(self, key):
+        raise AttributeError(f"frozen { cls.__name__ } object is read-only")
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(getattr(self, k) == getattr(other, k) for k in slots)
+
+    def __hash__(self):
+        return hash(tuple(getattr(self, k) for k in slots))
+
+    return type(
+        cls.__name__,
+        (cls,),
+        {
+            "__slots__": (),
+            "__setattr__": __setattr__,
+            "__delattr__": __delattr__,
+            "__eq__": __eq__,
+            "__hash__": __hash__,
+            "Frozen": True,
+        },
+    )
+
+
+def reprValue(value):
+    if isinstance(value, memoryview):
+        return repr(value.tobytes())
+    return repr(value)
+
+
+def findByte(ba: typing.ByteString, value: int, start: int) -> int:
+    """
+    Returns the index of the first byte equal to `value` at or after
+    `start`, or -1. Unlike `bytes.find`, this also works on memoryviews.
+    """
+
+    try:
+        return start + operator.indexOf(ba[start:], value)
+    except ValueError:
+        return -1
+
+
 def bytes2uint(b: typing.ByteString) -> int:
     res = 0
     for i in b:
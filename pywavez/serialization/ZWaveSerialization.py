@@ -1,6 +1,6 @@
 import typing
 
-from pywavez.serialization.Serialization import Serialization
+from pywavez.serialization.Serialization import Serialization, findByte
 
 
 class ZWaveSerialization(Serialization):
@@ -44,20 +44,122 @@ class ZWaveSerialization(Serialization):
 
     def _func_variantMarker(self, attributes, *, _marker: int):
         def reader(ba, pos, eval):
-            mp = ba.find(_marker, pos)
+            mp = findByte(ba, _marker, pos)
             if mp == -1:
                 return len(ba), ba[pos:]
             else:
                 return mp + 1, ba[pos:mp]
 
         def writer(value, ba, pos, eval):
-            val = value + bytes((_marker,))
+            val = bytes(value) + bytes((_marker,))
             length = len(val)
             ba[pos : pos + length] = val
             return ba, pos + length
 
         return reader, writer, str
 
+    def _compile_zwaveMessage(
+        self,
+        *,
+        _type: "MessageType",
+        _class: "MessageClass",
+        _outbound: bool = True,
+        _inbound: bool = True,
+        _nodeIdField: typing.Optional[str] = None,
+    ):
+        return self._compile_magic(_bytes=bytes((_type.value, _class.value)))
+
+    def _compile_zwaveCommand(self, *, _class, _cmd, _mask=0xFF):
+        reader, writer, sizer = self._compile_magic(
+            _bytes=bytes((_class, _cmd))
+        )
+
+        if _mask != 0xFF:
+
+            def reader(gen, target):
+                with gen.block("if __end < __pos + 2:"):
+                    gen.line('raise Exception("short message")')
+                with gen.block(
+                    f"if __ba[__pos] != { _class } "
+                    f"or __ba[__pos + 1] & { _mask } != { _cmd }:"
+                ):
+                    gen.line('raise Exception("magic mismatch")')
+                gen.line("__pos += 2")
+
+        return reader, writer, sizer
+
+    def _compile_variantMarker(self, *, _marker: int):
+        def reader(gen, target):
+            if target is None:
+                target = gen.tmp()
+            mp = gen.tmp()
+            find = gen.const(findByte)
+            gen.line(f"{ mp } = { find }(__ba, { _marker }, __pos)")
+            with gen.block(f"if { mp } == -1:"):
+                gen.line(f"{ target } = __ba[__pos:]")
+                gen.line("__pos = __end")
+            with gen.block("else:"):
+                gen.line(f"{ target } = __ba[__pos:{ mp }]")
+                gen.line(f"__pos = { mp } + 1")
+
+        def writer(gen, value):
+            self._compileStore(gen, value)
+            self._compileStoreByte(gen, _marker)
+
+        def sizer(gen, value):
+            return f"len({ value }) + 1"
+
+        return reader, writer, sizer
+
+    def _layout_zwaveMessage(
+        self,
+        *,
+        _type: "MessageType",
+        _class: "MessageClass",
+        _outbound: bool = True,
+        _inbound: bool = True,
+        _nodeIdField: typing.Optional[str] = None,
+    ):
+        return self._layout_magic(_bytes=bytes((_type.value, _class.value)))
+
+    def _layout_zwaveCommand(self, *, _class, _cmd, _mask=0xFF):
+        if _mask == 0xFF:
+            return self._layout_magic(_bytes=bytes((_class, _cmd)))
+
+        def reader(gen, values, target):
+            with gen.block(
+                f"if { values[0] } != { _class } "
+                f"or { values[1] } & { _mask } != { _cmd }:"
+            ):
+                gen.line('raise Exception("magic mismatch")')
+
+        def writer(gen, value):
+            return [str(_class), str(_cmd)]
+
+        return "BB", "BB", reader, writer
+
+    def _batch_zwaveMessage(
+        self,
+        *,
+        _type: "MessageType",
+        _class: "MessageClass",
+        _outbound: bool = True,
+        _inbound: bool = True,
+        _nodeIdField: typing.Optional[str] = None,
+    ):
+        return self._batch_magic(_bytes=bytes((_type.value, _class.value)))
+
+    def _batch_zwaveCommand(self, *, _class, _cmd, _mask=0xFF):
+        def decoder(batch):
+            start = batch.advance(2)
+            batch.check(
+                (batch.byte(start) != _class)
+                | (batch.byte(start + 1) & _mask != _cmd),
+                "magic mismatch",
+            )
+
+        return None, decoder
+
 
 class ZWaveCommandClassBase:
     ...
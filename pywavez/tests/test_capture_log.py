@@ -0,0 +1,163 @@
+import asyncio
+import os
+import socket
+import tempfile
+import unittest
+
+from pywavez.CaptureLog import CaptureLogReader, CaptureLogWriter
+from pywavez.CaptureSerialDevice import CaptureSerialDevice
+from pywavez.ReplaySerialDevice import ReplaySerialDevice
+from pywavez.SerialProtocol import SerialProtocol, frameMessage
+from pywavez.SimulatedSerialDevice import SimulatedSerialDevice
+from pywavez.SimulatedStick import SimulatedStick
+from pywavez.ThreadSerialDevice import ThreadSerialDevice
+from pywavez.TraceRecord import Direction, TraceRecord
+
+getVersion = bytes.fromhex("0015")
+version = b"\x01\x15Z-Wave 4.05\x00\x01"
+
+
+class TestCaptureLog(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp()
+        os.close(fd)
+        os.unlink(self.path)
+
+    def tearDown(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    def read(self):
+        with CaptureLogReader(self.path) as log:
+            return [
+                TraceRecord(ts, direction, bytes(data))
+                for ts, direction, data in log
+            ]
+
+    def test_roundtrip(self):
+        long = bytes(range(256)) * 300
+        log = CaptureLogWriter(self.path)
+        log.record(Direction.OUTBOUND, b"\x15", 1)
+        log.record(Direction.INBOUND, long, 2)
+        log.close()
+        # appending to an existing log
+        log = CaptureLogWriter(self.path)
+        log.record(Direction.INBOUND, memoryview(b"\x06"), 3)
+        log.close()
+        self.assertEqual(
+            self.read(),
+            [
+                TraceRecord(1, Direction.OUTBOUND, b"\x15"),
+                TraceRecord(2, Direction.INBOUND, long[:0xFFFF]),
+                TraceRecord(2, Direction.INBOUND, long[0xFFFF:]),
+                TraceRecord(3, Direction.INBOUND, b"\x06"),
+            ],
+        )
+
+        # the last record cut short
+        os.truncate(self.path, os.path.getsize(self.path) - 1)
+        self.assertEqual(len(self.read()), 3)
+        # is dropped before appending
+        with self.assertLogs(level="WARNING"):
+            log = CaptureLogWriter(self.path)
+        log.record(Direction.OUTBOUND, b"\x01\x02", 4)
+        log.record(Direction.INBOUND, b"\x06", 5)
+        log.close()
+        self.assertEqual(
+            self.read()[2:],
+            [
+                TraceRecord(2, Direction.INBOUND, long[0xFFFF:]),
+                TraceRecord(4, Direction.OUTBOUND, b"\x01\x02"),
+                TraceRecord(5, Direction.INBOUND, b"\x06"),
+            ],
+        )
+
+        # a header cut short too
+        os.truncate(self.path, os.path.getsize(self.path) - 2)
+        with self.assertLogs(level="WARNING"):
+            CaptureLogWriter(self.path).close()
+        self.assertEqual(len(self.read()), 4)
+
+    def test_not_a_log(self):
+        with open(self.path, "wb") as f:
+            f.write(b"something else entirely")
+        with self.assertRaises(ValueError):
+            CaptureLogReader(self.path)
+        with self.assertRaises(ValueError):
+            CaptureLogWriter(self.path)
+
+    def test_dropped(self):
+        # room for two records
+        log = CaptureLogWriter(self.path, maxBuffered=42, flushInterval=60)
+        with self.assertLogs(level="WARNING"):
+            for i in range(3):
+                log.record(Direction.INBOUND, bytes(10), i)
+        self.assertEqual(log.dropped, 1)
+        log.close()
+        self.assertEqual(len(self.read()), 2)
+
+    def test_capture_and_replay(self):
+        asyncio.run(self.checkCaptureAndReplay())
+
+    async def checkCaptureAndReplay(self):
+        stick = SimulatedStick()
+        dev = CaptureSerialDevice(
+            await SimulatedSerialDevice(stick), CaptureLogWriter(self.path)
+        )
+        sp = SerialProtocol(dev)
+        try:
+            await sp.send(getVersion)
+            self.assertEqual(await sp.getMessage(5), version)
+        finally:
+            await sp.close()
+
+        records = self.read()
+        self.assertEqual(
+            b"".join(r.data for r in records if r.direction == 0),
+            b"\x06" + frameMessage(version),
+        )
+        self.assertEqual(
+            b"".join(r.data for r in records if r.direction == 1),
+            b"\x15" + frameMessage(getVersion) + b"\x06",
+        )
+
+        with CaptureLogReader(self.path) as log:
+            dev = await ReplaySerialDevice(log, speed=None)
+            sp = SerialProtocol(dev)
+            try:
+                await sp.send(getVersion)
+                self.assertEqual(await sp.getMessage(5), version)
+                await asyncio.wait_for(dev.finished, 5)
+                self.assertEqual(dev.mismatches, 0)
+            finally:
+                await sp.close()
+
+    def test_eof(self):
+        asyncio.run(self.checkEOF())
+
+    async def checkEOF(self):
+        loop = asyncio.get_event_loop()
+        with socket.socket() as server:
+            server.bind(("127.0.0.1", 0))
+            server.listen(1)
+            host, port = server.getsockname()
+            accept = loop.run_in_executor(None, server.accept)
+            device = await ThreadSerialDevice(f"socket://{ host }:{ port }")
+            peer, _ = await asyncio.wait_for(accept, 5)
+            with peer:
+                dev = CaptureSerialDevice(device, CaptureLogWriter(self.path))
+                try:
+                    peer.sendall(b"\x06")
+                    await asyncio.wait_for(dev.waitForData(), 5)
+                    self.assertEqual(dev.takeAllData(), b"\x06")
+                    pending = dev.waitForData()
+                    await device.close()
+                    with self.assertRaises(EOFError):
+                        await asyncio.wait_for(pending, 5)
+                    self.assertTrue(dev.atEOF())
+                finally:
+                    await dev.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
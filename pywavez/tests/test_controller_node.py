@@ -0,0 +1,96 @@
+import asyncio
+import types
+import unittest
+
+from pywavez.ControllerNode import ControllerNode
+from pywavez.NodeUpdate import NodeUpdate
+from pywavez.ReceivedCommand import ReceivedCommand
+from pywavez.serialization.ParseError import ParseError
+from pywavez.zwave import getCommandClassVersion, inboundMessageFromBytes
+from pywavez.zwave.Constants import CommandClass
+
+
+def applicationCommand(payload):
+    return types.SimpleNamespace(payload=payload)
+
+
+class TestDispatch(unittest.TestCase):
+    def test_messages(self):
+        for data in b"", b"\x00", b"\x05\x02", b"\x00\xfe":
+            self.assertRaises(ParseError, inboundMessageFromBytes, data)
+
+    def test_commands(self):
+        asyncio.run(self.checkCommands())
+
+    async def checkCommands(self):
+        controller = types.SimpleNamespace(decoder=None)
+        node = ControllerNode(5, controller)
+        try:
+            # no version known: only VERSION.CommandClassReport is parsed
+            self.assertIsNone(node.parse_command(b"\x25\x03\xff", 0))
+            self.assertIsNone(node.parse_command(b"\x99\x01", 0))
+            self.assertIsNone(node.parse_command(b"\x86\x12\x06", 0))
+            self.assertIsNone(node.parse_command(b"\x84\x06", 0))
+            updates = list(
+                node.handleApplicationCommandHandlerRequest(
+                    applicationCommand(b"\x86\x14\x25\x01")
+                )
+            )
+            self.assertEqual(len(updates), 1)
+            self.assertIsInstance(updates[0], NodeUpdate.CommandClass)
+
+            report = node.parse_command(b"\x25\x03\xff", 0)
+            self.assertIsInstance(
+                report, getCommandClassVersion(0x25, 1).Report
+            )
+            self.assertEqual(
+                list(node.handleCommand(report, 0, b"\x25\x03\xff")),
+                [ReceivedCommand(5, 0, report)],
+            )
+            self.assertRaises(Exception, node.parse_command, b"\x25\x77", 0)
+            self.assertIsNone(node.parse_command(b"\x25\x03\xff", 1))
+            self.assertIsNotNone(node.parse_command(b"\x86\x14\x25\x01", 0))
+            self.assertIsNone(node.parse_command(b"\x86\x12\x06", 0))
+
+            # the fast path gives the same results, without the request
+            for payload in b"\x25\x03\xff", b"\x86\x14\x25\x01":
+                msg = applicationCommand(payload)
+                self.assertEqual(
+                    repr(node.handleApplicationCommand(memoryview(payload))),
+                    repr(
+                        tuple(node.handleApplicationCommandHandlerRequest(msg))
+                    ),
+                )
+            for payload in b"\x99\x01", b"\x25\x77", b"\x25":
+                self.assertIsNone(node.handleApplicationCommand(payload))
+        finally:
+            node.shutdown()
+
+    def test_capability_report(self):
+        asyncio.run(self.checkCapabilityReport())
+
+    async def checkCapabilityReport(self):
+        controller = types.SimpleNamespace(
+            decodeCache=None, initializationRequiredEvent=asyncio.Event()
+        )
+        node = ControllerNode(2, controller)
+        try:
+            mc = getCommandClassVersion(CommandClass.MULTI_CHANNEL, 3)
+            # endpoint 1 supports SWITCH_BINARY and controls BASIC
+            payload = bytearray.fromhex("600a011001 25ef20")
+            cmd = mc.CapabilityReport.fromBytes(payload)
+            self.assertIsInstance(cmd.commandClass, memoryview)
+            updates = list(node.handleCommand(cmd, 0, payload))
+            self.assertEqual(
+                node.commandClassCodes[1], (CommandClass.SWITCH_BINARY,)
+            )
+            self.assertEqual(
+                [(u.endpoint, u.code) for u in updates],
+                [(1, CommandClass.SWITCH_BINARY)],
+            )
+        finally:
+            node.shutdown()
+
+
+if __name__ == "__main__":
+    unittest.main()
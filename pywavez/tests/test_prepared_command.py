@@ -0,0 +1,100 @@
+import unittest
+
+from pywavez.PreparedCommand import PreparedCommand
+from pywavez.SendDataFrame import SendDataFrame
+from pywavez.zwave import getCommandClassVersion
+from pywavez.zwave.Constants import TransmitOption
+
+
+class TestPreparedCommand(unittest.TestCase):
+    def test_fields(self):
+        Set = getCommandClassVersion(0x26, 2).Set
+        Encap = getCommandClassVersion(0x60, 3).MultiChannelCmdEncap
+        layer = Encap(
+            sourceEndPoint=0,
+            destinationEndPoint=3,
+            bitAddress=False,
+            commandClass=0x26,
+            command=0x01,
+            parameter=b"",
+        )
+        prepared = PreparedCommand(
+            Set(value=0, dimmingDuration=0),
+            ("value", "dimmingDuration"),
+            endpoint=3,
+            layers=(layer,),
+        )
+        self.assertEqual(prepared.data, bytes.fromhex("600d000326010000"))
+        txOptions = TransmitOption.ACK, TransmitOption.ACK | 0x20
+        for funcId, (value, duration) in enumerate(
+            ((0, 0), (99, 10), (0xFF, 0xFE), (0, 0)), 1
+        ):
+            expected = Set(value=value, dimmingDuration=duration).toBytes()
+            self.assertEqual(
+                prepared.withValues(value, duration).toBytes(),
+                b"\x60\x0d\x00\x03" + expected,
+            )
+            frame = SendDataFrame(
+                nodeId=7,
+                command=prepared.withValues(value, duration),
+                txOptions=txOptions[funcId % 2],
+                funcId=funcId,
+            )
+            self.assertEqual(
+                frame.toFrame(),
+                SendDataFrame(
+                    nodeId=7,
+                    command=Set(value=value, dimmingDuration=duration),
+                    layers=(layer,),
+                    txOptions=txOptions[funcId % 2],
+                    funcId=funcId,
+                ).toFrame(),
+            )
+        # a frame per txOptions, shared by the copies with other values
+        self.assertEqual(len(prepared._frames), 2)
+        self.assertRaises(TypeError, prepared.withValues, 1)
+
+        # constant command
+        prepared = PreparedCommand(Set(value=5, dimmingDuration=1))
+        self.assertEqual(prepared.toBytes(), b"\x26\x01\x05\x01")
+        for funcId in 1, 2:
+            self.assertEqual(
+                SendDataFrame(
+                    nodeId=7,
+                    command=prepared,
+                    txOptions=TransmitOption.ACK,
+                    funcId=funcId,
+                ).toFrame(),
+                SendDataFrame(
+                    nodeId=7,
+                    command=Set(value=5, dimmingDuration=1),
+                    txOptions=TransmitOption.ACK,
+                    funcId=funcId,
+                ).toFrame(),
+            )
+
+    def test_unpatchable(self):
+        Encap = getCommandClassVersion(0x60, 3).MultiChannelCmdEncap
+        encap = Encap(
+            sourceEndPoint=0,
+            destinationEndPoint=3,
+            bitAddress=False,
+            commandClass=0x26,
+            command=0x01,
+            parameter=b"",
+        )
+        # variable width
+        self.assertRaises(ValueError, PreparedCommand, encap, ("command",))
+        # sharing a byte
+        StartLevelChange = getCommandClassVersion(0x26, 1).StartLevelChange
+        self.assertRaises(
+            ValueError, StartLevelChange.fieldPatcher, "ignoreStartLevel"
+        )
+        self.assertIsNotNone(StartLevelChange.fieldPatcher("startLevel"))
+        Set = getCommandClassVersion(0x26, 2).Set
+        self.assertRaises(ValueError, Set.fieldPatcher, "value", "value")
+        self.assertRaises(ValueError, Set.fieldPatcher, "unknown")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+import asyncio
+import unittest
+
+from pywavez.ReplaySerialDevice import ReplaySerialDevice
+from pywavez.SerialProtocol import SerialProtocol, frameMessage
+from pywavez.TraceRecord import Direction, TraceRecord
+
+getVersion = bytes.fromhex("0015")
+version = b"\x01\x15Z-Wave 4.05\x00\x01"
+update = bytes.fromhex("000400020325ff")
+
+# the stick's answers to a GetVersion request
+dialogue = [
+    TraceRecord(0, Direction.OUTBOUND, b"\x15"),
+    TraceRecord(1000000, Direction.OUTBOUND, bytes(frameMessage(getVersion))),
+    TraceRecord(2000000, Direction.INBOUND, b"\x06"),
+    TraceRecord(3000000, Direction.INBOUND, bytes(frameMessage(version))),
+    TraceRecord(4000000, Direction.OUTBOUND, b"\x06"),
+]
+
+
+class TestReplay(unittest.TestCase):
+    def test_check(self):
+        self.assertEqual(asyncio.run(self.replayDialogue(getVersion)), 0)
+
+    def test_check_mismatch(self):
+        self.assertEqual(asyncio.run(self.replayDialogue(b"\x00\x16")), 1)
+
+    async def replayDialogue(self, request):
+        dev = await ReplaySerialDevice(dialogue, speed=None)
+        sp = SerialProtocol(dev)
+        try:
+            await sp.send(request)
+            self.assertEqual(await sp.getMessage(5), version)
+            await asyncio.wait_for(dev.finished, 5)
+            return dev.mismatches
+        finally:
+            await sp.close()
+
+    def test_ack(self):
+        asyncio.run(self.checkAck())
+
+    async def checkAck(self):
+        frame = bytes(frameMessage(version))
+        records = [
+            TraceRecord(0, Direction.OUTBOUND, b"\x15"),
+            TraceRecord(0, Direction.INBOUND, b"\x06" + frame[:5]),
+            TraceRecord(100000000, Direction.INBOUND, frame[5:] + b"\x06"),
+            TraceRecord(100000000, Direction.OUTBOUND, b"\x06"),
+            TraceRecord(200000000, Direction.INBOUND, frameMessage(update)),
+        ]
+        dev = await ReplaySerialDevice(records, speed=None, outbound="ack")
+        sp = SerialProtocol(dev)
+        try:
+            # acknowledged by the device, not the trace
+            await asyncio.wait_for(sp.send(getVersion), 5)
+            self.assertEqual(await sp.getMessage(5), version)
+            self.assertEqual(await sp.getMessage(5), update)
+            await asyncio.wait_for(dev.finished, 5)
+            self.assertEqual(dev.mismatches, 0)
+            self.assertFalse(dev.hasData())
+        finally:
+            await sp.close()
+
+    def test_speed(self):
+        asyncio.run(self.checkSpeed())
+
+    async def checkSpeed(self):
+        records = [
+            TraceRecord(5000000000, Direction.INBOUND, b"\x01"),
+            TraceRecord(5200000000, Direction.INBOUND, b"\x02"),
+        ]
+        loop = asyncio.get_event_loop()
+        start = loop.time()
+        dev = await ReplaySerialDevice(records, speed=2.0)
+        await dev.waitForData()
+        self.assertLess(loop.time() - start, 0.1)
+        await asyncio.wait_for(dev.finished, 5)
+        self.assertGreaterEqual(loop.time() - start, 0.1)
+        self.assertEqual(bytes(dev.takeAllData()), b"\x01\x02")
+
+    def test_ack_waits_for_host(self):
+        asyncio.run(self.checkAckWaitsForHost())
+
+    async def checkAckWaitsForHost(self):
+        records = [
+            TraceRecord(0, Direction.OUTBOUND, b"\x15"),
+            TraceRecord(100000000, Direction.INBOUND, b"\x01"),
+        ]
+        loop = asyncio.get_event_loop()
+        dev = await ReplaySerialDevice(records, outbound="ack")
+        # as SerialProtocol's startup delay
+        await asyncio.sleep(0.2)
+        self.assertFalse(dev.hasData())
+        await dev.send(b"\x15")
+        start = loop.time()
+        await asyncio.wait_for(dev.finished, 5)
+        self.assertGreaterEqual(loop.time() - start, 0.09)
+        self.assertEqual(bytes(dev.takeAllData()), b"\x01")
+        await dev.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
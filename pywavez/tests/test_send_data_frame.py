@@ -0,0 +1,62 @@
+import unittest
+
+from pywavez.SendDataFrame import SendDataFrame
+from pywavez.SerialProtocol import calcChecksum, frameMessage
+from pywavez.zwave import Message, getCommandClassVersion
+from pywavez.zwave.Constants import TransmitOption
+
+
+class TestSendDataFrame(unittest.TestCase):
+    def test_frameMessage(self):
+        payload = bytes.fromhex("0015")
+        self.assertEqual(calcChecksum(payload), 0xE9)
+        self.assertEqual(frameMessage(payload), bytes.fromhex("01030015e9"))
+        self.assertRaises(Exception, frameMessage, bytes(256))
+
+    def test_frame(self):
+        Set = getCommandClassVersion(0x25, 1).Set
+        Encap = getCommandClassVersion(0x60, 3).MultiChannelCmdEncap
+        txOptions = TransmitOption.ACK | TransmitOption.AUTO_ROUTE
+        command = Set(value=0xFF)
+
+        def encap(parameter, inner=command):
+            return Encap(
+                sourceEndPoint=0,
+                destinationEndPoint=2,
+                bitAddress=False,
+                commandClass=inner.CommandClassCode,
+                command=inner.CommandCode,
+                parameter=parameter,
+            )
+
+        for cmd, layers, data in (
+            (command, (), command.toBytes()),
+            (b"\x84\x08", (), b"\x84\x08"),
+            (command, (encap(b""),), encap(b"\xff").toBytes()),
+            (
+                command,
+                (encap(b"", Encap), encap(b"")),
+                b"\x60\x0d\x00\x02" * 2 + b"\x25\x01\xff",
+            ),
+        ):
+            frame = SendDataFrame(
+                nodeId=7,
+                command=cmd,
+                layers=layers,
+                txOptions=txOptions,
+                funcId=0x42,
+            )
+            request = Message.SendDataRequest(
+                nodeId=7, data=data, txOptions=txOptions, funcId=0x42
+            )
+            self.assertEqual(frame.toFrame(), frameMessage(request.toBytes()))
+            self.assertEqual(frame.toBytes(), request.toBytes())
+
+        frame = SendDataFrame(
+            nodeId=7, command=bytes(249), txOptions=0, funcId=1
+        )
+        self.assertRaises(ValueError, frame.toFrame)
+
+
+if __name__ == "__main__":
+    unittest.main()
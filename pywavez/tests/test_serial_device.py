@@ -0,0 +1,82 @@
+import asyncio
+import os
+import socket
+import time
+import tty
+import unittest
+
+from pywavez.SerialDeviceBase import makeSerialDevice
+from pywavez.ThreadSerialDevice import ThreadSerialDevice
+
+
+@unittest.skipUnless(hasattr(os, "openpty"), "needs a pseudo terminal")
+class TestBackends(unittest.TestCase):
+    def test_backends(self):
+        for backend in "stream", "protocol", "thread":
+            with self.subTest(backend=backend):
+                asyncio.run(self.checkBackend(backend))
+        self.assertRaises(ValueError, makeSerialDevice, "x", backend="x")
+
+    async def checkBackend(self, backend):
+        master, slave = os.openpty()
+        tty.setraw(master)
+        try:
+            dev = await makeSerialDevice(os.ttyname(slave), backend=backend)
+            try:
+                os.write(master, b"\x01\x02\x03")
+                await asyncio.wait_for(dev.waitForData(3), 5)
+                self.assertEqual(dev.takeAllData(), b"\x01\x02\x03")
+                await dev.send(b"\x06")
+                # the transport may write from the event loop
+                read = asyncio.get_event_loop().run_in_executor(
+                    None, os.read, master, 1
+                )
+                self.assertEqual(await asyncio.wait_for(read, 5), b"\x06")
+            finally:
+                await dev.close()
+        finally:
+            os.close(master)
+            os.close(slave)
+
+
+class TestThreadSerialDevice(unittest.TestCase):
+    def test_socket(self):
+        asyncio.run(self.checkSocket())
+
+    async def checkSocket(self):
+        loop = asyncio.get_event_loop()
+        size = 1 << 24
+        with socket.socket() as server:
+            server.bind(("127.0.0.1", 0))
+            server.listen(1)
+            host, port = server.getsockname()
+            accept = loop.run_in_executor(None, server.accept)
+            dev = await ThreadSerialDevice(f"socket://{ host }:{ port }")
+            peer, _ = await asyncio.wait_for(accept, 5)
+            with peer:
+                try:
+
+                    def drain():
+                        time.sleep(0.3)
+                        received = 0
+                        while received < size:
+                            received += len(peer.recv(1 << 16))
+
+                    # the write blocks until the peer reads, the loop does not
+                    draining = loop.run_in_executor(None, drain)
+                    send = asyncio.ensure_future(dev.send(bytes(size)))
+                    await asyncio.sleep(0.1)
+                    self.assertFalse(send.done())
+                    await asyncio.wait_for(send, 5)
+                    await asyncio.wait_for(draining, 5)
+
+                    peer.sendall(b"\x06")
+                    await asyncio.wait_for(dev.waitForData(1), 5)
+                    self.assertEqual(dev.takeAllData(), b"\x06")
+                finally:
+                    # with a read pending, which socket:// cannot cancel
+                    await asyncio.wait_for(dev.close(), 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
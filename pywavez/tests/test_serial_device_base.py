@@ -0,0 +1,80 @@
+import asyncio
+import unittest
+
+from pywavez.SerialDeviceBase import SerialDeviceBase
+
+
+class TestReceiveBuffer(unittest.TestCase):
+    def test_take(self):
+        dev = SerialDeviceBase()
+        self.assertFalse(dev.hasData())
+        self.assertRaises(IndexError, dev.takeByte)
+        for chunk in b"\x01\x02", bytearray(b"\x03\x04\x05"), b"", b"\x06":
+            dev._appendData(chunk)
+        self.assertTrue(dev.hasData())
+        self.assertEqual(dev.takeByte(), 1)
+        # from within one chunk
+        data = dev.takeSomeData(1)
+        self.assertIsInstance(data, memoryview)
+        self.assertEqual(data, b"\x02")
+        # spanning chunks
+        dev._appendData(b"\x07\x08")
+        self.assertEqual(dev.takeSomeData(5), b"\x03\x04\x05\x06\x07")
+        self.assertRaises(Exception, dev.takeSomeData, 2)
+        dev._appendData(b"\x09")
+        self.assertEqual(dev.takeAllData(), b"\x08\x09")
+        self.assertFalse(dev.hasData())
+        self.assertEqual(dev.takeAllData(), b"")
+
+        # views stay valid
+        for i in range(100):
+            dev._appendData(bytes(range(i, i + 3)))
+        views = [dev.takeSomeData(2) for i in range(150)]
+        self.assertFalse(dev.hasData())
+        self.assertEqual(
+            b"".join(views),
+            b"".join(bytes(range(i, i + 3)) for i in range(100)),
+        )
+
+    def test_wait(self):
+        asyncio.run(self.checkWait())
+
+    async def checkWait(self):
+        dev = SerialDeviceBase()
+        fut = dev.waitForData(3)
+        dev._appendData(b"\x01\x02")
+        dev._notify()
+        self.assertFalse(fut.done())
+        dev._appendData(b"\x03")
+        dev._notify()
+        self.assertTrue(fut.done())
+        self.assertTrue(dev.waitForData(3).done())
+
+        dev.takeAllData()
+        futs = {b: dev.waitForData(b) for b in (5, 2, 9, 4, 7)}
+        # cancelled by timeouts
+        for _ in range(100):
+            try:
+                await asyncio.wait_for(dev.waitForData(6), 0)
+            except asyncio.TimeoutError:
+                pass
+        self.assertLess(len(dev._waiters), 50)
+        dev._appendData(b"\x00" * 4)
+        dev._notify()
+        self.assertEqual({b for b, fut in futs.items() if fut.done()}, {2, 4})
+        dev._appendData(b"\x00" * 3)
+        dev._readEOF = True
+        dev._notify()
+        self.assertIsNone(futs[7].result())
+        self.assertIsInstance(futs[9].exception(), EOFError)
+        self.assertEqual(dev._waiters, [])
+
+        # with no data left
+        dev = SerialDeviceBase()
+        fut = dev.waitForData()
+        dev._setEOF()
+        self.assertIsInstance(fut.exception(), EOFError)
+
+
+if __name__ == "__main__":
+    unittest.main()
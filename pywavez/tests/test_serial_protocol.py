@@ -0,0 +1,60 @@
+import asyncio
+import unittest
+
+from pywavez.SerialDeviceBase import SerialDeviceBase
+from pywavez.SerialProtocol import SerialProtocol, frameMessage
+
+
+class FakeSerialDevice(SerialDeviceBase):
+    def __init__(self):
+        super().__init__()
+        self.sent = bytearray()
+
+    async def sendBreak(self):
+        return True
+
+    async def send(self, data):
+        self.sent += data
+
+    async def close(self):
+        pass
+
+    def receive(self, data):
+        self._appendData(data)
+        self._notify()
+
+
+class TestReceive(unittest.TestCase):
+    def test_frames(self):
+        asyncio.run(self.checkFrames())
+
+    async def checkFrames(self):
+        dev = FakeSerialDevice()
+        sp = SerialProtocol(dev)
+        try:
+            payloads = [bytes((0, 4, 0, i, 3, 0x25, 3, i)) for i in range(10)]
+            frames = [frameMessage(p) for p in payloads]
+            bad = bytearray(frames[0])
+            bad[-1] ^= 1
+            # ten frames, a stray byte and a corrupt frame in one read,
+            # followed by a partial frame
+            dev.receive(
+                b"".join(frames[:5])
+                + b"\x77"
+                + bad
+                + b"".join(frames[5:])
+                + frames[0][:4]
+            )
+            received = [bytes(await sp.getMessage(5)) for _ in range(10)]
+            self.assertEqual(received, payloads)
+            dev.receive(frames[0][4:])
+            self.assertEqual(await sp.getMessage(5), payloads[0])
+            self.assertEqual(
+                bytes(dev.sent), b"\x15" + b"\x06" * 5 + b"\x15" + b"\x06" * 6
+            )
+        finally:
+            await sp.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import random
+import unittest
+
+from pywavez.serialization.ParseError import ParseError
+from pywavez.zwave import getCommandClassVersion
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def meterReports(count):
+    rnd = random.Random(1234)
+    Report = getCommandClassVersion(0x32, 3).Report
+    for i in range(count):
+        data = Report(
+            meterType=rnd.randrange(32),
+            rateType=rnd.randrange(4),
+            scaleBit2=rnd.random() < 0.5,
+            scaleBits10=rnd.randrange(4),
+            precision=rnd.randrange(8),
+            meterValue=rnd.randrange(-(2**31), 2**31) >> rnd.randrange(32),
+            deltaTime=rnd.randrange(1, 65536),
+            previousMeterValue=rnd.randrange(-1000, 1000),
+        ).toBytes()
+        if i % 3 == 0:
+            # no previous value
+            data = data[: 4 + (data[3] & 7)] + b"\x00\x00"
+        yield bytes(data)
+
+
+@unittest.skipIf(numpy is None, "NumPy not available")
+class TestBatchDecoding(unittest.TestCase):
+    def assertSameValues(self, cls, payloads):
+        result = cls.decodeBatch(payloads)
+        self.assertEqual(result.dtype.names, tuple(cls.__slots__))
+        self.assertEqual(len(result), len(payloads))
+        for data, record in zip(payloads, result):
+            obj = cls.fromBytes(data)
+            for key in cls.__slots__:
+                value = getattr(obj, key)
+                self.assertEqual(0 if value is None else value, record[key])
+
+    def test_meter_report(self):
+        Report = getCommandClassVersion(0x32, 3).Report
+        self.assertSameValues(Report, list(meterReports(300)))
+
+    def test_sensor_report(self):
+        Report = getCommandClassVersion(0x31, 5).Report
+        payloads = [
+            bytes.fromhex("31050122012c"),
+            bytes.fromhex("31050544fffffc18"),
+            bytes.fromhex("3105032981"),
+        ]
+        self.assertSameValues(Report, payloads)
+        self.assertEqual(Report.decodeBatch([]).shape, (0,))
+
+    def test_errors(self):
+        Report = getCommandClassVersion(0x31, 5).Report
+        payloads = [bytes.fromhex("31050122012c"), bytes.fromhex("3105012201")]
+        with self.assertRaisesRegex(ParseError, "message 1: position"):
+            Report.decodeBatch(payloads)
+        payloads = [bytes.fromhex("31040122012c")]
+        with self.assertRaisesRegex(ParseError, "message 0: magic"):
+            Report.decodeBatch(payloads)
+        payloads = [bytes.fromhex("310501200000")]
+        with self.assertRaisesRegex(ParseError, "zero-length integer"):
+            Report.decodeBatch(payloads)
+
+        SupportedReport = getCommandClassVersion(0x31, 5).SupportedSensorReport
+        self.assertRaises(Exception, SupportedReport.decodeBatch, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+import pickle
+import unittest
+
+from pywavez.serialization.Bitset import Bitset
+from pywavez.serialization.ParseError import ParseError
+from pywavez.serialization.Serialization import Serialization
+from pywavez.zwave import Message, inboundMessageFromBytes
+
+
+class TestBitset(unittest.TestCase):
+    def test_set(self):
+        b = Bitset([1, 3, 9, 200])
+        self.assertEqual(list(b), [1, 3, 9, 200])
+        self.assertEqual(len(b), 4)
+        self.assertIn(200, b)
+        self.assertNotIn(2, b)
+        self.assertNotIn(-1, b)
+        self.assertNotIn("x", b)
+        self.assertEqual(b.max(), 200)
+        self.assertEqual(repr(b), "Bitset([1, 3, 9, 200])")
+        self.assertFalse(Bitset())
+        self.assertEqual(list(Bitset()), [])
+        self.assertRaises(ValueError, Bitset, [-1])
+        self.assertRaises(ValueError, Bitset().max)
+
+        self.assertEqual(b, {1, 3, 9, 200})
+        self.assertEqual(frozenset((1, 3, 9, 200)), b)
+        self.assertEqual(hash(b), hash(frozenset(b)))
+        self.assertNotEqual(b, Bitset([1, 3]))
+        self.assertEqual(pickle.loads(pickle.dumps(b)), b)
+
+    def test_algebra(self):
+        a = Bitset([1, 2, 3])
+        b = Bitset([3, 4])
+        self.assertEqual(a | b, {1, 2, 3, 4})
+        self.assertEqual(a & b, {3})
+        self.assertEqual(a - b, {1, 2})
+        self.assertEqual(a ^ b, {1, 2, 4})
+        self.assertIsInstance(a | b, Bitset)
+        self.assertEqual(a | {7}, {1, 2, 3, 7})
+        self.assertEqual({2, 7} & a, {2})
+        self.assertEqual({2, 7} - a, {7})
+        self.assertTrue(Bitset([1, 2]) <= a)
+        self.assertTrue(Bitset([1, 2]) < a)
+        self.assertFalse(a < a)
+        self.assertTrue(a >= {3})
+        self.assertTrue(a.isdisjoint(Bitset([4])))
+        self.assertFalse(a.isdisjoint({3}))
+
+    def test_bytes(self):
+        data = bytes.fromhex("0580")
+        b = Bitset.fromBytes(data, 1)
+        self.assertEqual(b, {1, 3, 16})
+        self.assertEqual(b.toBytes(2, 1), data)
+        self.assertEqual(b.toBytes(3, 1), data + b"\0")
+        self.assertRaises(ParseError, b.toBytes, 1, 1)
+        self.assertRaises(ParseError, b.toBytes, 2, 2)
+
+    def test_fields(self):
+        data = bytes.fromhex("0180ff" + "00" * 27 + "01")
+        obj = inboundMessageFromBytes(data)
+        self.assertIsInstance(obj, Message.GetRoutingTableLineResponse)
+        self.assertIsInstance(obj.nodes, Bitset)
+        self.assertEqual(obj.nodes, set(range(1, 9)) | {225})
+        self.assertEqual(obj.toBytes(), data)
+        obj = Message.GetRoutingTableLineResponse(nodes={2, 232})
+        self.assertEqual(
+            obj.toBytes(), bytes.fromhex("018002" + "00" * 27 + "80")
+        )
+
+        s = Serialization()
+        f = s.functionsModule()
+        for compiled in True, False:
+            cls = s.createClass(
+                "Class", [f.bitset(field="a", bytes=None)], compiled=compiled
+            )
+            obj = cls.fromBytes(b"\x01\x02")
+            self.assertIsInstance(obj.a, Bitset)
+            self.assertEqual(obj.a, {0, 9})
+            self.assertEqual(obj.toBytes(), b"\x01\x02")
+            self.assertEqual(cls(a=Bitset([17])).toBytes(), b"\0\0\x02")
+
+
+if __name__ == "__main__":
+    unittest.main()
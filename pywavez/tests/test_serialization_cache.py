@@ -0,0 +1,139 @@
+import unittest
+
+from pywavez.serialization.DecodeCache import DecodeCache
+from pywavez.serialization.ObjectPool import ObjectPool
+from pywavez.serialization.Serialization import Expr, Serialization
+from pywavez.zwave import (
+    Message,
+    getCommandClassVersion,
+    inboundMessageFromBytes,
+)
+
+
+class TestDecodeCache(unittest.TestCase):
+    def test_freeze(self):
+        s = Serialization()
+        f = s.functionsModule()
+
+        Inner = s.createClass("Inner", [f.uint8(field="a")])
+        description = [
+            f.uint8(virtualfield="length", value=Expr("len(items)")),
+            f.array(field="items", length=Expr("length"), items=f.uint8()),
+            f.object(field="inner", type=Inner),
+            f.binary(field="data"),
+        ]
+        for compiled in True, False:
+            cls = s.createClass("Class", description, compiled=compiled)
+            data = bytes.fromhex("0201020378797a")
+            obj = cls.fromBytes(data)
+            frozen = obj.freeze()
+            self.assertFalse(obj.Frozen)
+            self.assertTrue(frozen.Frozen)
+            self.assertIsInstance(frozen, cls)
+            self.assertIs(frozen.freeze(), frozen)
+            self.assertEqual(frozen.toBytes(), data)
+
+            self.assertEqual(frozen.items, (1, 2))
+            self.assertTrue(frozen.inner.Frozen)
+            self.assertIs(type(frozen.data), bytes)
+            self.assertRaises(AttributeError, setattr, frozen, "items", [])
+            self.assertRaises(AttributeError, delattr, frozen, "items")
+            self.assertRaises(AttributeError, setattr, frozen.inner, "a", 1)
+
+            other = cls.fromBytes(data).freeze()
+            self.assertEqual(frozen, other)
+            self.assertEqual(hash(frozen), hash(other))
+            self.assertNotEqual(frozen, obj)
+            self.assertNotEqual(frozen, cls.fromBytes(data[:-1]).freeze())
+
+    def test_cache(self):
+        cache = DecodeCache(maxsize=2)
+        frames = [
+            bytes.fromhex("000400050325030a"),
+            bytes.fromhex("00040005032503ff"),
+            bytes.fromhex("000400060325030a"),
+        ]
+        first = inboundMessageFromBytes(frames[0], cache)
+        self.assertIsInstance(first, Message.ApplicationCommandHandlerRequest)
+        self.assertTrue(first.Frozen)
+        self.assertEqual(first.payload, b"\x25\x03\x0a")
+        self.assertIs(inboundMessageFromBytes(frames[0], cache), first)
+        self.assertEqual((cache.hits, cache.misses, len(cache)), (1, 1, 1))
+
+        inboundMessageFromBytes(frames[1], cache)
+        self.assertIs(inboundMessageFromBytes(frames[0], cache), first)
+        inboundMessageFromBytes(frames[2], cache)
+        self.assertEqual((cache.hits, cache.misses, len(cache)), (2, 3, 2))
+        # frames[1] was the least recently used entry
+        self.assertIs(inboundMessageFromBytes(frames[0], cache), first)
+        inboundMessageFromBytes(frames[1], cache)
+        self.assertEqual((cache.hits, cache.misses), (3, 4))
+
+        self.assertRaises(
+            Exception, inboundMessageFromBytes, frames[0][:-2], cache
+        )
+        self.assertEqual((cache.misses, len(cache)), (5, 2))
+
+        # the same payload decodes differently in another version
+        cache.clear()
+        self.assertEqual((cache.hits, cache.misses, len(cache)), (0, 0, 0))
+        payload = bytes.fromhex("2503ff")
+        v1 = getCommandClassVersion(0x25, 1).Report
+        v2 = getCommandClassVersion(0x25, 2).Report
+        self.assertIsNot(v1, v2)
+        report = cache.fromBytes(v1, payload)
+        self.assertIsInstance(report, v1)
+        self.assertIsInstance(cache.fromBytes(v2, payload + b"\x00\x00"), v2)
+        self.assertIs(cache.fromBytes(v1, payload), report)
+        self.assertEqual(len(cache), 2)
+
+
+class TestObjectPool(unittest.TestCase):
+    def test_pool(self):
+        s = Serialization()
+        f = s.functionsModule()
+        Fixed = s.createClass("Fixed", [f.uint8(field="a")])
+        description = [f.uint8(field="a"), f.binary(field="data")]
+        for cls in (
+            Fixed,
+            s.createClass("Class", description),
+            s.createClass("Class", description, compiled=False),
+        ):
+            pool = ObjectPool(maxsize=1)
+            first = pool.fromBytes(cls, b"\x01xy")
+            second = pool.fromBytes(cls, b"\x02")
+            self.assertEqual((pool.hits, pool.misses, len(pool)), (0, 2, 0))
+            pool.release(first)
+            pool.release(second)
+            self.assertEqual(pool.sizes(), {cls: 1})
+
+            obj = pool.fromBytes(cls, b"\x03z")
+            self.assertIs(obj, first)
+            self.assertEqual(obj.a, 3)
+            self.assertEqual(
+                obj.toBytes(), b"\x03" if cls is Fixed else b"\x03z"
+            )
+            self.assertEqual((pool.hits, pool.misses, len(pool)), (1, 2, 0))
+            self.assertIsNot(pool.fromBytes(cls, b"\x04"), first)
+
+            pool.release(obj.freeze())
+            pool.release(b"\x01")
+            self.assertEqual((pool.sizes(), len(pool)), ({}, 0))
+            pool.clear()
+            self.assertEqual((pool.hits, pool.misses), (0, 0))
+
+        pool = ObjectPool()
+        frames = [
+            bytes.fromhex("000400050325030a"),
+            bytes.fromhex("00040006032503ff"),
+        ]
+        msg = inboundMessageFromBytes(frames[0], pool)
+        pool.release(msg)
+        self.assertIs(inboundMessageFromBytes(frames[1], pool), msg)
+        self.assertEqual(
+            (msg.nodeId, bytes(msg.payload)), (6, b"\x25\x03\xff")
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
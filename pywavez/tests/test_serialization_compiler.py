@@ -0,0 +1,443 @@
+import enum
+import marshal
+import os
+import random
+import tempfile
+import unittest
+
+from pywavez.serialization.CodeCache import CodeCache, defaultCachePath
+from pywavez.serialization.Serialization import Expr, Serialization, Value
+from pywavez.zwave import Message, _command_classes
+
+
+def allMessageClasses():
+    for name in dir(Message):
+        if not name.startswith("_"):
+            cls = getattr(Message, name)
+            yield bytes((cls.MessageType.value, cls.MessageClass.value)), cls
+
+
+def allCommandClasses():
+    for cc in _command_classes.values():
+        for version in cc.versions.values():
+            for cls in version.commands.values():
+                yield bytes((cls.CommandClassCode, cls.CommandCode)), cls
+
+
+def outcome(func, *args):
+    try:
+        return True, func(*args)
+    except Exception:
+        return False, None
+
+
+def slotValues(obj):
+    return tuple(nestedValues(getattr(obj, k)) for k in obj.__slots__)
+
+
+def nestedValues(value):
+    if isinstance(value, list):
+        return [nestedValues(x) for x in value]
+    if hasattr(type(value), "readFromBytes"):
+        return slotValues(value)
+    return value
+
+
+class TestCompiledSerialization(unittest.TestCase):
+    def assertSameResults(self, cls, data):
+        ok_c, res_c = outcome(cls.readFromBytes, data)
+        ok_i, res_i = outcome(cls.readFromBytesInterpreted, data)
+        self.assertEqual(ok_c, ok_i, f"{ cls !r} { data.hex() }")
+        if not ok_c:
+            return
+        (pos_c, obj_c), (pos_i, obj_i) = res_c, res_i
+        self.assertEqual(pos_c, pos_i)
+        self.assertEqual(slotValues(obj_c), slotValues(obj_i))
+
+        ok_c, res_c = outcome(obj_c.toBytes)
+        ok_i, res_i = outcome(obj_c.toBytesInterpreted)
+        self.assertEqual(ok_c, ok_i, f"{ cls !r} { data.hex() }")
+        self.assertEqual(res_c, res_i)
+        if not ok_c:
+            return
+        self.assertEqual(obj_c.encodedSize(), len(res_c))
+        buf = bytearray(b"\xff" * (len(res_c) + 2))
+        self.assertEqual(obj_c.writeInto(buf, 1), len(res_c) + 1)
+        self.assertEqual(buf[1:-1], res_c)
+
+    def check(self, classes):
+        rnd = random.Random(1234)
+        for magic, cls in classes:
+            self.assertTrue(cls.Compiled, repr(cls))
+            for i in range(200):
+                length = rnd.randrange(48)
+                data = magic + bytes(rnd.randrange(256) for _ in range(length))
+                self.assertSameResults(cls, data)
+
+    def test_messages(self):
+        self.check(allMessageClasses())
+
+    def test_commands(self):
+        self.check(allCommandClasses())
+
+    def test_frames(self):
+        for data in (
+            "01155a2d5761766520342e30350001",
+            "0107aabb12345678abcd0002082080000200000000000000000000000000"
+            "00000000000000000000000000",
+            "0049840a0410012025268627",
+            "0049840a03100120",
+            "000400051032022164000003e8001e000003ca",
+        ):
+            data = bytes.fromhex(data)
+            for magic, cls in allMessageClasses():
+                if data.startswith(magic):
+                    self.assertSameResults(cls, data)
+
+    def test_expr(self):
+        e = Expr("max(a, intsize(b)) + len(c)")
+        self.assertEqual(e({"a": 1, "b": 1000, "c": "xyz"}), 5)
+        self.assertRaises(NameError, e, {"a": 1, "b": 1000})
+        self.assertRaises(NameError, Expr("abs(a)"), {"a": -1})
+        self.assertEqual(Expr("[x for x in a]")({"a": (1, 2)}), [1, 2])
+
+    def test_expr_builtins(self):
+        s = Serialization()
+        f = s.functionsModule()
+
+        description = [
+            f.uint8(virtualfield="length", value=Expr("abs(len(data))")),
+            f.array(field="data", length=Expr("length"), items=f.uint8()),
+        ]
+        for compiled in True, False:
+            obj = s.createClass("Class", description, compiled=compiled)(
+                data=[1, 2]
+            )
+            self.assertRaises(NameError, obj.toBytes)
+
+    def test_enums(self):
+        class Number(enum.IntEnum):
+            ONE = 1
+            BIG = 0x1234
+
+        class Kind(enum.Enum):
+            A = 0
+            B = 2
+
+        class Flags(enum.IntFlag):
+            X = 1
+            Y = 4
+
+        s = Serialization()
+        f = s.functionsModule()
+        fields = [
+            f.uint8(field="number", enum=Number),
+            f.uintbits(field="kind", mask=0x03, enum=Kind),
+            f.uintbits(
+                field="flags", shift=2, mask=0x3F, prevbyte=True, enum=Flags
+            ),
+            f.uint16(field="wide", enum=Number),
+            f.int8(field="signed", enum=Kind),
+        ]
+        for tail in [], [f.binary(field="rest")]:
+            for compiled in True, False:
+                cls = s.createClass("Class", fields + tail, compiled=compiled)
+                obj = cls.fromBytes(bytes.fromhex("0116123402"))
+                self.assertIs(obj.number, Number.ONE)
+                self.assertIs(obj.kind, Kind.B)
+                self.assertEqual(obj.flags, Flags.X | Flags.Y)
+                self.assertIsInstance(obj.flags, Flags)
+                self.assertIs(obj.wide, Number.BIG)
+                self.assertIs(obj.signed, Kind.B)
+                self.assertEqual(obj.toBytes().hex(), "0116123402")
+
+                obj = cls.fromBytes(bytes.fromhex("0700000100"))
+                self.assertEqual(obj.number, 7)
+                self.assertIs(type(obj.number), int)
+                self.assertEqual(obj.wide, 1)
+                self.assertIs(obj.kind, Kind.A)
+                self.assertEqual(obj.flags, Flags(0))
+                self.assertEqual(obj.toBytes().hex(), "0700000100")
+
+                for data in "0101000100", "01000001ff":
+                    self.assertRaises(
+                        ValueError, cls.fromBytes, bytes.fromhex(data)
+                    )
+
+    def test_fixed_layout(self):
+        WakeUpV1 = _command_classes[0x84].versions[1]
+        VersionV1 = _command_classes[0x86].versions[1]
+        for cls in (
+            Message.MemoryGetIdResponse,
+            Message.SerialApiSetTimeoutsResponse,
+            Message.GetNodeProtocolInfoResponse,
+            WakeUpV1.IntervalReport,
+            VersionV1.CommandClassReport,
+        ):
+            self.assertIsNotNone(cls.FixedSize, repr(cls))
+        self.assertIsNone(Message.ApplicationCommandHandlerRequest.FixedSize)
+
+        data = bytes.fromhex("840601518001")
+        obj = WakeUpV1.IntervalReport.fromBytes(data)
+        self.assertEqual(obj.seconds, 0x015180)
+        self.assertEqual(obj.nodeid, 1)
+        self.assertEqual(obj.toBytes(), data)
+        self.assertRaises(
+            Exception, WakeUpV1.IntervalReport.fromBytes, data[:5]
+        )
+        self.assertRaises(
+            Exception,
+            WakeUpV1.IntervalReport.fromBytes,
+            b"\x84\x07" + data[2:],
+        )
+
+        s = Serialization()
+        f = s.functionsModule()
+        Class = s.createClass(
+            "Class",
+            [
+                f.int24(field="a"),
+                f.int8(field="b"),
+                f.uintbits(field="c", mask=0x0F, shift=4),
+                f.boolean(field="d", mask=0x01, prevbyte=True),
+                f.skip(bytes=2),
+                f.uint8(field="e"),
+                f.boolean(field="g", mask=0x80, prevbyte=True),
+            ],
+        )
+        self.assertEqual(Class.FixedSize, 8)
+        data = bytes.fromhex("fffffe80a10000ff")
+        obj = Class.fromBytes(data)
+        self.assertEqual((obj.a, obj.b, obj.c, obj.d), (-2, -128, 10, True))
+        self.assertEqual((obj.e, obj.g), (255, True))
+        self.assertEqual(obj.toBytes(), data)
+        self.assertEqual(obj.toBytes(), obj.toBytesInterpreted())
+
+    def test_zero_copy(self):
+        s = Serialization()
+        f = s.functionsModule()
+
+        description = [
+            f.uint8(field="a"),
+            f.nulTerminatedString(field="b"),
+            f.binary(field="c"),
+        ]
+        for compiled in True, False:
+            cls = s.createClass("Class", description, compiled=compiled)
+            data = bytearray.fromhex("01616200abcd")
+            obj = cls.fromBytes(memoryview(data)[1:])
+            self.assertEqual((obj.a, obj.b, obj.c), (0x61, "b", b"\xab\xcd"))
+            self.assertIsInstance(obj.c, memoryview)
+            self.assertEqual(repr(obj), "Class(a=97, b='b', c=b'\\xab\\xcd')")
+            data[-1] = 0xEF
+            self.assertEqual(obj.c, b"\xab\xef")
+            self.assertEqual(obj.toBytes(), data[1:])
+
+            obj = cls.fromBytes(data, copy=True)
+            data[-1] = 0xCD
+            self.assertEqual((obj.a, obj.b, obj.c), (1, "ab", b"\xab\xef"))
+
+    def test_write_into(self):
+        s = Serialization()
+        f = s.functionsModule()
+
+        Inner = s.createClass(
+            "Inner", [f.uint16(field="a"), f.binary(field="b")]
+        )
+        description = [
+            f.magic(bytes=b"\x01"),
+            f.uint8(virtualfield="length", value=Expr("len(items)")),
+            f.array(
+                field="items", length=Expr("length"), items=f.uint(bytes=3)
+            ),
+            f.object(field="inner", type=Inner),
+        ]
+        obj = Inner(a=0x1234, b=b"xyz")
+        for compiled in True, False:
+            cls = s.createClass("Class", description, compiled=compiled)
+            outer = cls(items=[1, 2], inner=obj)
+            data = bytes.fromhex("0102000001000002123478797a")
+            self.assertEqual(outer.toBytes(), data)
+            self.assertEqual(outer.encodedSize(), len(data))
+
+            buf = bytearray(len(data) + 1)
+            self.assertEqual(outer.writeInto(buf, 1), len(buf))
+            self.assertEqual(buf[1:], data)
+            self.assertRaises(ValueError, outer.writeInto, buf, 2)
+
+            view = memoryview(bytearray(len(data)))
+            self.assertEqual(outer.writeInto(view), len(data))
+            self.assertEqual(view, data)
+
+        fixed = s.createClass("Fixed", [f.uint16(field="a")])(a=0xABCD)
+        buf = bytearray(3)
+        self.assertEqual(fixed.encodedSize(), 2)
+        self.assertEqual(fixed.writeInto(buf, 1), 3)
+        self.assertEqual(buf, b"\x00\xab\xcd")
+        self.assertRaises(ValueError, fixed.writeInto, buf, 2)
+
+    def test_lazy(self):
+        s = Serialization()
+        f = s.functionsModule()
+
+        description = [
+            f.magic(bytes=b"\x01"),
+            f.uint8(field="a"),
+            f.bitset(field="b", bytes=1),
+            f.uint8(virtualfield="length", value=Expr("len(c)")),
+            f.binary(field="c", bytes=Value("length")),
+            f.boolean(field="d"),
+        ]
+        Eager = s.createClass("Class", description)
+        Lazy = s.createClass("Class", description, lazy=True)
+        self.assertFalse(Eager.Lazy)
+        self.assertTrue(Lazy.Lazy)
+
+        data = bytes.fromhex("01070502abcdff")
+        obj = Lazy.fromBytes(data)
+        self.assertEqual(obj.a, 7)
+        self.assertRaises(AttributeError, object.__getattribute__, obj, "b")
+        self.assertEqual(obj.b, {0, 2})
+        self.assertRaises(AttributeError, object.__getattribute__, obj, "c")
+        self.assertEqual(repr(obj), repr(Eager.fromBytes(data)))
+        self.assertEqual(obj.toBytes(), data)
+        self.assertRaises(AttributeError, getattr, obj, "e")
+
+        obj = Lazy.fromBytes(data)
+        obj.c = b"xyz"
+        self.assertEqual((obj.b, obj.c, obj.d), ({0, 2}, b"xyz", True))
+        self.assertEqual(obj.toBytes(), bytes.fromhex("0107050378797aff"))
+        obj = Lazy(a=1, b=set(), c=b"", d=False)
+        self.assertEqual(obj.toBytes(), bytes.fromhex("0101000000"))
+
+        self.assertRaises(Exception, Lazy.fromBytes, data[:3])
+        self.assertRaises(Exception, Lazy.fromBytes, b"\x02" + data[1:])
+        obj = Lazy.fromBytes(data[:5])
+        self.assertEqual(obj.a, 7)
+        self.assertRaises(Exception, getattr, obj, "c")
+
+        IntervalReport = _command_classes[0x84].versions[1].IntervalReport
+        Lazy = s.createClass(
+            "IntervalReport",
+            [
+                f.magic(bytes=b"\x84\x06"),
+                f.uint24(field="seconds"),
+                f.uint8(field="nodeid"),
+            ],
+            lazy=True,
+        )
+        data = bytes.fromhex("840601518001")
+        obj = Lazy.fromBytes(data)
+        self.assertEqual(obj.seconds, 0x015180)
+        self.assertEqual(obj.toBytes(), data)
+        self.assertEqual(
+            slotValues(IntervalReport.fromBytes(data)),
+            (obj.seconds, obj.nodeid),
+        )
+
+    def test_code_cache(self):
+        source = "def f(x):\n    return x + 1\n"
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "cache", "codecache")
+            cache = CodeCache(path)
+            code = cache.compile(source, "<f>")
+            self.assertIs(cache.compile(source, "<f>"), code)
+            self.assertEqual((cache.hits, cache.misses), (1, 1))
+            cache.save()
+
+            cache = CodeCache(path)
+            namespace = {}
+            exec(cache.compile(source, "<f>"), namespace)
+            self.assertEqual(namespace["f"](1), 2)
+            cache.compile(source, "<g>")
+            cache.compile(source.replace("1", "2"), "<f>")
+            self.assertEqual((cache.hits, cache.misses), (1, 2))
+            cache.save()
+
+            # code objects not used in a run are kept
+            cache = CodeCache(path)
+            cache.compile(source, "<h>")
+            cache.save()
+            cache = CodeCache(path)
+            cache.compile(source, "<g>")
+            cache.compile(source, "<f>")
+            self.assertEqual((cache.hits, cache.misses), (2, 0))
+
+            # runs writing the file concurrently merge their code objects
+            first, second = CodeCache(path), CodeCache(path)
+            first.compile(source, "<i>")
+            second.compile(source, "<j>")
+            first.save()
+            second.save()
+            cache = CodeCache(path)
+            cache.compile(source, "<i>")
+            cache.compile(source, "<j>")
+            self.assertEqual((cache.hits, cache.misses), (2, 0))
+
+            # code objects not used for maxAge days are dropped
+            with open(path, "rb") as f:
+                codes = marshal.load(f)
+            with open(path, "wb") as f:
+                marshal.dump(
+                    {key: (0, code) for key, (_, code) in codes.items()}, f
+                )
+            cache = CodeCache(path)
+            cache.compile(source, "<g>")
+            cache.save()
+            cache = CodeCache(path)
+            cache.compile(source, "<g>")
+            cache.compile(source, "<f>")
+            self.assertEqual((cache.hits, cache.misses), (1, 1))
+            cache.save()
+
+            # and the file is left alone if nothing changed
+            inode = os.stat(path).st_ino
+            cache = CodeCache(path)
+            cache.compile(source, "<f>")
+            cache.compile(source, "<g>")
+            cache.save()
+            self.assertEqual(os.stat(path).st_ino, inode)
+
+            with open(path, "wb") as f:
+                f.write(b"garbage")
+            cache = CodeCache(path)
+            cache.compile(source, "<f>")
+            self.assertEqual((cache.hits, cache.misses), (0, 1))
+            cache.save()
+            self.assertEqual(CodeCache(path).compile(source, "<f>"), code)
+
+    def test_code_cache_path(self):
+        environ = dict(os.environ)
+        try:
+            os.environ.pop("PYWAVEZ_CACHE_DIR", None)
+            self.assertIsNone(defaultCachePath())
+            os.environ["PYWAVEZ_CACHE_DIR"] = ""
+            self.assertIsNone(defaultCachePath())
+            os.environ["PYWAVEZ_CACHE_DIR"] = "cache"
+            self.assertEqual(os.path.dirname(defaultCachePath()), "cache")
+        finally:
+            os.environ.clear()
+            os.environ.update(environ)
+
+    def test_fallback(self):
+        s = Serialization()
+        f = s.functionsModule()
+
+        description = [
+            f.uint8(virtualfield="length", value=Expr("len(data)")),
+            f.array(field="data", length=Expr("length"), items=f.uint8()),
+        ]
+        Compiled = s.createClass("Class", description)
+        Interpreted = s.createClass("Class", description, compiled=False)
+        self.assertTrue(Compiled.Compiled)
+        self.assertFalse(Interpreted.Compiled)
+
+        data = bytes.fromhex("03010203")
+        for cls in Compiled, Interpreted:
+            obj = cls.fromBytes(data)
+            self.assertEqual(obj.data, [1, 2, 3])
+            self.assertEqual(obj.toBytes(), data)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,10 @@
+import importlib
+import pkgutil
+import subprocess
+import sys
 import unittest
 
+import pywavez.zwave
 from pywavez.zwave import Message, inboundMessageFromBytes
 from pywavez.zwave.Constants import LibraryType
 
@@ -70,5 +75,65 @@ class TestGetVersion(unittest.TestCase):
         self.assertEqual(obj.toBytes(), data)
 
 
+class TestCommands(unittest.TestCase):
+    def test_VersionV2Report(self):
+        Report = pywavez.zwave.getCommandClassVersion(0x86, 2).Report
+        data = bytes.fromhex("86120301020304010205060708")
+        obj = Report.fromBytes(data)
+        self.assertEqual(obj.hardwareVersion, 1)
+        self.assertEqual(
+            [
+                (t.firmwareVersion, t.firmwareSubVersion)
+                for t in obj.firmwareTargets
+            ],
+            [(5, 6), (7, 8)],
+        )
+        self.assertIsInstance(obj.firmwareTargets[0], Report.Firmware)
+        self.assertEqual(obj.toBytes(), data)
+        obj.firmwareTargets.pop()
+        self.assertEqual(obj.toBytes(), data[:8] + b"\x01\x05\x06")
+
+
+class TestCommandClassRegistry(unittest.TestCase):
+    def test_modules(self):
+        modules = [
+            m.name
+            for m in pkgutil.iter_modules(path=pywavez.zwave.__path__)
+            if m.name.startswith("CommandClass")
+        ]
+        self.assertEqual(
+            sorted(modules),
+            sorted(pywavez.zwave._command_class_modules.values()),
+        )
+        for code, mod in pywavez.zwave._command_class_modules.items():
+            cls = getattr(pywavez.zwave, mod)
+            self.assertIs(pywavez.zwave._command_classes[code], cls)
+            self.assertIs(pywavez.zwave._command_classes[int(code)], cls)
+            self.assertIs(
+                getattr(importlib.import_module(cls.__module__), mod), cls
+            )
+            self.assertEqual(cls.code, code)
+        self.assertRaises(KeyError, pywavez.zwave.getCommandClassVersion, 1, 1)
+        self.assertRaises(AttributeError, getattr, pywavez.zwave, "Missing")
+
+    def test_lazy_import(self):
+        code = (
+            "import sys, pywavez.zwave as z\n"
+            "z.inboundMessageFromBytes(bytes.fromhex(sys.argv[1]))\n"
+            "print(sorted(m for m in sys.modules if 'CommandClass' in m))\n"
+            "z.getCommandClassVersion(0x25, 1)\n"
+            "print(sorted(m for m in sys.modules if 'CommandClass' in m))\n"
+        )
+        out = subprocess.run(
+            [sys.executable, "-c", code, "01155a2d5761766520342e30350001"],
+            check=True,
+            stdout=subprocess.PIPE,
+            universal_newlines=True,
+        ).stdout.splitlines()
+        self.assertEqual(
+            out, ["[]", "['pywavez.zwave.CommandClassSwitchBinary']"]
+        )
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,119 @@
+import asyncio
+import os
+import time
+import unittest
+
+from pywavez.Controller import Controller
+from pywavez.SerialDeviceBase import makeSerialDevice
+from pywavez.SerialProtocol import SerialProtocol
+from pywavez.SimulatedSerialDevice import SimulatedSerialDevice
+from pywavez.SimulatedStick import SimulatedStick
+from pywavez.VirtualNode import VirtualNode
+from pywavez.zwave import getCommandClassVersion
+from pywavez.zwave.Constants import CommandClass
+
+getVersion = bytes.fromhex("0015")
+version = b"\x01\x15Z-Wave 4.05\x00\x01"
+
+
+class TestSimulatedStick(unittest.TestCase):
+    def test_controller(self):
+        asyncio.run(self.checkController())
+
+    async def checkController(self):
+        stick = SimulatedStick(
+            [
+                VirtualNode(2),
+                VirtualNode(3, endpoints=[[CommandClass.SWITCH_BINARY]] * 2),
+            ],
+            latency=0.001,
+        )
+        controller = await Controller(await SimulatedSerialDevice(stick))
+        try:
+            self.assertEqual(controller.homeId, "c0ffee01")
+            self.assertEqual(controller.nodeIds, {1, 2, 3})
+            expires = time.monotonic() + 30
+            nodes = [controller._getNode(i) for i in (2, 3)]
+            while any(n.attemptInitializationTime is not None for n in nodes):
+                self.assertLess(time.monotonic(), expires)
+                await asyncio.sleep(0.05)
+            self.assertEqual(
+                nodes[1].commandClassCodes[2], (CommandClass.SWITCH_BINARY,)
+            )
+
+            switch = getCommandClassVersion(CommandClass.SWITCH_BINARY, 1)
+            await asyncio.wait_for(
+                controller.sendCommand(2, switch.Set(value=0xFF)), 5
+            )
+            await asyncio.wait_for(
+                controller.sendCommand(3, switch.Set(value=0xFF), endpoint=2),
+                5,
+            )
+            self.assertEqual(stick.nodes[2].values, {0: 0xFF})
+            self.assertEqual(stick.nodes[3].values, {2: 0xFF})
+        finally:
+            await controller.shutdown()
+
+    def test_no_ack(self):
+        asyncio.run(self.checkNoAck())
+
+    async def checkNoAck(self):
+        stick = SimulatedStick(
+            [VirtualNode(2), VirtualNode(3, listening=False)],
+            latency=0.001,
+            noAckProbability=1.0,
+        )
+        sp = SerialProtocol(await SimulatedSerialDevice(stick))
+        try:
+            # SEND_DATA of a SwitchBinary Set, with callback
+            await sp.send(bytes.fromhex("001302032501ff0507"))
+            self.assertEqual(await sp.getMessage(5), b"\x01\x13\x01")
+            # NO_ACK
+            self.assertEqual(await sp.getMessage(5), b"\x00\x13\x07\x01")
+        finally:
+            await sp.close()
+
+    def test_wake_up(self):
+        asyncio.run(self.checkWakeUp())
+
+    async def checkWakeUp(self):
+        node = VirtualNode(2, listening=False, wakeUpInterval=0.1)
+        stick = SimulatedStick([node], latency=0.001)
+        sp = SerialProtocol(await SimulatedSerialDevice(stick))
+        try:
+            # WAKE_UP Notification
+            notification = b"\x00\x04\x00\x02\x02\x84\x07"
+            self.assertEqual(await sp.getMessage(5), notification)
+            self.assertTrue(node.awake)
+            # WAKE_UP NoMoreInformation
+            await sp.send(bytes.fromhex("0013020284080501"))
+            msg = await sp.getMessage(5)
+            if msg == notification:
+                # sent again, as the protocol starts with a NAK
+                msg = await sp.getMessage(5)
+            self.assertEqual(msg, b"\x01\x13\x01")
+            self.assertEqual(await sp.getMessage(5), b"\x00\x13\x01\x00")
+            self.assertFalse(node.awake)
+        finally:
+            await sp.close()
+
+    def test_pty(self):
+        asyncio.run(self.checkPty())
+
+    async def checkPty(self):
+        stick = SimulatedStick()
+        path = stick.openPty()
+        try:
+            self.assertTrue(os.path.exists(path))
+            sp = SerialProtocol(await makeSerialDevice(path))
+            try:
+                await asyncio.wait_for(sp.send(getVersion), 5)
+                self.assertEqual(await sp.getMessage(5), version)
+            finally:
+                await sp.close()
+        finally:
+            stick.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
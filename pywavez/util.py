@@ -5,6 +5,8 @@ import re
 
 
 async def waitForOne(*aws, timeout=None):
+    # asyncio.wait no longer takes coroutines as of Python 3.11
+    aws = [asyncio.ensure_future(aw) for aw in aws]
     _, pending = await asyncio.wait(
         aws, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
     )
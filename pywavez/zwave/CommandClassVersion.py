@@ -57,6 +57,13 @@ class CommandClassVersionV1(CommandClassVersion):
 class CommandClassVersionV2(CommandClassVersionV1):
     version = 2
 
+    Firmware = ZWaveSerialization.createClass(
+        "Firmware",
+        [
+            fct.uint8(field="firmwareVersion"),
+            fct.uint8(field="firmwareSubVersion"),
+        ],
+    )
     Report = ZWaveSerialization.createClass(
         "Report",
         [
@@ -68,21 +75,13 @@ class CommandClassVersionV2(CommandClassVersionV1):
             fct.uint8(field="firmware0SubVersion"),
             fct.uint8(field="hardwareVersion"),
             fct.uint8(
-                virtualfield="numberOfFirmwareTargets", value=_Expr("len(vg)")
-            ),
-            fct.classvar(
-                name="Firmware",
-                val=ZWaveSerialization.createClass(
-                    "Firmware",
-                    [
-                        fct.uint8(field="firmwareVersion"),
-                        fct.uint8(field="firmwareSubVersion"),
-                    ],
-                ),
+                virtualfield="numberOfFirmwareTargets",
+                value=_Expr("len(firmwareTargets)"),
             ),
+            fct.classvar(name="Firmware", val=Firmware),
             fct.array(
                 field="firmwareTargets",
-                items=fct.object(type=_Value("__obj.Firmware")),
+                items=fct.object(type=Firmware),
                 length=_Value("numberOfFirmwareTargets"),
             ),
         ],
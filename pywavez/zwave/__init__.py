@@ -1,8 +1,9 @@
+import collections.abc
+import functools
 import importlib
-import pkgutil
 import typing
 
-from .Constants import MessageType, MessageClass
+from .Constants import CommandClass, MessageType, MessageClass
 from .Message import Message
 from pywavez.serialization.ParseError import ParseError
 
@@ -30,27 +31,46 @@ for name in dir(Message):
         ] = cls
 
 
-def messageFromBytes(inbound: bool, data: typing.ByteString):
-    if len(data) < 2:
-        raise ParseError("short message")
+# flat tables of the message classes, indexed by
+# `message type << 8 | message class`
+_inbound_message_table = [None] * 512
+_outbound_message_table = [None] * 512
+for table, classes in (
+    (_inbound_message_table, _inbound_message_classes),
+    (_outbound_message_table, _outbound_message_classes),
+):
+    for _type, by_class in classes.items():
+        for _class, cls in by_class.items():
+            table[_type << 8 | _class] = cls
+_inbound_message_table = tuple(_inbound_message_table)
+_outbound_message_table = tuple(_outbound_message_table)
+
+
+def messageFromBytes(inbound: bool, data: typing.ByteString, cache=None):
     try:
-        cls = (
-            _inbound_message_classes if inbound else _outbound_message_classes
-        )[data[0]][data[1]]
-    except KeyError:
+        cls = (_inbound_message_table if inbound else _outbound_message_table)[
+            data[0] << 8 | data[1]
+        ]
+    except IndexError:
+        cls = None
+    if cls is None:
+        if len(data) < 2:
+            raise ParseError("short message")
         raise ParseError(
             f"unknown message type or class 0x{data[0]:02x} 0x{data[1]:02x} "
             f'({ "inbound" if inbound else "outbound" })'
         )
+    if cache is not None:
+        return cache.fromBytes(cls, data)
     return cls.fromBytes(data)
 
 
-def inboundMessageFromBytes(data: typing.ByteString):
-    return messageFromBytes(True, data)
+def inboundMessageFromBytes(data: typing.ByteString, cache=None):
+    return messageFromBytes(True, data, cache)
 
 
-def outboundMessageFromBytes(data: typing.ByteString):
-    return messageFromBytes(False, data)
+def outboundMessageFromBytes(data: typing.ByteString, cache=None):
+    return messageFromBytes(False, data, cache)
 
 
 def inboundMessageClass(type: MessageType, _class: MessageClass):
@@ -61,14 +81,68 @@ def outboundMessageClass(type: MessageType, _class: MessageClass):
     return _outbound_message_classes[type.value][_class.value]
 
 
-_command_classes = {}
-for module_info in pkgutil.iter_modules(path=__path__):
-    mod = module_info.name
-    if not module_info.ispkg and mod.startswith("CommandClass"):
+# Command classes are described in modules of the same name, imported only
+# when a command class is first used: compiling the classes of all of them
+# is most of the cost of importing this package.
+_command_class_modules = {
+    CommandClass.BASIC: "CommandClassBasic",
+    CommandClass.SWITCH_BINARY: "CommandClassSwitchBinary",
+    CommandClass.SWITCH_MULTILEVEL: "CommandClassSwitchMultilevel",
+    CommandClass.SENSOR_BINARY: "CommandClassSensorBinary",
+    CommandClass.SENSOR_MULTILEVEL: "CommandClassSensorMultilevel",
+    CommandClass.METER: "CommandClassMeter",
+    CommandClass.THERMOSTAT_SETPOINT: "CommandClassThermostatSetpoint",
+    CommandClass.MULTI_CHANNEL: "CommandClassMultiChannel",
+    CommandClass.MANUFACTURER_SPECIFIC: "CommandClassManufacturerSpecific",
+    CommandClass.BATTERY: "CommandClassBattery",
+    CommandClass.WAKE_UP: "CommandClassWakeUp",
+    CommandClass.VERSION: "CommandClassVersion",
+}
+_command_class_names = {
+    mod: code for code, mod in _command_class_modules.items()
+}
+
+
+class _CommandClassRegistry(collections.abc.Mapping):
+    """
+    Mapping of command class codes to command classes, importing the module
+    describing a command class on first access.
+    """
+
+    def __init__(self):
+        self.__classes = {}
+
+    def __getitem__(self, code):
+        try:
+            return self.__classes[code]
+        except KeyError:
+            pass
+        mod = _command_class_modules[code]
         cls = getattr(importlib.import_module(f".{ mod }", __package__), mod)
-        _command_classes[cls.code] = cls
-        globals()[mod] = cls
-_command_class_codes = frozenset(_command_classes)
+        # importing the module has set the package attribute of the same
+        # name to the module: replace it with the class
+        globals()[mod] = self.__classes[code] = cls
+        return cls
+
+    def __iter__(self):
+        return iter(_command_class_modules)
+
+    def __len__(self):
+        return len(_command_class_modules)
+
+
+_command_classes = _CommandClassRegistry()
+_command_class_codes = frozenset(_command_class_modules)
+
+
+def __getattr__(name):
+    try:
+        code = _command_class_names[name]
+    except KeyError:
+        raise AttributeError(
+            f"module { __name__ !r} has no attribute { name !r}"
+        ) from None
+    return _command_classes[code]
 
 
 def getSupportedCommandClassCodes():
@@ -77,3 +151,16 @@ def getSupportedCommandClassCodes():
 
 def getCommandClassVersion(cmd_class, version):
     return _command_classes[cmd_class].versions[version]
+
+
+@functools.lru_cache(maxsize=None)
+def commandTable(cc):
+    """
+    Returns the command classes of command class version `cc` in a tuple of
+    256 entries indexed by command code, None for unknown commands.
+    """
+
+    table = [None] * 256
+    for cmd, cls in cc.commands.items():
+        table[cmd] = cls
+    return tuple(table)
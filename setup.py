@@ -23,9 +23,11 @@ setup(
     license="MIT",
     packages=["pywavez"],
     install_requires=["asyncinit", "pyserial", "pyserial-asyncio"],
+    extras_require={"numpy": ["numpy"]},
     entry_points={
         "console_scripts": [
-            "pywavez-remote-serial-server=pywavez.RemoteSerialDevice:main"
+            "pywavez-remote-serial-server=pywavez.RemoteSerialDevice:main",
+            "pywavez-simulated-stick=pywavez.SimulatedStick:main",
         ]
     },
     test_suite="pywavez.tests",